@@ -0,0 +1,370 @@
+"""Measure the latency of the language server's hot paths.
+
+Requests go through the JSON-RPC endpoint of an in-process server, on
+generated modules and notebooks of several sizes:
+
+    python benchmarks/hot_paths.py --save   # Record a baseline
+    python benchmarks/hot_paths.py          # Compare with it
+
+Each scenario reports the p50/p95 latency of its request, and the peak memory
+allocated while handling one of them. Scenarios slower or bigger than the
+baseline by more than the tolerance are flagged, and the exit status is 1.
+Baselines are only stored locally, as they depend on the machine.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from concurrent.futures import Future
+
+from pylsp import uris
+from pylsp.python_lsp import PythonLSPServer
+
+# Approximate lines of the generated modules and notebooks
+SIZES = {"small": 100, "medium": 1000, "huge": 10000}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), ".baseline.json")
+# Latencies below this many seconds are too noisy to flag
+MIN_REGRESSION_S = 0.001
+
+CHUNK = '''\
+class Model{i}:
+    """Model number {i}."""
+
+    def __init__(self, value={i}):
+        self.value = value
+        self.items = collections.OrderedDict()
+
+    def compute(self, factor):
+        total = 0
+        for key, item in self.items.items():
+            if item > factor:
+                total += item * factor
+        return total + self.value + len(key)
+
+
+def helper_{i}(model):
+    return Model{i}(model.compute({i}))
+
+
+'''
+HEADER = '"""Generated for benchmarks."""\nimport collections\nimport os\n\n\n'
+TARGET = "def target():\n    return os.path.join(str(Model0().value))\n"
+TARGET_COLUMN = TARGET.splitlines()[-1].index("join")
+
+
+def generate_chunks(lines):
+    chunk_lines = CHUNK.count("\n")
+    return [CHUNK.format(i=i) for i in range(max(1, lines // chunk_lines))]
+
+
+def generate_module(lines):
+    return HEADER + "".join(generate_chunks(lines)) + TARGET
+
+
+def generate_cells(lines):
+    """Return the sources of notebook cells, one class and function each."""
+    return [HEADER] + generate_chunks(lines) + [TARGET]
+
+
+class Client:
+    """Talks JSON-RPC to a server in this process."""
+
+    def __init__(self, root):
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._responses = {}
+        self.server = PythonLSPServer(None, None, consumer=self._receive)
+        self.request(
+            "initialize",
+            {
+                "processId": None,
+                "rootUri": uris.from_fs_path(root),
+                "initializationOptions": {},
+                # Pull diagnostics, so that edits don't lint in the background
+                "capabilities": {"textDocument": {"diagnostic": {}}},
+            },
+        )
+        self.notify("initialized", {})
+
+    def _receive(self, message):
+        if "method" in message:
+            return  # Notifications and requests of the server
+        with self._lock:
+            future = self._responses.pop(message["id"])
+        if "error" in message:
+            future.set_exception(RuntimeError(message["error"]))
+        else:
+            future.set_result(message.get("result"))
+
+    def request(self, method, params, timeout=300):
+        future = Future()
+        with self._lock:
+            self._next_id += 1
+            msg_id = self._next_id
+            self._responses[msg_id] = future
+        self._send({"jsonrpc": "2.0", "id": msg_id, "method": method, "params": params})
+        return future.result(timeout)
+
+    def notify(self, method, params):
+        self._send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def _send(self, message):
+        # Like over the wire, the server gets its own copy of the message
+        self.server.consume(json.loads(json.dumps(message)))
+
+    def close(self):
+        self.request("shutdown", None)
+        self.notify("exit", None)
+
+
+def module_scenarios(client, root, size, lines):
+    source = generate_module(lines)
+    path = os.path.join(root, f"module_{size}.py")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(source)
+    uri = uris.from_fs_path(path)
+    document = {"uri": uri}
+    client.notify(
+        "textDocument/didOpen",
+        {
+            "textDocument": {
+                "uri": uri,
+                "languageId": "python",
+                "version": 1,
+                "text": source,
+            }
+        },
+    )
+    target = {"line": source.count("\n") - 1, "character": TARGET_COLUMN}
+    version = [1]
+
+    def apply_change():
+        # Insert a character in the middle of the module, then remove it
+        line = source.count("\n") // 2
+        for text, end in (("#", 0), ("", 1)):
+            version[0] += 1
+            client.notify(
+                "textDocument/didChange",
+                {
+                    "textDocument": {"uri": uri, "version": version[0]},
+                    "contentChanges": [
+                        {
+                            "range": {
+                                "start": {"line": line, "character": 0},
+                                "end": {"line": line, "character": end},
+                            },
+                            "text": text,
+                        }
+                    ],
+                },
+            )
+
+    params = {"textDocument": document, "position": target}
+    return {
+        "completion": lambda: client.request("textDocument/completion", params),
+        "hover": lambda: client.request("textDocument/hover", params),
+        "lint": lambda: client.request(
+            "textDocument/diagnostic", {"textDocument": document}
+        ),
+        "folding": lambda: client.request(
+            "textDocument/foldingRange", {"textDocument": document}
+        ),
+        "symbols": lambda: client.request(
+            "textDocument/documentSymbol", {"textDocument": document}
+        ),
+        "apply_change": apply_change,
+    }
+
+
+def notebook_scenarios(client, root, size, lines):
+    sources = generate_cells(lines)
+    path = os.path.join(root, f"notebook_{size}.ipynb")
+    notebook_uri = uris.from_fs_path(path)
+    cell_uris = [
+        f"vscode-notebook-cell:{path}#cell{index}" for index in range(len(sources))
+    ]
+    client.notify(
+        "notebookDocument/didOpen",
+        {
+            "notebookDocument": {
+                "uri": notebook_uri,
+                "notebookType": "jupyter-notebook",
+                "version": 1,
+                "cells": [{"kind": 2, "document": cell_uri} for cell_uri in cell_uris],
+            },
+            "cellTextDocuments": [
+                {"uri": cell_uri, "languageId": "python", "version": 1, "text": text}
+                for cell_uri, text in zip(cell_uris, sources)
+            ],
+        },
+    )
+    target = {"line": TARGET.count("\n") - 1, "character": TARGET_COLUMN}
+    params = {"textDocument": {"uri": cell_uris[-1]}, "position": target}
+    edited = cell_uris[len(cell_uris) // 2]
+    version = [1]
+
+    def apply_change():
+        for text, end in (("#", 0), ("", 1)):
+            version[0] += 1
+            change = {
+                "range": {
+                    "start": {"line": 1, "character": 0},
+                    "end": {"line": 1, "character": end},
+                },
+                "text": text,
+            }
+            client.notify(
+                "notebookDocument/didChange",
+                {
+                    "notebookDocument": {"uri": notebook_uri, "version": version[0]},
+                    "change": {
+                        "cells": {
+                            "textContent": [
+                                {
+                                    "document": {"uri": edited, "version": version[0]},
+                                    "changes": [change],
+                                }
+                            ]
+                        }
+                    },
+                },
+            )
+
+    return {
+        "completion": lambda: client.request("textDocument/completion", params),
+        "hover": lambda: client.request("textDocument/hover", params),
+        "apply_change": apply_change,
+    }
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(run, runs):
+    run()  # Warm up the caches of the scenario
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "p50": percentile(samples, 0.5),
+        "p95": percentile(samples, 0.95),
+        "peak_kb": peak / 1024,
+    }
+
+
+def run_scenarios(sizes, runs, selected=None):
+    results = {}
+    with tempfile.TemporaryDirectory() as root:
+        client = Client(root)
+        try:
+            for kind, scenarios in (
+                ("module", module_scenarios),
+                ("notebook", notebook_scenarios),
+            ):
+                for size in sizes:
+                    runners = scenarios(client, root, size, SIZES[size])
+                    for name, run in runners.items():
+                        scenario = f"{kind}/{size}/{name}"
+                        if selected and not any(s in scenario for s in selected):
+                            continue
+                        results[scenario] = measure(run, runs)
+                        print(format_result(scenario, results[scenario]), flush=True)
+        finally:
+            client.close()
+    return results
+
+
+def format_result(scenario, result):
+    return (
+        f"{scenario:<32} p50 {result['p50'] * 1000:8.2f} ms"
+        f"  p95 {result['p95'] * 1000:8.2f} ms  peak {result['peak_kb']:9.0f} KiB"
+    )
+
+
+def regressions(results, baseline, tolerance):
+    """Return descriptions of the scenarios that got worse than the baseline."""
+    found = []
+    for scenario, result in results.items():
+        base = baseline.get(scenario)
+        if base is None:
+            continue
+        for metric in ("p50", "p95"):
+            if (
+                result[metric] > base[metric] * (1 + tolerance)
+                and result[metric] - base[metric] > MIN_REGRESSION_S
+            ):
+                found.append(
+                    f"{scenario}: {metric} {result[metric] * 1000:.2f} ms, "
+                    f"was {base[metric] * 1000:.2f} ms"
+                )
+        if result["peak_kb"] > base["peak_kb"] * (1 + tolerance):
+            found.append(
+                f"{scenario}: peak {result['peak_kb']:.0f} KiB, "
+                f"was {base['peak_kb']:.0f} KiB"
+            )
+    return found
+
+
+def main(argv):
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument(
+        "--scenario",
+        nargs="+",
+        help="Only run the scenarios containing one of these, e.g. module/huge",
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save", action="store_true", help="Store the results as the baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Flag scenarios worse than the baseline by more than this fraction",
+    )
+    arguments = parser.parse_args(argv[1:])
+
+    results = run_scenarios(arguments.sizes, arguments.runs, arguments.scenario)
+
+    if arguments.save:
+        baseline = {}
+        if os.path.exists(arguments.baseline):
+            with open(arguments.baseline, encoding="utf-8") as file:
+                baseline = json.load(file)
+        baseline.update(results)
+        with open(arguments.baseline, "w", encoding="utf-8") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f"Saved the baseline to {arguments.baseline}")
+        return 0
+
+    if not os.path.exists(arguments.baseline):
+        print("No baseline to compare with, record one with --save")
+        return 0
+    with open(arguments.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    found = regressions(results, baseline, arguments.tolerance)
+    for regression in found:
+        print(f"REGRESSION {regression}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,63 @@
+"""Measure how long the language server takes to start.
+
+Each sample runs in a fresh interpreter, so that nothing is imported yet:
+
+    python benchmarks/startup.py --runs 10
+
+"eager" imports every enabled plugin like the server did before plugins were
+loaded lazily, "lazy" only what a new server imports until its first request.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+SAMPLE = """
+import json, time
+start = time.perf_counter()
+from pylsp import uris
+from pylsp.config.config import Config
+from pylsp.python_lsp import PythonLSPServer
+imported = time.perf_counter()
+config = Config(uris.from_fs_path({root!r}), {{}}, 0, {{}})
+if {eager!r}:
+    config.load_plugins()
+configured = time.perf_counter()
+print(json.dumps({{
+    "import": imported - start,
+    "config": configured - imported,
+    "total": configured - start,
+}}))
+"""
+
+
+def sample(eager: bool, root: str) -> dict:
+    code = SAMPLE.format(eager=eager, root=root)
+    output = subprocess.check_output([sys.executable, "-c", code], text=True)
+    return json.loads(output.splitlines()[-1])
+
+
+def main(argv):
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--root", default=".", help="Workspace root to configure")
+    arguments = parser.parse_args(argv[1:])
+
+    for mode in ("eager", "lazy"):
+        samples = [
+            sample(mode == "eager", arguments.root) for _ in range(arguments.runs)
+        ]
+        medians = {
+            phase: statistics.median(s[phase] for s in samples) * 1000
+            for phase in samples[0]
+        }
+        print(
+            f"{mode:>5}: "
+            + ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in medians.items())
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv)
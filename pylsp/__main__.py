@@ -4,6 +4,7 @@
 import argparse
 import logging
 import logging.config
+import os
 import sys
 import time
 
@@ -12,6 +13,7 @@ try:
 except Exception:
     import json
 
+from . import _metrics
 from ._version import __version__
 from .python_lsp import (
     PythonLSPServer,
@@ -34,8 +36,31 @@ def add_arguments(parser):
     parser.add_argument(
         "--ws", action="store_true", help="Use Web Sockets server instead of stdio"
     )
+    parser.add_argument(
+        "--multi-client",
+        action="store_true",
+        help="With --tcp, serve many clients at once from a single process, "
+        "sharing jedi environments and autoimport databases between them",
+    )
+    parser.add_argument(
+        "--prefork",
+        action="store_true",
+        help="With --tcp, import the plugins and preload modules once, then serve "
+        "each client from a process forked from the prepared one. Not on Windows",
+    )
     parser.add_argument("--host", default="127.0.0.1", help="Bind to this address")
     parser.add_argument("--port", type=int, default=2087, help="Bind to this port")
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve the request and plugin latency metrics in the Prometheus text "
+        "format on this port of 127.0.0.1, at any path",
+    )
+    parser.add_argument(
+        "--metrics-log-interval",
+        type=float,
+        help="Log a summary of the latency metrics every this many seconds",
+    )
     parser.add_argument(
         "--check-parent-process",
         action="store_true",
@@ -72,10 +97,28 @@ def main():
     add_arguments(parser)
     args = parser.parse_args()
     _configure_logger(args.verbose, args.log_config, args.log_file)
+    if args.prefork and not args.tcp:
+        parser.error("--prefork requires --tcp")
+    if args.prefork and args.multi_client:
+        parser.error("--prefork and --multi-client can't be combined")
+    if args.prefork and not hasattr(os, "fork"):
+        parser.error("--prefork is not supported on this platform")
+    if args.prefork and args.metrics_port is not None:
+        parser.error("--metrics-port can't be combined with --prefork")
+
+    if args.metrics_port is not None:
+        _metrics.serve_prometheus("127.0.0.1", args.metrics_port)
+    if args.metrics_log_interval:
+        _metrics.log_periodically(args.metrics_log_interval)
 
     if args.tcp:
         start_tcp_lang_server(
-            args.host, args.port, args.check_parent_process, PythonLSPServer
+            args.host,
+            args.port,
+            args.check_parent_process,
+            PythonLSPServer,
+            multi_client=args.multi_client,
+            prefork=args.prefork,
         )
     elif args.ws:
         start_ws_lang_server(args.port, args.check_parent_process, PythonLSPServer)
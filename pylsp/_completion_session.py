@@ -0,0 +1,65 @@
+# Copyright 2021- Python Language Server Contributors.
+
+"""Reuse completions computed for a word while the user keeps typing it.
+
+Clients request completions again after each typed character. As long as
+only the word being completed changed, the candidates for the longer prefix
+are a subset of those computed for the shorter one, so they can be found by
+filtering instead of running Jedi (or every plugin) again.
+"""
+
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+from pylsp.workspace import RE_START_WORD, Cell
+
+
+class CompletionContext(NamedTuple):
+    # Document source with the word being completed taken out
+    base: str
+    # Position where the word being completed starts
+    start: Tuple[int, int]
+    prefix: str
+
+
+def completion_context(document, position) -> Optional[CompletionContext]:
+    """Return the context of a completion request, or None if not reusable."""
+    if isinstance(document, Cell):
+        # Completions in a cell also depend on the other cells of the notebook.
+        return None
+    lines = document.lines
+    if position["line"] >= len(lines):
+        return None
+    before = lines[position["line"]][: position["character"]]
+    prefix = RE_START_WORD.search(before).group()
+    offset = document.offset_at_position(position)
+    source = document.source
+    base = source[: offset - len(prefix)] + source[offset:]
+    start = (position["line"], position["character"] - len(prefix))
+    return CompletionContext(base, start, prefix)
+
+
+class CompletionSession:
+    """Completion candidates computed for the word typed at some position."""
+
+    def __init__(self, context: CompletionContext, items: List[Any]):
+        self.context = context
+        self.items = items
+
+    def filter(
+        self, context: Optional[CompletionContext], key: Callable[[Any], str]
+    ) -> Optional[List[Any]]:
+        """Return the items still matching after typing more of the word.
+
+        Returns None if the session doesn't apply to the given context, i.e.
+        anything but the word being completed changed or it was shortened.
+        Like Jedi, the typed word matches regardless of case.
+        """
+        if (
+            context is None
+            or context.start != self.context.start
+            or not context.prefix.lower().startswith(self.context.prefix.lower())
+            or context.base != self.context.base
+        ):
+            return None
+        prefix = context.prefix.lower()
+        return [item for item in self.items if key(item).lower().startswith(prefix)]
@@ -0,0 +1,84 @@
+# Copyright 2021- Python Language Server Contributors.
+
+"""A cache of the contents of files read from disk.
+
+Documents that aren't open in the editor (e.g. the targets of references or
+rename) read their source from disk on every access. The cache keeps the
+decoded text of recently read files, validated against their modification
+time and size, so repeated accesses only cost a ``stat``. It is shared by all
+workspaces and bounded in the total size of the files it holds.
+"""
+
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+MAX_BYTES = 64 * 1024 * 1024
+# Files at least this large are read through a memory map
+MMAP_THRESHOLD = 1024 * 1024
+
+
+def _decode(data) -> str:
+    # Same result as reading the file in text mode with universal newlines
+    return str(data, "utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+class FileCache:
+    """LRU cache of file contents, keyed by path and validated by stat."""
+
+    def __init__(self, max_bytes=MAX_BYTES, mmap_threshold=MMAP_THRESHOLD):
+        self.max_bytes = max_bytes
+        self.mmap_threshold = mmap_threshold
+        self._lock = threading.Lock()
+        # path -> (mtime_ns, size, text), least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def read(self, path: str) -> str:
+        """Return the text of the file, raising OSError if it can't be read."""
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                if entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                    self._entries.move_to_end(path)
+                    return entry[2]
+                self._remove(path)
+
+        text = self._read(path, stat.st_size)
+        if stat.st_size <= self.max_bytes:
+            with self._lock:
+                self._remove(path)
+                self._entries[path] = (stat.st_mtime_ns, stat.st_size, text)
+                self._bytes += stat.st_size
+                while self._bytes > self.max_bytes:
+                    _path, (_mtime, size, _text) = self._entries.popitem(last=False)
+                    self._bytes -= size
+        return text
+
+    def _read(self, path, size):
+        with open(path, "rb") as f:
+            if size >= self.mmap_threshold:
+                # Decode straight from the mapped pages, without copying the
+                # whole file into an intermediate bytes object first.
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return _decode(mapped)
+            return _decode(f.read())
+
+    def _remove(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def invalidate(self, path: str):
+        with self._lock:
+            self._remove(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+FILE_CACHE = FileCache()
@@ -0,0 +1,140 @@
+# Copyright 2021- Python Language Server Contributors.
+
+"""Keep indexes of the Python files of a workspace up to date.
+
+Indexes such as the ``NameIndex`` and the ``ImportGraph`` are fed the source
+of every Python file under a root, read once for all of them, and then the
+files that changed. Both happen in a single background thread, so handling a
+file change notification only queues the path instead of reading and parsing
+the file on the thread dispatching messages.
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from pylsp import _utils
+
+log = logging.getLogger(__name__)
+
+
+class FileIndex:
+    """Base class of the indexes kept up to date by a ``FileIndexer``."""
+
+    def __init__(self, root_path: str, exclude: Optional[List[str]] = None):
+        self._root_path = root_path
+        self._exclude = exclude or []
+        self._ready = threading.Event()
+
+    @property
+    def root_path(self):
+        return self._root_path
+
+    def build(self):
+        """Index every Python file under the root, in this thread."""
+        FileIndexer(self._root_path, self._exclude, [self]).build()
+
+    def set_ready(self):
+        self._ready.set()
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the initial build finished. Returns whether it did."""
+        return self._ready.wait(timeout)
+
+    def update_file(self, path: str, source: str):
+        raise NotImplementedError
+
+    def remove_file(self, path: str):
+        raise NotImplementedError
+
+
+class FileIndexer:
+    """Read the Python files under a root into indexes, in a background thread."""
+
+    def __init__(
+        self,
+        root_path: str,
+        exclude: Optional[List[str]] = None,
+        indexes: Iterable[FileIndex] = (),
+    ):
+        self._root_path = root_path
+        self._exclude = exclude or []
+        self._indexes = list(indexes)
+        self._lock = threading.Lock()
+        # Held while applying changes, so that they are applied in order
+        self._apply_lock = threading.Lock()
+        # path -> whether it was deleted, in the order of the changes
+        self._changes: Dict[str, bool] = {}
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Build the indexes, and then apply the file changes, in a background thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="pylsp-file-indexer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def build(self):
+        """Read every Python file under the root into the indexes."""
+        log.debug("Indexing the files under %s", self._root_path)
+        count = 0
+        for path in _utils.find_python_files(self._root_path, self._exclude):
+            if self._stopped.is_set():
+                return
+            self._read(path)
+            count += 1
+        for index in self._indexes:
+            index.set_ready()
+        log.debug("Indexed %s files under %s", count, self._root_path)
+
+    def file_changed(self, path: str, deleted: bool = False):
+        """Queue a file to read again, or to remove from the indexes."""
+        with self._lock:
+            # Move the path to the end, after the changes queued before it
+            self._changes.pop(path, None)
+            self._changes[path] = deleted
+        self._wakeup.set()
+
+    def apply_changes(self):
+        """Apply the queued file changes in this thread, e.g. before using the indexes."""
+        with self._apply_lock:
+            with self._lock:
+                changes, self._changes = self._changes, {}
+            for path, deleted in changes.items():
+                if deleted:
+                    self._remove(path)
+                else:
+                    self._read(path)
+
+    def _run(self):
+        self.build()
+        while not self._stopped.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._stopped.is_set():
+                self.apply_changes()
+
+    def _read(self, path):
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                source = f.read()
+        except OSError:
+            self._remove(path)
+            return
+        for index in self._indexes:
+            index.update_file(path, source)
+
+    def _remove(self, path):
+        for index in self._indexes:
+            index.remove_file(path)
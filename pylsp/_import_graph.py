@@ -0,0 +1,114 @@
+# Copyright 2021- Python Language Server Contributors.
+
+"""A graph of the imports between the Python modules of a workspace.
+
+Files are named after the dotted names of their modules, as derived from the
+packages (directories with an ``__init__.py``) they are in. Several files can
+have the same name, e.g. the ``conftest.py`` of two test directories, or a
+module and its stub. Imports are read from the syntax tree and not resolved,
+so modules from outside the workspace appear among the modules imported, but
+never as importers.
+
+A file is considered an importer of a module it imports, of that module's
+parent packages (which run on import) and, for ``from pkg import name``, of
+``pkg.name``, which may be a submodule.
+"""
+
+import threading
+from collections import defaultdict, deque
+from typing import Dict, FrozenSet, List, Optional, Set
+
+from pylsp import _imports
+from pylsp._file_indexer import FileIndex
+
+
+class ImportGraph(FileIndex):
+    """Track which modules under a root import which."""
+
+    def __init__(self, root_path: str, exclude: Optional[List[str]] = None):
+        super().__init__(root_path, exclude)
+        self._lock = threading.RLock()
+        # path -> module name
+        self._modules: Dict[str, str] = {}
+        # module name -> paths of the files with that name
+        self._paths: Dict[str, Set[str]] = defaultdict(set)
+        # path -> modules it imports
+        self._imports: Dict[str, FrozenSet[str]] = {}
+        # module name, or parent package of one, -> paths of the files importing it
+        self._importers: Dict[str, Set[str]] = defaultdict(set)
+
+    def update_file(self, path: str, source: str):
+        """(Re-)read the imports of a file."""
+        module = _imports.module_name(path)
+        imports = _imports.imported_modules(source, _imports.package_name(path))
+        with self._lock:
+            self._forget(path)
+            self._modules[path] = module
+            self._paths[module].add(path)
+            self._imports[path] = imports
+            for name in imports:
+                for prefix in _imports.prefixes(name):
+                    # e.g. a package importing its own submodules
+                    if prefix != module:
+                        self._importers[prefix].add(path)
+
+    def remove_file(self, path: str):
+        with self._lock:
+            self._forget(path)
+
+    def _forget(self, path):
+        module = self._modules.pop(path, None)
+        if module is None:
+            return
+        paths = self._paths[module]
+        paths.discard(path)
+        if not paths:
+            del self._paths[module]
+        for name in self._imports.pop(path, ()):
+            for prefix in _imports.prefixes(name):
+                importers = self._importers.get(prefix)
+                if importers is not None:
+                    importers.discard(path)
+                    if not importers:
+                        del self._importers[prefix]
+
+    def module_name(self, path: str) -> Optional[str]:
+        """Return the name of the module at path, if it is in the graph."""
+        with self._lock:
+            return self._modules.get(path)
+
+    def module_paths(self, module: str) -> Set[str]:
+        """Return the paths of the files of the workspace named module."""
+        with self._lock:
+            return set(self._paths.get(module, ()))
+
+    def imports(self, path: str) -> FrozenSet[str]:
+        """Return the modules imported by the file at path."""
+        with self._lock:
+            return self._imports.get(path, frozenset())
+
+    def importers(self, module: str, transitive: bool = False) -> Set[str]:
+        """Return the paths of the files of the workspace that import module.
+
+        With ``transitive``, files importing it indirectly are included.
+        """
+        with self._lock:
+            importers = set(self._importers.get(module, ()))
+            if not transitive:
+                return importers
+            queue = deque(importers)
+            while queue:
+                name = self._modules[queue.popleft()]
+                for importer in self._importers.get(name, ()):
+                    if importer not in importers:
+                        importers.add(importer)
+                        queue.append(importer)
+            return importers
+
+    def __contains__(self, path):
+        with self._lock:
+            return path in self._modules
+
+    def __len__(self):
+        with self._lock:
+            return len(self._modules)
@@ -0,0 +1,84 @@
+# Copyright 2021- Python Language Server Contributors.
+
+"""Find the modules imported by Python source code.
+
+Imports are collected from the syntax tree without being resolved, so the
+result is the set of dotted module names the code refers to: for
+``from pkg import name`` both ``pkg`` and ``pkg.name`` are included, since
+``name`` may be a submodule.
+"""
+
+import ast
+import os
+from typing import FrozenSet, Iterable, Optional
+
+from pylsp import _utils
+
+
+def module_name(path: str) -> str:
+    """Return the dotted name of the module at path, without ``__init__``."""
+    name = _utils.path_to_dot_name(path)
+    if name == "__init__" or name.endswith(".__init__"):
+        name = name[: -len("__init__")].rstrip(".")
+    return name
+
+
+def package_name(path: str) -> str:
+    """Return the package relative imports of the module at path are resolved in."""
+    name = module_name(path)
+    if os.path.splitext(os.path.basename(path))[0] == "__init__":
+        return name
+    return name.rpartition(".")[0]
+
+
+def imported_modules(source: str, package: Optional[str] = None) -> FrozenSet[str]:
+    """Return the names of the modules imported by source.
+
+    Relative imports are resolved against ``package``, and skipped if it
+    isn't given. Sources that can't be parsed import nothing.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return frozenset()
+
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                if package is None:
+                    continue
+                parts = package.split(".") if package else []
+                if node.level - 1 > len(parts):
+                    continue
+                base = ".".join(parts[: len(parts) - node.level + 1])
+                if node.module:
+                    base = f"{base}.{node.module}" if base else node.module
+            else:
+                base = node.module
+            if not base:
+                continue
+            modules.add(base)
+            modules.update(
+                f"{base}.{alias.name}" for alias in node.names if alias.name != "*"
+            )
+    return frozenset(modules)
+
+
+def prefixes(name: str) -> Iterable[str]:
+    """Yield ``pkg``, ``pkg.mod`` and ``pkg.mod.name`` for ``pkg.mod.name``."""
+    parts = name.split(".")
+    return (".".join(parts[:i]) for i in range(1, len(parts) + 1))
+
+
+def depends_on(imports: Iterable[str], changed_modules: Iterable[str]) -> bool:
+    """Whether code importing ``imports`` may be affected by the changed modules.
+
+    Importing a module also runs its parent packages, so a change to a
+    package affects the importers of its submodules. Modules only imported
+    indirectly aren't taken into account.
+    """
+    changed = set(changed_modules)
+    return any(prefix in changed for name in imports for prefix in prefixes(name))
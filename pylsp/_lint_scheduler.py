@@ -0,0 +1,165 @@
+# Copyright 2021- Python Language Server Contributors.
+
+"""Lint the files of a workspace in the background.
+
+Open files are linted as soon as they change. The other files are queued and
+linted by a small pool of worker threads, in order of priority: files that
+were just edited first, then files depending on changed files and finally the
+rest of the workspace, most recently modified first. Workers step aside while
+interactive requests (e.g. completions) are being handled, and can be limited
+to a fraction of their time to keep the load of the machine down.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+PRIORITY_EDITED = 0
+PRIORITY_DEPENDENT = 1
+PRIORITY_WORKSPACE = 2
+
+# How long workers keep waiting after the last interactive request finished
+INTERACTIVE_PAUSE_S = 0.3
+
+
+class LintScheduler:
+    """A priority queue of files to lint, drained by background workers."""
+
+    def __init__(
+        self,
+        lint: Callable[[str], None],
+        report_progress: Callable,
+        max_workers: int = 1,
+        cpu_limit: float = 1.0,
+    ):
+        """
+        Args:
+            lint: Called with the uri of each file to lint.
+            report_progress: ``Workspace.report_progress`` of the workspace
+                the progress of busy workers is reported with.
+            max_workers: Number of worker threads.
+            cpu_limit: Fraction of the time workers spend linting. After each
+                file they sleep long enough to stay below it.
+        """
+        self._lint = lint
+        self._report_progress = report_progress
+        self.max_workers = max_workers
+        self.cpu_limit = cpu_limit
+        self._condition = threading.Condition()
+        # (priority, -mtime, sequence, uri)
+        self._queue = []
+        # uri -> (priority, -mtime) of its best entry in the queue
+        self._queued: Dict[str, Tuple[int, float]] = {}
+        self._sequence = itertools.count()
+        self._interactive = 0
+        self._interactive_until = 0.0
+        self._workers = []
+        # Incremented when stopping, so that workers of earlier runs exit
+        self._generation = 0
+
+    @property
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._queued)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self):
+        with self._condition:
+            while len(self._workers) < self.max_workers:
+                worker = threading.Thread(
+                    target=self._work, args=(self._generation,), daemon=True
+                )
+                self._workers.append(worker)
+                worker.start()
+
+    def stop(self):
+        """Drop the queue and have the workers exit after their current file."""
+        with self._condition:
+            self._generation += 1
+            self._workers = []
+            self._queue = []
+            self._queued.clear()
+            self._condition.notify_all()
+
+    def schedule(self, doc_uri: str, priority: int, mtime: float = 0.0):
+        """Queue a file, or raise the priority it is already queued with.
+
+        Among files of the same priority, the most recently modified (by
+        ``mtime``) are linted first.
+        """
+        key = (priority, -mtime)
+        with self._condition:
+            queued = self._queued.get(doc_uri)
+            if queued is not None and queued <= key:
+                return
+            self._queued[doc_uri] = key
+            heapq.heappush(self._queue, (*key, next(self._sequence), doc_uri))
+            self._condition.notify()
+
+    def unschedule(self, doc_uri: str):
+        with self._condition:
+            # The entry is skipped when popped from the queue
+            self._queued.pop(doc_uri, None)
+
+    @contextmanager
+    def interactive(self):
+        """Pause the workers while handling a request the user waits for."""
+        with self._condition:
+            self._interactive += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._interactive -= 1
+                self._interactive_until = time.monotonic() + INTERACTIVE_PAUSE_S
+                self._condition.notify_all()
+
+    def _next(self, generation: int, block: bool) -> Optional[str]:
+        """Wait for a file to lint, returning None once stopped (or empty)."""
+        with self._condition:
+            while generation == self._generation:
+                paused_for = self._interactive_until - time.monotonic()
+                if self._interactive or paused_for > 0:
+                    self._condition.wait(None if self._interactive else paused_for)
+                    continue
+                while self._queue:
+                    priority, mtime, _sequence, doc_uri = heapq.heappop(self._queue)
+                    if self._queued.get(doc_uri) == (priority, mtime):
+                        del self._queued[doc_uri]
+                        return doc_uri
+                if not block:
+                    return None
+                self._condition.wait()
+            return None
+
+    def _work(self, generation):
+        while True:
+            doc_uri = self._next(generation, block=True)
+            if doc_uri is None:
+                return
+            # Report progress with one token while there are files to lint.
+            with self._report_progress(
+                "lint workspace", aggregate=True
+            ) as progress_message:
+                while doc_uri is not None:
+                    progress_message(f"{self.pending} files left")
+                    self._lint_file(doc_uri)
+                    doc_uri = self._next(generation, block=False)
+
+    def _lint_file(self, doc_uri):
+        start = time.monotonic()
+        try:
+            self._lint(doc_uri)
+        except Exception:
+            log.exception("Failed to lint %s in the background", doc_uri)
+        if 0 < self.cpu_limit < 1:
+            time.sleep((time.monotonic() - start) * (1 / self.cpu_limit - 1))
@@ -0,0 +1,233 @@
+# Copyright 2021- Python Language Server Contributors.
+
+"""Latency histograms of the requests and plugins of the servers in a process.
+
+``METRICS`` records how long each LSP method, hook, plugin and lint pass
+takes, in buckets like Prometheus histograms, along with gauges such as the
+number of requests waiting for a worker. It is shown by the
+``pylsp.metrics`` command, can be served over HTTP in the Prometheus text
+format (``--metrics-port``) and logged periodically (``--metrics-log-interval``).
+"""
+
+import bisect
+import json
+import logging
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+log = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    float("inf"),
+)
+
+# metric -> (help text, label names)
+METRIC_LABELS = {
+    "request": ("Time spent handling LSP requests and notifications", ("method",)),
+    "hook": ("Time spent in all implementations of a plugin hook", ("hook",)),
+    "plugin": ("Time spent in the hooks of a plugin", ("plugin", "hook")),
+    "lint": ("Time spent linting a document", ()),
+}
+
+
+class Histogram:
+    """Counts of observations in buckets, with their sum and maximum."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile, interpolating within its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = min(BUCKETS[i], self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (metric, label values) -> histogram
+        self._histograms: Dict[Tuple[str, Tuple[str, ...]], Histogram] = {}
+        # gauge -> weak methods returning its value for one server
+        self._gauges: Dict[str, list] = {}
+
+    def observe(self, metric: str, labels: Sequence[str], seconds: float):
+        key = (metric, tuple(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, metric: str, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(metric, labels, time.perf_counter() - start)
+
+    def timed_function(self, func: Callable, metric: str, *labels: str) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.timed(metric, *labels):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def add_gauge(self, name: str, method: Callable[[], int]):
+        """Add the value of a bound method to a gauge, while its object lives."""
+        with self._lock:
+            self._gauges.setdefault(name, []).append(weakref.WeakMethod(method))
+
+    def gauges(self) -> Dict[str, int]:
+        values = {}
+        with self._lock:
+            for name, methods in self._gauges.items():
+                methods[:] = [method for method in methods if method() is not None]
+                values[name] = sum(method()() for method in methods if method())
+        return values
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self) -> dict:
+        """Return the summaries of the histograms, by metric and labels."""
+        with self._lock:
+            histograms = [
+                (metric, labels, histogram.summary())
+                for (metric, labels), histogram in sorted(self._histograms.items())
+            ]
+        snapshot = {metric: {} for metric in METRIC_LABELS}
+        for metric, labels, summary in histograms:
+            node = snapshot.setdefault(metric, {})
+            if not labels:
+                snapshot[metric] = summary
+                continue
+            for label in labels[:-1]:
+                node = node.setdefault(label, {})
+            node[labels[-1]] = summary
+        snapshot["gauges"] = self.gauges()
+        return snapshot
+
+    def prometheus(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = sorted(
+                (key, list(histogram.counts), histogram.count, histogram.sum)
+                for key, histogram in self._histograms.items()
+            )
+        lines = []
+        for metric, (help_text, label_names) in METRIC_LABELS.items():
+            name = f"pylsp_{metric}_seconds"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (key_metric, labels), counts, count, total in histograms:
+                if key_metric != metric:
+                    continue
+                label_text = ",".join(
+                    f"{label}={json.dumps(value)}"
+                    for label, value in zip(label_names, labels)
+                )
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS, counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = ",".join(filter(None, [label_text, f'le="{le}"']))
+                    lines.append(f"{name}_bucket{{{bucket_labels}}} {cumulative}")
+                braces = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{name}_sum{braces} {total}")
+                lines.append(f"{name}_count{braces} {count}")
+        for name, value in sorted(self.gauges().items()):
+            lines.append(f"# TYPE pylsp_{name} gauge")
+            lines.append(f"pylsp_{name} {value}")
+        lines.append("")
+        return "\n".join(lines)
+
+
+METRICS = Metrics()
+
+
+def serve_prometheus(host: str, port: int):
+    """Serve the metrics over HTTP in a background thread."""
+    # Only imported when asked for, to keep the server quick to start
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class PrometheusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            body = METRICS.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            log.debug(format, *args)
+
+    server = ThreadingHTTPServer((host, port), PrometheusHandler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="pylsp-metrics", daemon=True
+    ).start()
+    log.info("Serving metrics on (%s, %s)", host, server.server_address[1])
+    return server
+
+
+def log_periodically(interval: float, stop: Optional[threading.Event] = None):
+    """Log a summary of the metrics every interval seconds in a background thread."""
+    stop = stop or threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            log.info("Metrics: %s", json.dumps(METRICS.snapshot()))
+
+    threading.Thread(target=run, name="pylsp-metrics-log", daemon=True).start()
+    return stop
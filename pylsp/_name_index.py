@@ -0,0 +1,93 @@
+# Copyright 2021- Python Language Server Contributors.
+
+"""An index of the identifiers found in the Python files of a workspace.
+
+The index maps every identifier to the files, and positions within them, where
+it occurs. It is only a textual pre-filter: it does not know whether two
+occurrences of the same identifier refer to the same object. Its purpose is to
+let features like references and rename ask Jedi or Rope to confirm a handful
+of candidate files instead of having them search the whole project.
+"""
+
+import keyword
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pylsp._file_indexer import FileIndex
+
+RE_IDENTIFIER = re.compile(r"[^\W\d]\w*")
+
+Position = Tuple[int, int]
+
+
+def find_names(source: str) -> Dict[str, List[Position]]:
+    """Return the zero-based (line, character) positions of every identifier.
+
+    Keywords are skipped. Identifiers in comments and strings are included, as
+    they are harmless for a candidate index and scanning with a regex is much
+    cheaper than tokenizing.
+    """
+    names = defaultdict(list)
+    for line_number, line in enumerate(source.splitlines()):
+        for match in RE_IDENTIFIER.finditer(line):
+            name = match.group(0)
+            if not keyword.iskeyword(name):
+                names[name].append((line_number, match.start()))
+    return names
+
+
+class NameIndex(FileIndex):
+    """Map identifiers to the files and positions they occur at under a root."""
+
+    def __init__(self, root_path: str, exclude: Optional[List[str]] = None):
+        super().__init__(root_path, exclude)
+        self._lock = threading.RLock()
+        # path -> name -> positions
+        self._occurrences: Dict[str, Dict[str, List[Position]]] = {}
+        # name -> paths
+        self._paths_by_name: Dict[str, Set[str]] = defaultdict(set)
+
+    def update_file(self, path: str, source: str):
+        """(Re-)index a file."""
+        occurrences = find_names(source)
+        with self._lock:
+            self._forget(path)
+            self._occurrences[path] = occurrences
+            for name in occurrences:
+                self._paths_by_name[name].add(path)
+
+    def remove_file(self, path: str):
+        with self._lock:
+            self._forget(path)
+
+    def _forget(self, path):
+        for name in self._occurrences.pop(path, {}):
+            paths = self._paths_by_name.get(name)
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self._paths_by_name[name]
+
+    def files_for(self, names: Iterable[str]) -> Set[str]:
+        """Return the indexed files that contain any of the given identifiers."""
+        with self._lock:
+            return set().union(*(self._paths_by_name.get(name, ()) for name in names))
+
+    def candidates(self, names: Iterable[str]) -> Dict[str, List[Position]]:
+        """Return the positions of the given identifiers, grouped by file."""
+        result = defaultdict(list)
+        with self._lock:
+            for name in names:
+                for path in self._paths_by_name.get(name, ()):
+                    result[path].extend(self._occurrences[path][name])
+        return dict(result)
+
+    def __contains__(self, path):
+        with self._lock:
+            return path in self._occurrences
+
+    def __len__(self):
+        with self._lock:
+            return len(self._occurrences)
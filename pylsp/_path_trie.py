@@ -0,0 +1,99 @@
+# Copyright 2021- Python Language Server Contributors.
+
+"""Find which of many root directories a URI belongs to.
+
+Workspace folders are kept in a trie of their path components, so that
+resolving a document URI to its workspace takes time proportional to the
+depth of the document rather than to the number of workspace folders.
+Results are memoized per URI.
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+# Number of URIs whose root is memoized
+MAX_CACHED = 4096
+
+
+def split_uri(uri: str) -> List[str]:
+    """Return the path components of a file URI or path."""
+    parts = [part for part in uri.replace("\\", "/").split("/") if part]
+    if parts and parts[0] == "file:":
+        # Match file URIs and plain paths alike
+        del parts[0]
+    return parts
+
+
+class _Node:
+    __slots__ = ("children", "root")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # The root URI ending at this node, if any
+        self.root: Optional[str] = None
+
+
+class PathTrie:
+    """A set of root URIs, matching URIs to the deepest root containing them."""
+
+    def __init__(self, max_cached: int = MAX_CACHED):
+        self._lock = threading.Lock()
+        self._root = _Node()
+        self._max_cached = max_cached
+        self._cache: Dict[str, Optional[str]] = {}
+
+    def add(self, root_uri: str):
+        with self._lock:
+            node = self._root
+            for part in split_uri(root_uri):
+                node = node.children.setdefault(part, _Node())
+            node.root = root_uri
+            self._cache.clear()
+
+    def remove(self, root_uri: str):
+        parts = split_uri(root_uri)
+        with self._lock:
+            nodes = [self._root]
+            for part in parts:
+                node = nodes[-1].children.get(part)
+                if node is None:
+                    return
+                nodes.append(node)
+            if nodes[-1].root != root_uri:
+                return
+            nodes[-1].root = None
+            # Prune the branch if no other root is below it
+            for depth in range(len(parts), 0, -1):
+                node = nodes[depth]
+                if node.children or node.root is not None:
+                    break
+                del nodes[depth - 1].children[parts[depth - 1]]
+            self._cache.clear()
+
+    def clear(self):
+        with self._lock:
+            self._root = _Node()
+            self._cache.clear()
+
+    def match(self, uri: Optional[str]) -> Optional[str]:
+        """Return the deepest root containing uri, or None."""
+        if uri is None:
+            return None
+        try:
+            return self._cache[uri]
+        except KeyError:
+            pass
+
+        with self._lock:
+            node = self._root
+            match = node.root
+            for part in split_uri(uri):
+                node = node.children.get(part)
+                if node is None:
+                    break
+                if node.root is not None:
+                    match = node.root
+            if len(self._cache) >= self._max_cached:
+                self._cache.clear()
+            self._cache[uri] = match
+        return match
@@ -0,0 +1,244 @@
+# Copyright 2021- Python Language Server Contributors.
+
+"""Profile the requests or plugins of the running servers of a process.
+
+``PROFILER`` is started and stopped with the ``pylsp.startProfiling`` and
+``pylsp.stopProfiling`` commands. While it runs, it profiles the threads that
+handle LSP requests or call plugins, either all of them or only the ones of
+one LSP method or plugin:
+
+- ``cprofile`` mode traces every call with cProfile, and writes a pstats file.
+- ``sample`` mode looks at the stacks of those threads every ``interval``
+  seconds instead, which is cheaper, and writes them in the collapsed stack
+  format of flame graph tools.
+"""
+
+import cProfile
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from functools import wraps
+from typing import Callable, Optional
+
+log = logging.getLogger(__name__)
+
+MODES = ("cprofile", "sample")
+# Seconds between two samples of the stacks
+SAMPLE_INTERVAL = 0.005
+
+_NOT_PROFILED = nullcontext()
+
+
+class _Scope:
+    """Profiles the current thread while in a request or plugin."""
+
+    __slots__ = ("_profiler", "_session")
+
+    def __init__(self, profiler, session):
+        self._profiler = profiler
+        self._session = session
+
+    def __enter__(self):
+        self._profiler._local.profiled = True
+        self._session.enter()
+
+    def __exit__(self, *exc_info):
+        try:
+            self._session.exit()
+        finally:
+            self._profiler._local.profiled = False
+
+
+class _CProfileSession:
+    suffix = ".pstats"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = None
+
+    def enter(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active in this thread
+            profile = None
+        self._local.profile = profile
+
+    def exit(self):
+        profile = self._local.profile
+        if profile is None:
+            return
+        profile.disable()
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+    def stop(self):
+        pass
+
+    def write(self, path):
+        with self._lock:
+            if self._stats is None:
+                return False
+            self._stats.dump_stats(path)
+        return True
+
+
+class _SamplingSession:
+    suffix = ".collapsed"
+
+    def __init__(self, interval):
+        self._interval = interval
+        self._lock = threading.Lock()
+        # ident -> how many scopes the thread is in
+        self._threads = Counter()
+        # collapsed stack -> times it was sampled
+        self._stacks = Counter()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._sample, name="pylsp-profiler", daemon=True
+        )
+        self._sampler.start()
+
+    def enter(self):
+        with self._lock:
+            self._threads[threading.get_ident()] += 1
+
+    def exit(self):
+        with self._lock:
+            self._threads[threading.get_ident()] -= 1
+            self._threads += Counter()  # Drops the threads that left
+
+    def _sample(self):
+        while not self._stopped.wait(self._interval):
+            frames = sys._current_frames()  # pylint: disable=protected-access
+            with self._lock:
+                for ident in self._threads:
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        self._stacks[_collapse(frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self._sampler.join()
+
+    def write(self, path):
+        with self._lock:
+            if not self._stacks:
+                return False
+            with open(path, "w", encoding="utf-8") as file:
+                for stack, count in self._stacks.most_common():
+                    file.write(f"{stack} {count}\n")
+        return True
+
+
+def _collapse(frame) -> str:
+    """Return the stack of frame, outermost call first and separated by ";"."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # (session, options) while profiling
+        self._active = None
+
+    def status(self) -> dict:
+        active = self._active
+        if active is None:
+            return {"active": False}
+        return {"active": True, **active[1]}
+
+    def start(
+        self,
+        directory: str,
+        mode: str = "cprofile",
+        method: Optional[str] = None,
+        plugin: Optional[str] = None,
+        interval: float = SAMPLE_INTERVAL,
+    ) -> bool:
+        """Start profiling, unless it already is. Scoped to method or plugin if given."""
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r}, use one of {MODES}")
+        with self._lock:
+            if self._active is not None:
+                return False
+            options = {
+                "mode": mode,
+                "method": method,
+                "plugin": plugin,
+                "directory": directory,
+            }
+            if mode == "sample":
+                session = _SamplingSession(interval)
+            else:
+                session = _CProfileSession()
+            self._active = (session, options)
+        log.info("Started profiling: %s", options)
+        return True
+
+    def stop(self) -> Optional[str]:
+        """Stop profiling, and return the path of the profile if anything was profiled."""
+        with self._lock:
+            active, self._active = self._active, None
+        if active is None:
+            return None
+        session, options = active
+        session.stop()
+
+        scope = options["method"] or options["plugin"] or "all"
+        name = "pylsp-{}-{}-{}{}".format(
+            os.getpid(),
+            time.strftime("%Y%m%d-%H%M%S"),
+            re.sub(r"[^\w.-]", "_", scope),
+            session.suffix,
+        )
+        os.makedirs(options["directory"], exist_ok=True)
+        path = os.path.join(options["directory"], name)
+        if not session.write(path):
+            log.info("Stopped profiling, nothing was profiled")
+            return None
+        log.info("Stopped profiling, wrote %s", path)
+        return path
+
+    def scope(self, kind: str, name: str):
+        """Return a context manager profiling the current thread if kind and name match.
+
+        kind is "method" for LSP methods and "plugin" for plugins.
+        """
+        active = self._active
+        if active is None or getattr(self._local, "profiled", False):
+            return _NOT_PROFILED
+        session, options = active
+        if options["method"] or options["plugin"]:
+            if options.get(kind) != name:
+                return _NOT_PROFILED
+        return _Scope(self, session)
+
+    def scoped_function(self, func: Callable, kind: str, name: str) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.scope(kind, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+PROFILER = Profiler()
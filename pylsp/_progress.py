@@ -0,0 +1,217 @@
+# Copyright 2021- Python Language Server Contributors.
+
+"""Non-blocking reporting of work done progress to the client.
+
+Progress tokens have to be created with a ``window/workDoneProgress/create``
+request before being used. Instead of waiting for the client's response on
+the calling thread, notifications for a token are queued until the client
+acknowledged it, and tokens can be created ahead of time so that progress is
+usually reported right away. Report notifications are rate limited, keeping
+only the latest report of each interval.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Generator, List, Optional
+
+log = logging.getLogger(__name__)
+
+M_PROGRESS = "$/progress"
+M_INITIALIZE_PROGRESS = "window/workDoneProgress/create"
+
+# Minimum time between two report notifications for the same token
+REPORT_INTERVAL_S = 0.1
+
+
+class Progress:
+    """The state of a single progress token."""
+
+    def __init__(self, token: str, ready: bool):
+        self.token = token
+        # Whether the client acknowledged the token
+        self.ready = ready
+        # Values waiting for the token to be acknowledged
+        self.queue: List[dict] = []
+        self.last_report = 0.0
+        self.pending_report: Optional[dict] = None
+
+
+class ProgressMultiplexer:
+    """Create progress tokens and send their notifications without blocking."""
+
+    def __init__(self, endpoint, report_interval: float = REPORT_INTERVAL_S):
+        self._endpoint = endpoint
+        self._report_interval = report_interval
+        self._lock = threading.RLock()
+        # Tokens created ahead of time and acknowledged by the client
+        self._tokens: List[str] = []
+        self._pool_size = 0
+        # The aggregating progress of the current thread, see `progress`
+        self._local = threading.local()
+
+    def preallocate(self, count: int):
+        """Keep ``count`` tokens created ahead of time."""
+        with self._lock:
+            missing = count - self._pool_size
+            self._pool_size = count
+        for _ in range(missing):
+            self._create_token(str(uuid.uuid4()), self._add_to_pool)
+
+    def _create_token(self, token: str, on_created: Callable):
+        future = self._endpoint.request(M_INITIALIZE_PROGRESS, {"token": token})
+        future.add_done_callback(lambda f: on_created(token, f))
+
+    def _add_to_pool(self, token, future):
+        if future.exception() is None:
+            with self._lock:
+                self._tokens.append(token)
+        else:
+            log.debug("Failed to create progress token", exc_info=future.exception())
+
+    def begin(
+        self,
+        title: str,
+        message: Optional[str] = None,
+        percentage: Optional[int] = None,
+        skip_token_initialization: bool = False,
+    ) -> Progress:
+        with self._lock:
+            token = self._tokens.pop() if self._tokens else None
+
+        if token is not None:
+            progress = Progress(token, ready=True)
+            # Replace the token taken from the pool
+            self._create_token(str(uuid.uuid4()), self._add_to_pool)
+        elif skip_token_initialization:
+            progress = Progress(str(uuid.uuid4()), ready=True)
+        else:
+            progress = Progress(str(uuid.uuid4()), ready=False)
+            self._create_token(
+                progress.token, lambda _token, f: self._on_created(progress, f)
+            )
+
+        value = {"kind": "begin", "title": title}
+        if message is not None:
+            value["message"] = message
+        if percentage is not None:
+            value["percentage"] = percentage
+        self._send(progress, value)
+        return progress
+
+    def _on_created(self, progress, future):
+        if future.exception() is not None:
+            # Many editors still show progress for tokens they didn't create.
+            log.warning(
+                "There was an error while trying to initialize progress reporting.",
+                exc_info=future.exception(),
+            )
+        with self._lock:
+            progress.ready = True
+            queue, progress.queue = progress.queue, []
+            for value in queue:
+                self._notify(progress, value)
+
+    def report(
+        self,
+        progress: Progress,
+        message: Optional[str] = None,
+        percentage: Optional[int] = None,
+    ):
+        value = {"kind": "report"}
+        if message:
+            value["message"] = message
+        if percentage:
+            value["percentage"] = percentage
+
+        now = time.monotonic()
+        with self._lock:
+            if now - progress.last_report < self._report_interval:
+                progress.pending_report = value
+                return
+            progress.last_report = now
+            progress.pending_report = None
+        self._send(progress, value)
+
+    def end(self, progress: Progress, message: Optional[str] = None):
+        with self._lock:
+            pending, progress.pending_report = progress.pending_report, None
+        if pending is not None:
+            self._send(progress, pending)
+
+        value = {"kind": "end"}
+        if message:
+            value["message"] = message
+        self._send(progress, value)
+
+    def _send(self, progress, value):
+        with self._lock:
+            if not progress.ready:
+                progress.queue.append(value)
+                return
+            self._notify(progress, value)
+
+    def _notify(self, progress, value):
+        self._endpoint.notify(
+            M_PROGRESS, params={"token": progress.token, "value": value}
+        )
+
+    def bind(self, func: Callable) -> Callable:
+        """Return ``func`` wrapped to run in the aggregating progress of this thread.
+
+        Allows progress reported by work handed to other threads to be
+        aggregated as well.
+        """
+        parent = getattr(self._local, "progress", None)
+
+        def bound(*args, **kwargs):
+            previous = getattr(self._local, "progress", None)
+            self._local.progress = parent
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.progress = previous
+
+        return bound
+
+    @contextmanager
+    def progress(
+        self,
+        title: str,
+        message: Optional[str] = None,
+        percentage: Optional[int] = None,
+        skip_token_initialization: bool = False,
+        aggregate: bool = False,
+    ) -> Generator[Callable[[str, Optional[int]], None], None, None]:
+        """Report the progress of the work done within the context.
+
+        With ``aggregate``, progress reported by nested calls on the same
+        thread is sent as reports of this progress rather than with tokens of
+        their own, e.g. to have one token per lint pass instead of one per
+        linter.
+        """
+        parent = getattr(self._local, "progress", None)
+        if parent is not None:
+            self.report(parent, title if message is None else f"{title}: {message}")
+
+            def parent_message(message: str, percentage: Optional[int] = None):
+                self.report(parent, f"{title}: {message}", percentage)
+
+            yield parent_message
+            return
+
+        progress = self.begin(title, message, percentage, skip_token_initialization)
+
+        def progress_message(message: str, percentage: Optional[int] = None):
+            self.report(progress, message, percentage)
+
+        if aggregate:
+            self._local.progress = progress
+        try:
+            yield progress_message
+        finally:
+            if aggregate:
+                self._local.progress = None
+            self.end(progress)
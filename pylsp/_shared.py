@@ -0,0 +1,73 @@
+# Copyright 2021- Python Language Server Contributors.
+
+"""State that is expensive to create and shared by all servers in a process.
+
+A TCP server started with ``--multi-client`` runs a ``PythonLSPServer`` per
+connection in the same process. Their workspaces, documents and configuration
+are kept apart, but what only depends on the machine is created once:
+
+* jedi environments, by path and environment variables;
+* rope autoimport databases, by project root and rope settings, which hold
+  the index of the names in installed modules.
+
+Preloaded modules (see the ``preload`` plugin) and the modules jedi and parso
+parse are cached in the process already, and so are shared as well.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List
+
+import jedi
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+# (path, environment variables) -> jedi environment
+_environments: Dict[Hashable, Any] = {}
+
+# key -> [autoimport, number of workspaces using it]
+_autoimports: Dict[Hashable, List] = {}
+
+
+def jedi_environment(path: str, env_vars=None):
+    """Return the jedi environment of the Python interpreter at path."""
+    key = (path, frozenset((env_vars or {}).items()))
+    with _lock:
+        environment = _environments.get(key)
+    if environment is None:
+        # Creating an environment runs the interpreter, don't block others
+        environment = jedi.api.environment.create_environment(
+            path=path, safe=False, env_vars=env_vars
+        )
+        with _lock:
+            environment = _environments.setdefault(key, environment)
+    return environment
+
+
+def acquire_autoimport(key: Hashable, create: Callable[[], Any]):
+    """Return the autoimport database for key, creating it if nobody uses it.
+
+    Every call must be matched with a call to release_autoimport.
+    """
+    with _lock:
+        entry = _autoimports.get(key)
+        if entry is None:
+            log.debug("Creating autoimport database for %s", key)
+            entry = _autoimports[key] = [create(), 0]
+        entry[1] += 1
+        return entry[0]
+
+
+def release_autoimport(key: Hashable):
+    """Close the autoimport database for key once nobody uses it anymore."""
+    with _lock:
+        entry = _autoimports.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del _autoimports[key]
+    entry[0].close()
@@ -1,11 +1,11 @@
 # Copyright 2017-2020 Palantir Technologies, Inc.
 # Copyright 2021- Python Language Server Contributors.
 
+import fnmatch
 import functools
 import inspect
 import logging
 import os
-import pathlib
 import re
 import threading
 import time
@@ -21,11 +21,24 @@ JEDI_VERSION = jedi.__version__
 EOL_CHARS = ["\r\n", "\r", "\n"]
 EOL_REGEX = re.compile(f'({"|".join(EOL_CHARS)})')
 
+# Directories that never contain workspace sources worth indexing or linting
+SKIPPED_DIRECTORIES = {"__pycache__", "node_modules", "site-packages", "venv"}
+
+# Maximum number of directories whose package status is cached
+MAX_CACHED_PACKAGE_DIRS = 65536
+
+# directory -> whether it contains an __init__.py
+_PACKAGE_DIRS = {}
+
 log = logging.getLogger(__name__)
 
 
 def debounce(interval_s, keyed_by=None):
-    """Debounce calls to this function until interval_s seconds have passed."""
+    """Debounce calls to this function until interval_s seconds have passed.
+
+    Calls are debounced separately for each value of the argument named
+    keyed_by, or for each combination of values if it is a tuple of names.
+    """
 
     def wrapper(func):
         timers = {}
@@ -35,7 +48,12 @@ def debounce(interval_s, keyed_by=None):
         def debounced(*args, **kwargs):
             sig = inspect.signature(func)
             call_args = sig.bind(*args, **kwargs)
-            key = call_args.arguments[keyed_by] if keyed_by else None
+            if keyed_by is None:
+                key = None
+            elif isinstance(keyed_by, str):
+                key = call_args.arguments[keyed_by]
+            else:
+                key = tuple(call_args.arguments[name] for name in keyed_by)
 
             def run():
                 with lock:
@@ -110,36 +128,90 @@ def find_parents(root, path, names):
     return []
 
 
+def find_python_files(root, exclude=None, extensions=(".py", ".pyi")):
+    """Yield the paths of all Python files found under root.
+
+    Hidden directories and those in SKIPPED_DIRECTORIES are not visited.
+
+    Args:
+        root (str): The directory to walk.
+        exclude (List[str]): Glob patterns, matched against the path relative
+            to root, of files and directories to skip.
+        extensions (Tuple[str]): File extensions to look for.
+    """
+    exclude = exclude or []
+
+    def is_excluded(path):
+        rel_path = os.path.relpath(path, root)
+        return any(
+            fnmatch.fnmatch(rel_path, pattern)
+            or fnmatch.fnmatch(os.path.basename(path), pattern)
+            for pattern in exclude
+        )
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [
+            dirname
+            for dirname in dirnames
+            if not dirname.startswith(".")
+            and dirname not in SKIPPED_DIRECTORIES
+            and not is_excluded(os.path.join(dirpath, dirname))
+        ]
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if filename.endswith(extensions) and not is_excluded(path):
+                yield path
+
+
+def is_package_dir(directory):
+    """Whether directory contains an ``__init__.py``.
+
+    Answers are cached, as documents are created often and stat'ing every
+    parent directory each time is slow on network filesystems. Call
+    invalidate_package_dirs when files change on disk.
+    """
+    try:
+        return _PACKAGE_DIRS[directory]
+    except KeyError:
+        pass
+    is_package = os.path.exists(os.path.join(directory, "__init__.py"))
+    if len(_PACKAGE_DIRS) >= MAX_CACHED_PACKAGE_DIRS:
+        _PACKAGE_DIRS.clear()
+    _PACKAGE_DIRS[directory] = is_package
+    return is_package
+
+
+def invalidate_package_dirs(path):
+    """Forget what is cached about the packages affected by a change to path.
+
+    path is either an ``__init__.py`` or a directory, whose subdirectories are
+    forgotten as well. Other files don't affect packages.
+    """
+    basename = os.path.basename(path)
+    if basename == "__init__.py":
+        _PACKAGE_DIRS.pop(os.path.dirname(path), None)
+    elif not os.path.splitext(basename)[1]:
+        for directory in list(_PACKAGE_DIRS):
+            if is_subpath(directory, path):
+                _PACKAGE_DIRS.pop(directory, None)
+
+
 def path_to_dot_name(path):
     """Given a path to a module, derive its dot-separated full name."""
     directory = os.path.dirname(path)
     module_name, _ = os.path.splitext(os.path.basename(path))
     full_name = [module_name]
-    while os.path.exists(os.path.join(directory, "__init__.py")):
+    while is_package_dir(directory):
         this_directory = os.path.basename(directory)
         directory = os.path.dirname(directory)
         full_name = [this_directory] + full_name
     return ".".join(full_name)
 
 
-def match_uri_to_workspace(uri, workspaces):
-    if uri is None:
-        return None
-    max_len, chosen_workspace = -1, None
-    path = pathlib.Path(uri).parts
-    for workspace in workspaces:
-        workspace_parts = pathlib.Path(workspace).parts
-        if len(workspace_parts) > len(path):
-            continue
-        match_len = 0
-        for workspace_part, path_part in zip(workspace_parts, path):
-            if workspace_part == path_part:
-                match_len += 1
-        if match_len > 0:
-            if match_len > max_len:
-                max_len = match_len
-                chosen_workspace = workspace
-    return chosen_workspace
+def is_subpath(path, directory):
+    """Whether path is directory or inside it."""
+    directory = directory.rstrip(os.sep)
+    return path == directory or path.startswith(directory + os.sep)
 
 
 def list_to_string(value):
@@ -3,6 +3,8 @@
 
 import logging
 import sys
+import threading
+from collections import defaultdict
 from functools import lru_cache
 from typing import List, Mapping, Sequence, Union
 
@@ -10,6 +12,10 @@ import pluggy
 from pluggy._hooks import HookImpl
 
 from pylsp import PYLSP, _utils, hookspecs, uris
+from pylsp._metrics import METRICS
+from pylsp._profiler import PROFILER
+
+from .plugin_manifest import PLUGINS
 
 # See compatibility note on `group` keyword:
 #   https://docs.python.org/3/library/importlib.metadata.html#entry-points
@@ -36,11 +42,31 @@ class PluginManager(pluggy.PluginManager):
         # called from all hookcaller instances.
         # enable_tracing will set its own wrapping function at self._inner_hookexec
         try:
-            return self._inner_hookexec(hook_name, methods, kwargs, firstresult)
+            with METRICS.timed("hook", hook_name):
+                return self._inner_hookexec(hook_name, methods, kwargs, firstresult)
         except Exception as e:
             log.warning(f"Failed to load hook {hook_name}: {e}", exc_info=True)
             return []
 
+    def register(self, plugin, name=None):
+        plugin_name = super().register(plugin, name)
+        if plugin_name is None:
+            return None
+        # Time and profile each hook implementation of the plugin on its own.
+        # Wrappers are generators that are timed as part of the hooks they wrap.
+        for hook_caller in self.get_hookcallers(plugin) or []:
+            for hook_impl in hook_caller.get_hookimpls():
+                if hook_impl.plugin is plugin and not (
+                    hook_impl.wrapper or hook_impl.hookwrapper
+                ):
+                    function = PROFILER.scoped_function(
+                        hook_impl.function, "plugin", plugin_name
+                    )
+                    hook_impl.function = METRICS.timed_function(
+                        function, "plugin", plugin_name, hook_caller.name
+                    )
+        return plugin_name
+
 
 class Config:
     def __init__(self, root_uri, init_opts, process_id, capabilities):
@@ -72,25 +98,29 @@ class Config:
         self._pm.enable_tracing()
         self._pm.add_hookspecs(hookspecs)
 
-        # Pluggy will skip loading a plugin if it throws a DistributionNotFound exception.
-        # However I don't want all plugins to have to catch ImportError and re-throw. So here we'll filter
-        # out any entry points that throw ImportError assuming one or more of their dependencies isn't present.
+        # The plugins shipped with pylsp are only imported once one of the hooks
+        # they implement is called while they are enabled, see load_plugins.
+        # Their hooks and settings are known from the manifest in the meantime.
+        self._lazy_plugins_lock = threading.Lock()
+        # name -> entry point
+        self._lazy_plugins = {}
+        # hook name -> names of the lazy plugins implementing it
+        self._lazy_hooks = defaultdict(list)
+
         for entry_point in entry_points(group=PYLSP):
-            try:
-                entry_point.load()
-            except Exception as e:
-                log.info(
-                    "Failed to load %s entry point '%s': %s", PYLSP, entry_point.name, e
+            name = entry_point.name
+            if self._pm.has_plugin(name) or name in self._lazy_plugins:
+                continue
+            manifest = PLUGINS.get(name)
+            if manifest is not None and manifest["module"] == entry_point.value:
+                self._lazy_plugins[name] = entry_point
+                for hook_name in manifest["hooks"]:
+                    self._lazy_hooks[hook_name].append(name)
+                self._plugin_settings = _utils.merge_dicts(
+                    self._plugin_settings, manifest.get("settings", {})
                 )
-                self._pm.set_blocked(entry_point.name)
-
-        # Load the entry points into pluggy, having blocked any failing ones.
-        # Despite the API name, recent Pluggy versions will use ``importlib_metadata``.
-        self._pm.load_setuptools_entrypoints(PYLSP)
-
-        for name, plugin in self._pm.list_name_plugin():
-            if plugin is not None:
-                log.info("Loaded pylsp plugin %s from %s", name, plugin)
+            else:
+                self._load_plugin(entry_point)
 
         for plugin_conf in self._pm.hook.pylsp_settings(config=self):
             self._plugin_settings = _utils.merge_dicts(
@@ -103,6 +133,44 @@ class Config:
 
         self._update_disabled_plugins()
 
+    def _load_plugin(self, entry_point):
+        # Plugins whose dependencies aren't installed fail to import, catch
+        # that here so that plugins don't have to.
+        try:
+            plugin = entry_point.load()
+        except Exception as e:
+            log.info(
+                "Failed to load %s entry point '%s': %s", PYLSP, entry_point.name, e
+            )
+            self._pm.set_blocked(entry_point.name)
+            return
+        self._pm.register(plugin, name=entry_point.name)
+        log.info("Loaded pylsp plugin %s from %s", entry_point.name, plugin)
+
+    def load_plugins(self, hook_name=None):
+        """Import the enabled plugins implementing hook_name, or any hook."""
+        if not self._lazy_plugins:
+            return
+        if hook_name is None:
+            names = list(self._lazy_plugins)
+        else:
+            names = self._lazy_hooks.get(hook_name)
+            if not names:
+                return
+
+        plugins = self.settings().get("plugins", {})
+        with self._lazy_plugins_lock:
+            for name in list(names):
+                if not plugins.get(name, {}).get("enabled", True):
+                    continue
+                entry_point = self._lazy_plugins.pop(name, None)
+                if entry_point is None:
+                    continue
+                for hook_names in self._lazy_hooks.values():
+                    if name in hook_names:
+                        hook_names.remove(name)
+                self._load_plugin(entry_point)
+
     @property
     def disabled_plugins(self):
         return self._disabled_plugins
@@ -0,0 +1,321 @@
+# Copyright 2021- Python Language Server Contributors.
+
+# This file was generated by `scripts/plugin_manifest.py`. Please do not edit it directly.
+
+PLUGINS = {
+    "autopep8": {
+        "module": "pylsp.plugins.autopep8_format",
+        "hooks": [
+            "pylsp_format_document",
+            "pylsp_format_range",
+        ],
+    },
+    "flake8": {
+        "module": "pylsp.plugins.flake8_lint",
+        "hooks": [
+            "pylsp_lint",
+            "pylsp_settings",
+        ],
+        "settings": {
+            "plugins": {
+                "flake8": {
+                    "enabled": False,
+                },
+            },
+        },
+    },
+    "folding": {
+        "module": "pylsp.plugins.folding",
+        "hooks": [
+            "pylsp_folding_range",
+        ],
+    },
+    "jedi_completion": {
+        "module": "pylsp.plugins.jedi_completion",
+        "hooks": [
+            "pylsp_commands",
+            "pylsp_completion_item_resolve",
+            "pylsp_completions",
+            "pylsp_execute_command",
+        ],
+    },
+    "jedi_definition": {
+        "module": "pylsp.plugins.definition",
+        "hooks": [
+            "pylsp_definitions",
+        ],
+    },
+    "jedi_highlight": {
+        "module": "pylsp.plugins.highlight",
+        "hooks": [
+            "pylsp_document_highlight",
+        ],
+    },
+    "jedi_hover": {
+        "module": "pylsp.plugins.hover",
+        "hooks": [
+            "pylsp_hover",
+        ],
+    },
+    "jedi_references": {
+        "module": "pylsp.plugins.references",
+        "hooks": [
+            "pylsp_references",
+        ],
+    },
+    "jedi_rename": {
+        "module": "pylsp.plugins.jedi_rename",
+        "hooks": [
+            "pylsp_rename",
+        ],
+    },
+    "jedi_signature_help": {
+        "module": "pylsp.plugins.signature",
+        "hooks": [
+            "pylsp_signature_help",
+        ],
+    },
+    "jedi_symbols": {
+        "module": "pylsp.plugins.symbols",
+        "hooks": [
+            "pylsp_document_symbols",
+        ],
+    },
+    "mccabe": {
+        "module": "pylsp.plugins.mccabe_lint",
+        "hooks": [
+            "pylsp_lint",
+        ],
+    },
+    "metrics": {
+        "module": "pylsp.plugins.metrics",
+        "hooks": [
+            "pylsp_commands",
+            "pylsp_execute_command",
+        ],
+    },
+    "preload": {
+        "module": "pylsp.plugins.preload_imports",
+        "hooks": [
+            "pylsp_document_did_open",
+            "pylsp_initialized",
+            "pylsp_settings",
+        ],
+        "settings": {
+            "plugins": {
+                "preload": {
+                    "modules": [
+                        "OpenGL",
+                        "PIL",
+                        "array",
+                        "audioop",
+                        "binascii",
+                        "cPickle",
+                        "cStringIO",
+                        "cmath",
+                        "collections",
+                        "datetime",
+                        "errno",
+                        "exceptions",
+                        "gc",
+                        "imageop",
+                        "imp",
+                        "itertools",
+                        "marshal",
+                        "math",
+                        "matplotlib",
+                        "mmap",
+                        "mpmath",
+                        "msvcrt",
+                        "networkx",
+                        "nose",
+                        "nt",
+                        "numpy",
+                        "operator",
+                        "os",
+                        "os.path",
+                        "pandas",
+                        "parser",
+                        "rgbimg",
+                        "scipy",
+                        "signal",
+                        "skimage",
+                        "sklearn",
+                        "statsmodels",
+                        "strop",
+                        "sympy",
+                        "sys",
+                        "thread",
+                        "time",
+                        "wx",
+                        "xxsubtype",
+                        "zipimport",
+                        "zlib",
+                    ],
+                },
+            },
+            "rope": {
+                "extensionModules": [
+                    "OpenGL",
+                    "PIL",
+                    "array",
+                    "audioop",
+                    "binascii",
+                    "cPickle",
+                    "cStringIO",
+                    "cmath",
+                    "collections",
+                    "datetime",
+                    "errno",
+                    "exceptions",
+                    "gc",
+                    "imageop",
+                    "imp",
+                    "itertools",
+                    "marshal",
+                    "math",
+                    "matplotlib",
+                    "mmap",
+                    "mpmath",
+                    "msvcrt",
+                    "networkx",
+                    "nose",
+                    "nt",
+                    "numpy",
+                    "operator",
+                    "os",
+                    "os.path",
+                    "pandas",
+                    "parser",
+                    "rgbimg",
+                    "scipy",
+                    "signal",
+                    "skimage",
+                    "sklearn",
+                    "statsmodels",
+                    "strop",
+                    "sympy",
+                    "sys",
+                    "thread",
+                    "time",
+                    "wx",
+                    "xxsubtype",
+                    "zipimport",
+                    "zlib",
+                ],
+            },
+        },
+    },
+    "profiler": {
+        "module": "pylsp.plugins.profiler",
+        "hooks": [
+            "pylsp_commands",
+            "pylsp_execute_command",
+        ],
+    },
+    "pycodestyle": {
+        "module": "pylsp.plugins.pycodestyle_lint",
+        "hooks": [
+            "pylsp_lint",
+        ],
+    },
+    "pydocstyle": {
+        "module": "pylsp.plugins.pydocstyle_lint",
+        "hooks": [
+            "pylsp_lint",
+            "pylsp_settings",
+        ],
+        "settings": {
+            "plugins": {
+                "pydocstyle": {
+                    "enabled": False,
+                },
+            },
+        },
+    },
+    "pyflakes": {
+        "module": "pylsp.plugins.pyflakes_lint",
+        "hooks": [
+            "pylsp_lint",
+        ],
+    },
+    "pylint": {
+        "module": "pylsp.plugins.pylint_lint",
+        "hooks": [
+            "pylsp_lint",
+            "pylsp_settings",
+        ],
+        "settings": {
+            "plugins": {
+                "pylint": {
+                    "enabled": False,
+                    "args": [],
+                    "executable": None,
+                },
+            },
+        },
+    },
+    "rope_autoimport": {
+        "module": "pylsp.plugins.rope_autoimport",
+        "hooks": [
+            "pylsp_code_actions",
+            "pylsp_completions",
+            "pylsp_document_did_open",
+            "pylsp_document_did_save",
+            "pylsp_initialize",
+            "pylsp_settings",
+            "pylsp_workspace_configuration_changed",
+        ],
+        "settings": {
+            "plugins": {
+                "rope_autoimport": {
+                    "enabled": False,
+                    "memory": False,
+                    "completions": {
+                        "enabled": True,
+                    },
+                    "code_actions": {
+                        "enabled": True,
+                    },
+                },
+            },
+        },
+    },
+    "rope_completion": {
+        "module": "pylsp.plugins.rope_completion",
+        "hooks": [
+            "pylsp_completion_item_resolve",
+            "pylsp_completions",
+            "pylsp_settings",
+        ],
+        "settings": {
+            "plugins": {
+                "rope_completion": {
+                    "enabled": False,
+                    "eager": False,
+                },
+            },
+        },
+    },
+    "rope_rename": {
+        "module": "pylsp.plugins.rope_rename",
+        "hooks": [
+            "pylsp_rename",
+            "pylsp_settings",
+        ],
+        "settings": {
+            "plugins": {
+                "rope_rename": {
+                    "enabled": False,
+                },
+            },
+        },
+    },
+    "yapf": {
+        "module": "pylsp.plugins.yapf_format",
+        "hooks": [
+            "pylsp_format_document",
+            "pylsp_format_range",
+        ],
+    },
+}
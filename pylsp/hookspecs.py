@@ -25,7 +25,12 @@ def pylsp_commands(config, workspace):
 
 @hookspec
 def pylsp_completions(config, workspace, document, position, ignored_names):
-    pass
+    """The completion items at the given position.
+
+    Returns:
+        List[Dict] or Dict: The completion items, or a ``CompletionList`` dict
+        with ``isIncomplete`` set when only part of the items was returned.
+    """
 
 
 @hookspec(firstresult=True)
@@ -99,7 +104,7 @@ def pylsp_initialize(config, workspace):
 
 
 @hookspec
-def pylsp_initialized():
+def pylsp_initialized(config, workspace):
     pass
 
 
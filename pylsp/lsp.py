@@ -92,6 +92,17 @@ class TextDocumentSyncKind:
     INCREMENTAL = 2
 
 
+class FileChangeType:
+    Created = 1
+    Changed = 2
+    Deleted = 3
+
+
+class DocumentDiagnosticReportKind:
+    Full = "full"
+    Unchanged = "unchanged"
+
+
 class NotebookCellKind:
     Markup = 1
     Code = 2
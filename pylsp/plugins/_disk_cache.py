@@ -0,0 +1,206 @@
+# Copyright 2021- Python Language Server Contributors.
+
+"""An on-disk cache for expensive, per-module Jedi results.
+
+Labels, snippets, signatures and docstrings of names defined in large
+libraries (e.g. numpy or pandas) are costly to infer and don't depend on the
+session, so they can be reused across server restarts. Entries are keyed by
+the path, modification time and size of the module defining the name and by
+the Jedi environment used to infer it, so editing or upgrading a module
+invalidates them.
+
+Writes are buffered, and committed together by ``flush`` once a request is
+done with the cache, rather than one transaction per entry.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+import jedi
+
+log = logging.getLogger(__name__)
+
+MISSING = object()
+
+# Entries buffered before they are written, even if nobody flushes them
+MAX_PENDING = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    module_path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    environment TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (module_path, environment, kind, name)
+)
+"""
+
+
+def default_cache_dir():
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(base, "pylsp")
+
+
+def _environment_key(jedi_settings):
+    """Identify the Jedi environment that the ``jedi`` settings select.
+
+    Upgrading the interpreter changes its modules, and so the keys of their
+    entries, so the path of the executable is enough.
+    """
+    environment_path = jedi_settings.get("environment")
+    if environment_path:
+        executable = os.path.expanduser(environment_path)
+    else:
+        environment = jedi.api.environment.get_cached_default_environment()
+        executable = environment.executable
+    return f"{executable}:jedi-{jedi.__version__}"
+
+
+class DiskCache:
+    """A sqlite-backed cache of JSON-serializable values attached to jedi names."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._connection = None
+        self._cache_dir = None
+        # key -> value of the entries not written yet
+        self._pending = {}
+        # The environment of the request being handled by each thread
+        self._local = threading.local()
+
+    @property
+    def enabled(self):
+        return self._connection is not None
+
+    def configure(self, enabled, cache_dir=None, environment=None):
+        """Open, switch or close the cache database according to settings.
+
+        environment identifies the Jedi environment names are inferred with
+        by this thread, entries are only cached if it is set.
+        """
+        cache_dir = os.path.expanduser(cache_dir or default_cache_dir())
+        self._local.environment = environment
+        with self._lock:
+            if not enabled:
+                self.close()
+                return
+            if self._connection is not None and cache_dir == self._cache_dir:
+                return
+            self.close()
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                connection = sqlite3.connect(
+                    os.path.join(cache_dir, "jedi_cache.sqlite3"),
+                    check_same_thread=False,
+                )
+                connection.execute(_SCHEMA)
+                connection.commit()
+            except (OSError, sqlite3.Error):
+                log.warning("Failed to open the disk cache in %s", cache_dir)
+                return
+            self._connection = connection
+            self._cache_dir = cache_dir
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self.flush()
+                self._connection.close()
+            self._connection = None
+            self._cache_dir = None
+
+    def _key(self, kind, name):
+        module_path = name.module_path
+        if not module_path or not name.full_name:
+            return None
+        environment = getattr(self._local, "environment", None)
+        if environment is None:
+            return None
+        try:
+            stat = os.stat(module_path)
+        except OSError:
+            return None
+        name_id = f"{name.full_name}:{name.line}:{name.column}"
+        return (
+            str(module_path),
+            stat.st_mtime_ns,
+            stat.st_size,
+            environment,
+            kind,
+            name_id,
+        )
+
+    def get(self, kind, name):
+        """Return the value cached for the name, or MISSING."""
+        if not self.enabled:
+            return MISSING
+        key = self._key(kind, name)
+        if key is None:
+            return MISSING
+        with self._lock:
+            if not self.enabled:
+                return MISSING
+            if key in self._pending:
+                return json.loads(self._pending[key])
+            try:
+                row = self._connection.execute(
+                    "SELECT value FROM entries WHERE module_path = ? AND mtime_ns = ?"
+                    " AND size = ? AND environment = ? AND kind = ? AND name = ?",
+                    key,
+                ).fetchone()
+            except sqlite3.Error:
+                log.debug("Failed to read from the disk cache", exc_info=True)
+                return MISSING
+        return MISSING if row is None else json.loads(row[0])
+
+    def put(self, kind, name, value):
+        """Cache the value for the name, once flushed."""
+        if not self.enabled:
+            return
+        key = self._key(kind, name)
+        if key is None:
+            return
+        with self._lock:
+            if not self.enabled:
+                return
+            self._pending[key] = json.dumps(value)
+            if len(self._pending) >= MAX_PENDING:
+                self.flush()
+
+    def flush(self):
+        """Write the buffered entries in a single transaction."""
+        with self._lock:
+            if not self._pending or not self.enabled:
+                return
+            pending, self._pending = self._pending, {}
+            try:
+                with self._connection:
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [key + (value,) for key, value in pending.items()],
+                    )
+            except sqlite3.Error:
+                log.debug("Failed to write to the disk cache", exc_info=True)
+
+
+DISK_CACHE = DiskCache()
+
+
+def configure_disk_cache(config, document):
+    """Apply the ``jedi`` plugin settings relevant to the disk cache."""
+    jedi_settings = config.plugin_settings("jedi", document_path=document.path)
+    enabled = jedi_settings.get("disk_cache", False)
+    DISK_CACHE.configure(
+        enabled,
+        jedi_settings.get("disk_cache_dir"),
+        _environment_key(jedi_settings) if enabled else None,
+    )
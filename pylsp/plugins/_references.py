@@ -0,0 +1,88 @@
+# Copyright 2021- Python Language Server Contributors.
+
+import logging
+
+from pylsp import _utils, uris
+from pylsp.workspace import Cell, Document
+
+log = logging.getLogger(__name__)
+
+
+def _definition_key(name):
+    return (str(name.module_path), name.line, name.column)
+
+
+def _open_documents_containing(workspace, names):
+    """Return the paths of open documents whose (unsaved) source contains names."""
+    paths = set()
+    for document in list(workspace.documents.values()):
+        if not isinstance(document, Document) or isinstance(document, Cell):
+            continue
+        if any(name in document.source for name in names):
+            paths.add(document.path)
+    return paths
+
+
+def index_references(workspace, document, position):
+    """Find references to the name at position using the workspace name index.
+
+    Jedi's own project-wide search opens and scans every file of the project
+    on each request. Here, the index narrows the search down to the files that
+    mention the name, and Jedi only has to confirm which of their occurrences
+    resolve to the same definitions.
+
+    Returns None when the index can't be used (e.g. it is disabled or still
+    being built), in which case callers should fall back to Jedi.
+    """
+    index = workspace.name_index
+    if index is None or not index.is_ready():
+        return None
+
+    code_position = _utils.position_to_jedi_linecolumn(document, position)
+    script = document.jedi_script()
+    definitions = script.goto(follow_imports=True, **code_position)
+    if not definitions or any(d.type == "module" for d in definitions):
+        # Renaming modules also renames files, leave that to Jedi.
+        return None
+    targets = {_definition_key(d) for d in definitions}
+
+    references = {}
+    for ref in script.get_references(scope="file", **code_position):
+        references[_definition_key(ref)] = ref
+    names = {ref.name for ref in references.values()}
+    if not names:
+        return None
+
+    candidate_paths = set(index.files_for(names))
+    candidate_paths |= _open_documents_containing(workspace, names)
+    candidate_paths.discard(document.path)
+
+    for path in sorted(candidate_paths):
+        candidate = workspace.get_document(uris.from_fs_path(path))
+        try:
+            candidate_names = candidate.jedi_script().get_names(
+                all_scopes=True, definitions=True, references=True
+            )
+        except Exception:
+            log.debug("Failed to get names from %s", path, exc_info=True)
+            continue
+
+        for name in candidate_names:
+            if name.name not in names:
+                continue
+            try:
+                resolved = name.goto(follow_imports=True)
+            except Exception:
+                continue
+            if any(_definition_key(d) in targets for d in resolved):
+                references[_definition_key(name)] = name
+
+    # Definitions living outside the indexed files, e.g. in a library.
+    for definition in definitions:
+        if definition.line is not None:
+            references.setdefault(_definition_key(definition), definition)
+
+    return sorted(
+        references.values(),
+        key=lambda d: (str(d.module_path), d.line or 0, d.column or 0),
+    )
@@ -2,28 +2,57 @@
 # Copyright 2021- Python Language Server Contributors.
 
 import logging
-from collections import defaultdict
+import sys
+from collections import OrderedDict, defaultdict
 from time import time
 
 from jedi.api.classes import Completion
 
 from pylsp import lsp
+from pylsp.plugins._disk_cache import DISK_CACHE, MISSING
 
 log = logging.getLogger(__name__)
 
 
 # ---- Base class
 # -----------------------------------------------------------------------------
+def estimate_size(value):
+    """Roughly estimate the memory used by a cached key or value, in bytes."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
 class Resolver:
-    def __init__(self, callback, resolve_on_error, time_to_live=60 * 30):
+    def __init__(
+        self,
+        callback,
+        resolve_on_error,
+        time_to_live=60 * 30,
+        kind=None,
+        max_entries=5000,
+        max_memory=32 * 1024 * 1024,
+    ):
         self.callback = callback
         self.resolve_on_error = resolve_on_error
-        self._cache = {}
+        # Name under which results are persisted in the disk cache, if at all
+        self.kind = kind
+        # key -> (value, estimated size), least recently used first
+        self._cache = OrderedDict()
         self._time_to_live = time_to_live
         self._cache_ttl = defaultdict(set)
         self._clear_every = 2
         # see https://github.com/davidhalter/jedi/blob/master/jedi/inference/helpers.py#L194-L202
         self._cached_modules = {"pandas", "numpy", "tensorflow", "matplotlib"}
+        self._max_entries = max_entries
+        self._max_memory = max_memory
+        self._memory = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
     @property
     def cached_modules(self):
@@ -33,14 +62,72 @@ class Resolver:
     def cached_modules(self, new_value):
         self._cached_modules = set(new_value)
 
+    @property
+    def max_entries(self):
+        return self._max_entries
+
+    @max_entries.setter
+    def max_entries(self, new_value):
+        self._max_entries = new_value
+        self._evict()
+
+    @property
+    def max_memory(self):
+        """Approximate bound of the memory used by the cache, in bytes."""
+        return self._max_memory
+
+    @max_memory.setter
+    def max_memory(self, new_value):
+        self._max_memory = new_value
+        self._evict()
+
     def clear_outdated(self):
         now = self.time_key()
         to_clear = [timestamp for timestamp in self._cache_ttl if timestamp < now]
         for time_key in to_clear:
             for key in self._cache_ttl[time_key]:
-                del self._cache[key]
+                self._remove(key)
             del self._cache_ttl[time_key]
 
+    def clear(self):
+        self._cache.clear()
+        self._cache_ttl.clear()
+        self._memory = 0
+
+    def stats(self):
+        """Return the cache counters, used to tune ``cache_for`` and the limits."""
+        return {
+            "entries": len(self._cache),
+            "memory": self._memory,
+            "max_entries": self.max_entries,
+            "max_memory": self.max_memory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key):
+        entry = self._cache.pop(key, None)
+        if entry is not None:
+            self._memory -= entry[1]
+
+    def _add(self, key, value):
+        size = estimate_size(key) + estimate_size(value)
+        self._cache[key] = (value, size)
+        self._memory += size
+        self._cache_ttl[key[-1]].add(key)
+        self._evict()
+
+    def _evict(self):
+        while self._cache and (
+            (self._max_entries is not None and len(self._cache) > self._max_entries)
+            or (self._max_memory is not None and self._memory > self._max_memory)
+        ):
+            key, (_value, size) = self._cache.popitem(last=False)
+            self._memory -= size
+            self._cache_ttl[key[-1]].discard(key)
+            self.evictions += 1
+
     def time_key(self):
         return int(time() / self._time_to_live)
 
@@ -53,13 +140,18 @@ class Resolver:
 
         if use_cache:
             key = self._create_completion_id(completion)
-            if key not in self._cache:
-                if self.time_key() % self._clear_every == 0:
-                    self.clear_outdated()
-
-                self._cache[key] = self.resolve(completion)
-                self._cache_ttl[self.time_key()].add(key)
-            return self._cache[key]
+            entry = self._cache.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return entry[0]
+
+            self.misses += 1
+            if self.time_key() % self._clear_every == 0:
+                self.clear_outdated()
+            value = self._resolve_persisted(completion)
+            self._add(key, value)
+            return value
 
         return self.resolve(completion)
 
@@ -72,6 +164,17 @@ class Resolver:
             self.time_key(),
         )
 
+    def _resolve_persisted(self, completion):
+        if self.kind is None:
+            return self.resolve(completion)
+        value = DISK_CACHE.get(self.kind, completion)
+        if value is MISSING:
+            value = self.resolve(completion)
+            # Don't persist failures, they might be transient
+            if value is not self.resolve_on_error:
+                DISK_CACHE.put(self.kind, completion, value)
+        return value
+
     def resolve(self, completion):
         try:
             sig = completion.get_signatures()
@@ -93,7 +196,7 @@ def format_label(completion, sig):
     return completion.name
 
 
-LABEL_RESOLVER = Resolver(callback=format_label, resolve_on_error="")
+LABEL_RESOLVER = Resolver(callback=format_label, resolve_on_error="", kind="label")
 
 
 # ---- Snippets resolver
@@ -129,4 +232,23 @@ def format_snippet(completion, sig):
     return snippet_completion
 
 
-SNIPPET_RESOLVER = Resolver(callback=format_snippet, resolve_on_error={})
+SNIPPET_RESOLVER = Resolver(
+    callback=format_snippet, resolve_on_error={}, kind="snippet"
+)
+
+
+# ---- Documentation resolver
+# -----------------------------------------------------------------------------
+def format_documentation(completion, sig):
+    """Collect the raw docstring and signatures; formatting depends on the client."""
+    return {
+        "docstring": completion.docstring(raw=True),
+        "signatures": [
+            {"name": s.name, "type": s.type, "label": s.to_string()} for s in sig
+        ],
+    }
+
+
+DOCUMENTATION_RESOLVER = Resolver(
+    callback=format_documentation, resolve_on_error=None, kind="documentation"
+)
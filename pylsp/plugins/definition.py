@@ -62,16 +62,24 @@ def pylsp_definitions(
         jedi.settings.auto_import_modules = auto_import_modules
 
     follow_builtin_defns = settings.get("follow_builtin_definitions", True)
+    definitions = [
+        d
+        for d in definitions
+        if d.is_definition() and (follow_builtin_defns or _not_internal_definition(d))
+    ]
+    definition_uris = uris.uris_with_paths(
+        document.uri,
+        (str(d.module_path) if d.module_path else None for d in definitions),
+    )
     return [
         {
-            "uri": uris.uri_with(document.uri, path=str(d.module_path)),
+            "uri": uri,
             "range": {
                 "start": {"line": d.line - 1, "character": d.column},
                 "end": {"line": d.line - 1, "character": d.column + len(d.name)},
             },
         }
-        for d in definitions
-        if d.is_definition() and (follow_builtin_defns or _not_internal_definition(d))
+        for d, uri in zip(definitions, definition_uris)
     ]
 
 
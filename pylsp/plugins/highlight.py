@@ -11,7 +11,8 @@ log = logging.getLogger(__name__)
 @hookimpl
 def pylsp_document_highlight(document, position):
     code_position = _utils.position_to_jedi_linecolumn(document, position)
-    usages = document.jedi_script().get_references(**code_position)
+    # Highlights are local to the document, don't search the whole project
+    usages = document.jedi_script().get_references(scope="file", **code_position)
 
     def is_valid(definition):
         return definition.line is not None and definition.column is not None
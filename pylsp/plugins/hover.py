@@ -4,6 +4,8 @@
 import logging
 
 from pylsp import _utils, hookimpl
+from pylsp.plugins._disk_cache import DISK_CACHE, configure_disk_cache
+from pylsp.plugins._resolvers import DOCUMENTATION_RESOLVER
 
 log = logging.getLogger(__name__)
 
@@ -30,12 +32,18 @@ def pylsp_hover(config, document, position):
     supported_markup_kinds = hover_capabilities.get("contentFormat", ["markdown"])
     preferred_markup_kind = _utils.choose_markup_kind(supported_markup_kinds)
 
+    configure_disk_cache(config, document)
+    documentation = DOCUMENTATION_RESOLVER.get_or_create(definition)
+    DISK_CACHE.flush()
+    if documentation is None:
+        return {"contents": ""}
+
     # Find first exact matching signature
     signature = next(
         (
-            x.to_string()
-            for x in definition.get_signatures()
-            if (x.name == word and x.type not in ["module"])
+            x["label"]
+            for x in documentation["signatures"]
+            if (x["name"] == word and x["type"] not in ["module"])
         ),
         "",
     )
@@ -43,7 +51,7 @@ def pylsp_hover(config, document, position):
     return {
         "contents": _utils.format_docstring(
             # raw docstring returns only doc, without signature
-            definition.docstring(raw=True),
+            documentation["docstring"],
             preferred_markup_kind,
             signatures=[signature] if signature else None,
         )
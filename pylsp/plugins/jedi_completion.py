@@ -7,7 +7,13 @@ import os
 import parso
 
 from pylsp import _utils, hookimpl, lsp
-from pylsp.plugins._resolvers import LABEL_RESOLVER, SNIPPET_RESOLVER
+from pylsp._completion_session import CompletionSession, completion_context
+from pylsp.plugins._disk_cache import DISK_CACHE, configure_disk_cache
+from pylsp.plugins._resolvers import (
+    DOCUMENTATION_RESOLVER,
+    LABEL_RESOLVER,
+    SNIPPET_RESOLVER,
+)
 
 log = logging.getLogger(__name__)
 
@@ -34,20 +40,57 @@ _IMPORTS = ("import_name", "import_from")
 # Types of parso node for errors
 _ERRORS = ("error_node",)
 
+# Command returning the hit/miss/eviction counters of the completion caches
+CACHE_STATS_COMMAND = "pylsp.completionCacheStats"
+
+_RESOLVERS = {
+    "label": LABEL_RESOLVER,
+    "snippet": SNIPPET_RESOLVER,
+    "documentation": DOCUMENTATION_RESOLVER,
+}
+
 
 @hookimpl
 def pylsp_completions(config, document, position):
     """Get formatted completions for current code position"""
     settings = config.plugin_settings("jedi_completion", document_path=document.path)
     resolve_eagerly = settings.get("eager", False)
-    code_position = _utils.position_to_jedi_linecolumn(document, position)
-
-    code_position["fuzzy"] = settings.get("fuzzy", False)
-    completions = document.jedi_script(use_document_path=True).complete(**code_position)
+    fuzzy = settings.get("fuzzy", False)
+
+    # Fuzzy matches of a longer prefix aren't a subset of the shorter one's.
+    context = None if fuzzy else completion_context(document, position)
+    # Jedi settings, e.g. the environment, change what can be completed.
+    jedi_settings = config.plugin_settings("jedi", document_path=document.path)
+    session_settings, session = document.shared_data.get(
+        "LAST_JEDI_COMPLETION_SESSION", (None, None)
+    )
+    completions = None
+    if session is not None and session_settings == jedi_settings:
+        completions = session.filter(context, key=lambda c: c.name)
+    if completions is None:
+        code_position = _utils.position_to_jedi_linecolumn(document, position)
+        code_position["fuzzy"] = fuzzy
+        completions = document.jedi_script(use_document_path=True).complete(
+            **code_position
+        )
+        if context is not None:
+            session = CompletionSession(context, completions)
+            document.shared_data["LAST_JEDI_COMPLETION_SESSION"] = (
+                jedi_settings,
+                session,
+            )
 
     if not completions:
         return None
 
+    max_items = settings.get("max_items")
+    is_incomplete = max_items is not None and len(completions) > max_items
+    if is_incomplete:
+        # Only format the best ranked items. The list is marked incomplete, so
+        # clients ask again as the user types and the items left out here get
+        # formatted once the narrower prefix brings them into the window.
+        completions = _rank(completions)[:max_items]
+
     completion_capabilities = config.capabilities.get("textDocument", {}).get(
         "completion", {}
     )
@@ -62,9 +105,16 @@ def pylsp_completions(config, document, position):
 
     max_to_resolve = settings.get("resolve_at_most", 25)
     modules_to_cache_for = settings.get("cache_for", None)
-    if modules_to_cache_for is not None:
-        LABEL_RESOLVER.cached_modules = modules_to_cache_for
-        SNIPPET_RESOLVER.cached_modules = modules_to_cache_for
+    max_cached_entries = settings.get("cache_max_entries", 5000)
+    max_cached_memory = settings.get("cache_max_memory", 32)
+    for resolver in _RESOLVERS.values():
+        if modules_to_cache_for is not None:
+            resolver.cached_modules = modules_to_cache_for
+        resolver.max_entries = max_cached_entries
+        resolver.max_memory = (
+            None if max_cached_memory is None else max_cached_memory * 1024 * 1024
+        )
+    configure_disk_cache(config, document)
 
     include_params = (
         snippet_support and should_include_params and use_snippets(document, position)
@@ -123,6 +173,8 @@ def pylsp_completions(config, document, position):
                 completion_dict["label"] += " object"
                 ready_completions.append(completion_dict)
 
+    DISK_CACHE.flush()
+
     for completion_dict in ready_completions:
         completion_dict["data"] = {"doc_uri": document.uri}
 
@@ -133,6 +185,8 @@ def pylsp_completions(config, document, position):
         for completion, data in zip(ready_completions, completions)
     }
 
+    if is_incomplete:
+        return {"isIncomplete": True, "items": ready_completions}
     return ready_completions or None
 
 
@@ -152,10 +206,27 @@ def pylsp_completion_item_resolve(config, completion_item, document):
 
     if shared_data:
         completion, data = shared_data
-        return _resolve_completion(completion, data, markup_kind=preferred_markup_kind)
+        configure_disk_cache(config, document)
+        resolved = _resolve_completion(
+            completion, data, markup_kind=preferred_markup_kind
+        )
+        DISK_CACHE.flush()
+        return resolved
     return completion_item
 
 
+@hookimpl
+def pylsp_commands():
+    return [CACHE_STATS_COMMAND]
+
+
+@hookimpl
+def pylsp_execute_command(command):
+    if command == CACHE_STATS_COMMAND:
+        return {kind: resolver.stats() for kind, resolver in _RESOLVERS.items()}
+    return None
+
+
 def is_exception_class(name):
     """
     Determine if a class name is an instance of an Exception.
@@ -209,14 +280,17 @@ def use_snippets(document, position):
 
 def _resolve_completion(completion, d, markup_kind: str):
     completion["detail"] = _detail(d)
-    try:
+    documentation = DOCUMENTATION_RESOLVER.get_or_create(d)
+    if documentation is None:
+        docs = ""
+    else:
         docs = _utils.format_docstring(
-            d.docstring(raw=True),
-            signatures=[signature.to_string() for signature in d.get_signatures()],
+            documentation["docstring"],
+            signatures=[
+                signature["label"] for signature in documentation["signatures"]
+            ],
             markup_kind=markup_kind,
         )
-    except Exception:
-        docs = ""
     completion["documentation"] = docs
     return completion
 
@@ -289,6 +363,15 @@ def _detail(definition):
         return definition.full_name or ""
 
 
+def _rank(completions):
+    """Order completions as clients do with our sort text, hidden names last.
+
+    Jedi already returns names in alphabetical order, so a stable sort on the
+    sort text prefix is enough.
+    """
+    return sorted(completions, key=lambda c: c.name.startswith("_"))
+
+
 def _sort_text(definition):
     """Ensure builtins appear at the bottom.
     Description is of format <type>: <module>.<item>
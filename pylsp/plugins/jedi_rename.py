@@ -2,8 +2,10 @@
 # Copyright 2021- Python Language Server Contributors.
 
 import logging
+from collections import defaultdict
 
 from pylsp import _utils, hookimpl, uris
+from pylsp.plugins._references import index_references
 
 log = logging.getLogger(__name__)
 
@@ -13,21 +15,13 @@ def pylsp_rename(config, workspace, document, position, new_name):
     log.debug(
         "Executing rename of %s to %s", document.word_at_position(position), new_name
     )
-    kwargs = _utils.position_to_jedi_linecolumn(document, position)
-    kwargs["new_name"] = new_name
-    try:
-        refactoring = document.jedi_script().rename(**kwargs)
-    except NotImplementedError as exc:
-        raise Exception(
-            "No support for renaming in Python 2/3.5 with Jedi. "
-            "Consider using the rope_rename plugin instead"
-        ) from exc
-    log.debug("Finished rename: %s", refactoring.get_diff())
+    new_code_by_path = _index_rename(workspace, document, position, new_name)
+    if new_code_by_path is None:
+        new_code_by_path = _jedi_rename(document, position, new_name)
     changes = []
 
-    changed_files = refactoring.get_changed_files()
-    for file_path, changed_file in changed_files.items():
-        uri = uris.from_fs_path(str(file_path))
+    file_uris = uris.from_fs_paths(str(file_path) for file_path in new_code_by_path)
+    for uri, new_code in zip(file_uris, new_code_by_path.values()):
         doc = workspace.get_maybe_document(uri)
         changes.append(
             {
@@ -37,11 +31,11 @@ def pylsp_rename(config, workspace, document, position, new_name):
                         "range": {
                             "start": {"line": 0, "character": 0},
                             "end": {
-                                "line": _num_lines(changed_file.get_new_code()),
+                                "line": _num_lines(new_code),
                                 "character": 0,
                             },
                         },
-                        "newText": changed_file.get_new_code(),
+                        "newText": new_code,
                     }
                 ],
             }
@@ -49,6 +43,59 @@ def pylsp_rename(config, workspace, document, position, new_name):
     return {"documentChanges": changes}
 
 
+def _jedi_rename(document, position, new_name):
+    kwargs = _utils.position_to_jedi_linecolumn(document, position)
+    kwargs["new_name"] = new_name
+    try:
+        refactoring = document.jedi_script().rename(**kwargs)
+    except NotImplementedError as exc:
+        raise Exception(
+            "No support for renaming in Python 2/3.5 with Jedi. "
+            "Consider using the rope_rename plugin instead"
+        ) from exc
+    log.debug("Finished rename: %s", refactoring.get_diff())
+    return {
+        file_path: changed_file.get_new_code()
+        for file_path, changed_file in refactoring.get_changed_files().items()
+    }
+
+
+def _index_rename(workspace, document, position, new_name):
+    """Rename the references found through the workspace name index.
+
+    Returns None if the index can't be used for this rename.
+    """
+    references = index_references(workspace, document, position)
+    if references is None:
+        return None
+
+    positions_by_path = defaultdict(set)
+    for ref in references:
+        if ref.in_builtin_module() or ref.line is None or not ref.module_path:
+            continue
+        path = str(ref.module_path)
+        if not path.startswith(workspace.root_path):
+            continue
+        positions_by_path[path].add((ref.line - 1, ref.column, ref.name))
+
+    # Keep the renamed document first, as Jedi does.
+    paths = sorted(positions_by_path, key=lambda path: path != document.path)
+    new_code_by_path = {}
+    for path in paths:
+        if path == document.path:
+            doc = document
+        else:
+            doc = workspace.get_document(uris.from_fs_path(path))
+        lines = doc.lines
+        for line, column, name in sorted(positions_by_path[path], reverse=True):
+            text = lines[line]
+            if text[column : column + len(name)] == name:
+                lines[line] = text[:column] + new_name + text[column + len(name) :]
+        new_code_by_path[path] = "".join(lines)
+    log.debug("Finished rename through the name index: %s", list(new_code_by_path))
+    return new_code_by_path
+
+
 def _num_lines(file_contents):
     "Count the number of lines in the given string."
     if _utils.get_eol_chars(file_contents):
@@ -0,0 +1,25 @@
+# Copyright 2021- Python Language Server Contributors.
+
+from pylsp import hookimpl
+from pylsp._metrics import METRICS
+
+METRICS_COMMAND = "pylsp.metrics"
+RESET_METRICS_COMMAND = "pylsp.resetMetrics"
+
+
+@hookimpl
+def pylsp_commands():
+    return [METRICS_COMMAND, RESET_METRICS_COMMAND]
+
+
+@hookimpl
+def pylsp_execute_command(command, arguments):
+    """Return the latency summaries, or the Prometheus text with ["prometheus"]."""
+    if command == METRICS_COMMAND:
+        if arguments and arguments[0] == "prometheus":
+            return METRICS.prometheus()
+        return METRICS.snapshot()
+    if command == RESET_METRICS_COMMAND:
+        METRICS.reset()
+        return True
+    return None
@@ -1,12 +1,27 @@
 # Copyright 2017-2020 Palantir Technologies, Inc.
 # Copyright 2021- Python Language Server Contributors.
 
+import hashlib
+import json
 import logging
+import os
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
-from pylsp import hookimpl
+from pylsp import _imports, _utils, hookimpl
+
+from ._disk_cache import default_cache_dir
 
 log = logging.getLogger(__name__)
 
+# Number of threads importing modules at once
+WORKERS = min(4, os.cpu_count() or 1)
+# Number of the most used modules kept in usage snapshots
+SNAPSHOT_SIZE = 100
+SNAPSHOT_SAVE_DEBOUNCE_S = 10
+
 MODULES = [
     "OpenGL",
     "PIL",
@@ -66,14 +81,196 @@ def pylsp_settings():
     }
 
 
-@hookimpl
-def pylsp_initialize(config):
-    for mod_name in config.plugin_settings("preload").get("modules", []):
+class Preloader:
+    """Import modules in background threads, the ones documents need first."""
+
+    def __init__(self, workers: int = WORKERS):
+        self._workers = workers
+        self._lock = threading.Lock()
+        # Modules to import, in order
+        self._pending = []
+        # Modules imported, or which failed to
+        self._done = set()
+        self._failed = set()
+        self._thread = None
+
+    @property
+    def pending(self):
+        with self._lock:
+            return list(self._pending)
+
+    def preload(self, modules, workspace=None):
+        """Import modules in the background, reporting progress to workspace."""
+        with self._lock:
+            known = self._done.union(self._pending)
+            self._pending.extend(
+                name for name in dict.fromkeys(modules) if name not in known
+            )
+            if not self._pending or self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(workspace,),
+                name="pylsp-preload",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def prioritize(self, modules):
+        """Import those of modules which are still pending before the others."""
+        with self._lock:
+            wanted = [name for name in self._pending if name in modules]
+            if wanted:
+                rest = [name for name in self._pending if name not in modules]
+                self._pending = wanted + rest
+
+    def wait(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def is_failed(self, module):
+        return module in self._failed
+
+    def _next(self):
+        with self._lock:
+            if not self._pending:
+                return None
+            name = self._pending.pop(0)
+            self._done.add(name)
+            return name, len(self._done), len(self._done) + len(self._pending)
+
+    def _import(self, report):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            name, done, total = item
+            try:
+                __import__(name)
+                log.debug("Preloaded module %s", name)
+            except Exception:
+                # Catch any exception since not only ImportError can be raised here
+                # For example, old versions of NumPy can cause a ValueError.
+                # See spyder-ide/spyder#13985
+                self._failed.add(name)
+            report(f"{name} ({done}/{total})", done * 100 // total)
+
+    def _run(self, workspace):
+        if workspace is not None:
+            with workspace.report_progress("Preloading modules") as report:
+                self._import_in_parallel(report)
+        else:
+            self._import_in_parallel(lambda *args: None)
+
+    def _import_in_parallel(self, report):
+        while True:
+            with ThreadPoolExecutor(self._workers) as executor:
+                for _ in range(self._workers):
+                    executor.submit(self._import, report)
+            with self._lock:
+                # Unless modules were added while the last ones were imported
+                if not self._pending:
+                    self._thread = None
+                    return
+
+
+def snapshot_path(config, cache_dir=None):
+    """Return the file of the usage snapshot for the configured environment."""
+    environment = config.plugin_settings("jedi").get("environment") or sys.executable
+    key = hashlib.sha1(environment.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir or default_cache_dir(), "preload", key + ".json")
+
+
+def load_snapshot(path):
+    """Return the modules in a usage snapshot, most used first."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            counts = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return sorted(counts, key=counts.get, reverse=True)
+
+
+class UsageSnapshot:
+    """Count the modules imported by documents, to preload them next time."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._counts = Counter()
         try:
-            __import__(mod_name)
-            log.debug("Preloaded module %s", mod_name)
-        except Exception:
-            # Catch any exception since not only ImportError can be raised here
-            # For example, old versions of NumPy can cause a ValueError.
-            # See spyder-ide/spyder#13985
+            with open(path, "r", encoding="utf-8") as f:
+                self._counts.update(json.load(f))
+        except (OSError, ValueError):
             pass
+
+    def record(self, modules):
+        with self._lock:
+            self._counts.update(modules)
+        self.save()
+
+    @_utils.debounce(SNAPSHOT_SAVE_DEBOUNCE_S, keyed_by="self")
+    def save(self):
+        with self._lock:
+            counts = {
+                name: count
+                for name, count in self._counts.most_common(SNAPSHOT_SIZE)
+                if not preloader.is_failed(name)
+            }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(counts, f)
+            # Other servers may write the same snapshot
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning("Failed to save preload snapshot %s: %s", self.path, e)
+
+
+def _top_level_modules(document):
+    return {
+        name.split(".", 1)[0]
+        for name in _imports.imported_modules(document.source)
+        if not name.startswith(".")
+    }
+
+
+# path -> UsageSnapshot
+_snapshots = {}
+
+
+def _snapshot(config):
+    if not config.plugin_settings("preload").get("snapshot", False):
+        return None
+    path = snapshot_path(config)
+    snapshot = _snapshots.get(path)
+    if snapshot is None:
+        snapshot = _snapshots.setdefault(path, UsageSnapshot(path))
+    return snapshot
+
+
+@hookimpl
+def pylsp_initialized(config, workspace):
+    """Preload modules once the server answered initialize."""
+    modules = list(config.plugin_settings("preload").get("modules", []))
+    if _snapshot(config) is not None:
+        modules = load_snapshot(snapshot_path(config)) + modules
+    preloader.preload(modules, workspace)
+
+
+@hookimpl
+def pylsp_document_did_open(config, document):
+    """Preload the modules the document imports first, and count them."""
+    snapshot = _snapshot(config)
+    if snapshot is None and not preloader.pending:
+        return
+    modules = _top_level_modules(document)
+    preloader.prioritize(modules)
+    if snapshot is not None:
+        snapshot.record(modules)
+
+
+# Imported modules are shared by all servers of a process
+preloader = Preloader()
@@ -0,0 +1,40 @@
+# Copyright 2021- Python Language Server Contributors.
+
+import os
+import tempfile
+
+from pylsp import hookimpl
+from pylsp._profiler import PROFILER
+
+START_PROFILING_COMMAND = "pylsp.startProfiling"
+STOP_PROFILING_COMMAND = "pylsp.stopProfiling"
+
+
+def profiles_directory(config):
+    directory = config.plugin_settings("profiler").get("directory")
+    if directory:
+        return os.path.expanduser(directory)
+    return os.path.join(tempfile.gettempdir(), "pylsp-profiles")
+
+
+@hookimpl
+def pylsp_commands():
+    return [START_PROFILING_COMMAND, STOP_PROFILING_COMMAND]
+
+
+@hookimpl
+def pylsp_execute_command(config, command, arguments):
+    """Start or stop profiling.
+
+    pylsp.startProfiling takes an optional object with the profiling "mode"
+    ("cprofile" or "sample"), the "method" or "plugin" to only profile, and the
+    sampling "interval" in seconds. pylsp.stopProfiling returns the path of the
+    written profile.
+    """
+    if command == START_PROFILING_COMMAND:
+        options = arguments[0] if arguments else {}
+        PROFILER.start(profiles_directory(config), **options)
+        return PROFILER.status()
+    if command == STOP_PROFILING_COMMAND:
+        return {"path": PROFILER.stop()}
+    return None
@@ -4,30 +4,34 @@
 import logging
 
 from pylsp import _utils, hookimpl, uris
+from pylsp.plugins._references import index_references
 
 log = logging.getLogger(__name__)
 
 
 @hookimpl
-def pylsp_references(document, position, exclude_declaration):
-    code_position = _utils.position_to_jedi_linecolumn(document, position)
-    usages = document.jedi_script().get_references(**code_position)
+def pylsp_references(workspace, document, position, exclude_declaration):
+    usages = index_references(workspace, document, position)
+    if usages is None:
+        code_position = _utils.position_to_jedi_linecolumn(document, position)
+        usages = document.jedi_script().get_references(**code_position)
 
     if exclude_declaration:
         # Filter out if the usage is the actual declaration of the thing
         usages = [d for d in usages if not d.is_definition()]
 
     # Filter out builtin modules
+    usages = [d for d in usages if not d.in_builtin_module()]
+    usage_uris = uris.uris_with_paths(
+        document.uri, (str(d.module_path) if d.module_path else None for d in usages)
+    )
     return [
         {
-            "uri": uris.uri_with(document.uri, path=str(d.module_path))
-            if d.module_path
-            else document.uri,
+            "uri": uri,
             "range": {
                 "start": {"line": d.line - 1, "character": d.column},
                 "end": {"line": d.line - 1, "character": d.column + len(d.name)},
             },
         }
-        for d in usages
-        if not d.in_builtin_module()
+        for d, uri in zip(usages, usage_uris)
     ]
@@ -2,6 +2,7 @@
 
 import logging
 import threading
+import weakref
 from typing import Any, Dict, Generator, List, Optional, Set, Union
 
 import parso
@@ -30,7 +31,12 @@ class AutoimportCache:
     """Handles the cache creation."""
 
     def __init__(self):
-        self.thread = None
+        # workspace -> thread generating its cache, so that the servers of a
+        # multi-client process don't wait for each other
+        self._threads = weakref.WeakKeyDictionary()
+        # Autoimport databases that have the names of the installed modules,
+        # which may be shared by the servers of a multi-client process
+        self._modules_cached = weakref.WeakSet()
 
     def reload_cache(
         self,
@@ -38,41 +44,57 @@ class AutoimportCache:
         workspace: Workspace,
         files: Optional[List[Document]] = None,
         single_thread: Optional[bool] = True,
+        reuse_modules: bool = False,
     ):
-        if self.is_blocked():
+        if self.is_blocked(workspace):
             return
 
-        memory: bool = config.plugin_settings("rope_autoimport").get("memory", False)
         rope_config = config.settings().get("rope", {})
-        autoimport = workspace._rope_autoimport(rope_config, memory)
+        autoimport = _autoimport(config, workspace)
         resources: Optional[List[Resource]] = (
             None
             if files is None
             else [document._rope_resource(rope_config) for document in files]
         )
+        modules = not (reuse_modules and autoimport in self._modules_cached)
 
         if single_thread:
-            self._reload_cache(workspace, autoimport, resources)
+            self._reload_cache(workspace, autoimport, resources, modules)
         else:
             # Creating the cache may take 10-20s for a environment with 5k python modules. That's
             # why we decided to move cache creation into its own thread.
-            self.thread = threading.Thread(
-                target=self._reload_cache, args=(workspace, autoimport, resources)
+            thread = threading.Thread(
+                target=self._reload_cache,
+                args=(workspace, autoimport, resources, modules),
             )
-            self.thread.start()
+            self._threads[workspace] = thread
+            thread.start()
 
     def _reload_cache(
         self,
         workspace: Workspace,
         autoimport: AutoImport,
         resources: Optional[List[Resource]] = None,
+        modules: bool = True,
     ):
         task_handle = PylspTaskHandle(workspace)
         autoimport.generate_cache(task_handle=task_handle, resources=resources)
-        autoimport.generate_modules_cache(task_handle=task_handle)
+        if modules:
+            autoimport.generate_modules_cache(task_handle=task_handle)
+            self._modules_cached.add(autoimport)
 
-    def is_blocked(self):
-        return self.thread and self.thread.is_alive()
+    def is_blocked(self, workspace: Optional[Workspace] = None):
+        """Whether the cache of workspace, or of any workspace, is being generated."""
+        if workspace is not None:
+            thread = self._threads.get(workspace)
+            return thread is not None and thread.is_alive()
+        return any(thread.is_alive() for thread in list(self._threads.values()))
+
+
+def _autoimport(config: Config, workspace: Workspace):
+    """Return the autoimport database of workspace for the current settings."""
+    memory: bool = config.plugin_settings("rope_autoimport").get("memory", False)
+    return workspace._rope_autoimport(config.settings().get("rope", {}), memory)
 
 
 @hookimpl
@@ -240,7 +262,7 @@ def pylsp_completions(
         not config.plugin_settings("rope_autoimport")
         .get("completions", {})
         .get("enabled", True)
-    ) or cache.is_blocked():
+    ) or cache.is_blocked(workspace):
         return []
 
     line = document.lines[position["line"]]
@@ -250,11 +272,10 @@ def pylsp_completions(
         return []
     word = word_node.value
     log.debug(f"autoimport: searching for word: {word}")
-    rope_config = config.settings(document_path=document.path).get("rope", {})
     ignored_names: Set[str] = ignored_names or get_names(
         document.jedi_script(use_document_path=True)
     )
-    autoimport = workspace._rope_autoimport(rope_config)
+    autoimport = _autoimport(config, workspace)
     suggestions = list(autoimport.search_full(word, ignored_names=ignored_names))
     results = sorted(
         _process_statements(
@@ -263,7 +284,8 @@ def pylsp_completions(
         key=lambda statement: statement["sortText"],
     )
     if len(results) > MAX_RESULTS_COMPLETIONS:
-        results = results[:MAX_RESULTS_COMPLETIONS]
+        # Let the client ask again as the word gets longer
+        return {"isIncomplete": True, "items": results[:MAX_RESULTS_COMPLETIONS]}
     return results
 
 
@@ -330,7 +352,7 @@ def pylsp_code_actions(
         not config.plugin_settings("rope_autoimport")
         .get("code_actions", {})
         .get("enabled", True)
-    ) or cache.is_blocked():
+    ) or cache.is_blocked(workspace):
         return []
 
     log.debug(f"textDocument/codeAction: {document} {range} {context}")
@@ -341,8 +363,7 @@ def pylsp_code_actions(
 
         word = get_name_or_module(document, diagnostic)
         log.debug(f"autoimport: searching for word: {word}")
-        rope_config = config.settings(document_path=document.path).get("rope", {})
-        autoimport = workspace._rope_autoimport(rope_config)
+        autoimport = _autoimport(config, workspace)
         suggestions = list(autoimport.search_full(word))
         log.debug("autoimport: suggestions: %s", suggestions)
         results = sorted(
@@ -368,9 +389,10 @@ def pylsp_code_actions(
 def pylsp_initialize(config: Config, workspace: Workspace):
     """Initialize AutoImport.
 
-    Generates the cache for local and global items.
+    Generates the cache for local and global items. The names of the installed
+    modules are only read if no other client of this process did so already.
     """
-    cache.reload_cache(config, workspace)
+    cache.reload_cache(config, workspace, reuse_modules=True)
 
 
 @hookimpl
@@ -31,11 +31,18 @@ def pylsp_rename(config, workspace, document, position, new_name):
     log.debug(
         "Executing rename of %s to %s", document.word_at_position(position), new_name
     )
-    changeset = rename.get_changes(new_name, in_hierarchy=True, docs=True)
+    changeset = rename.get_changes(
+        new_name,
+        in_hierarchy=True,
+        docs=True,
+        resources=_candidate_resources(workspace, rope_project, document, position),
+    )
     log.debug("Finished rename: %s", changeset.changes)
     changes = []
-    for change in changeset.changes:
-        uri = uris.from_fs_path(change.resource.path)
+    change_uris = uris.from_fs_paths(
+        change.resource.path for change in changeset.changes
+    )
+    for change, uri in zip(changeset.changes, change_uris):
         doc = workspace.get_maybe_document(uri)
         changes.append(
             {
@@ -57,6 +64,24 @@ def pylsp_rename(config, workspace, document, position, new_name):
     return {"documentChanges": changes}
 
 
+def _candidate_resources(workspace, rope_project, document, position):
+    """Restrict the rename to the files the name index says mention the name.
+
+    Returns None, meaning all project files, if the index can't be used.
+    """
+    index = workspace.name_index
+    word = document.word_at_position(position)
+    if index is None or not index.is_ready() or not word:
+        return None
+
+    paths = index.files_for([word]) | {document.path}
+    return [
+        libutils.path_to_resource(rope_project, path)
+        for path in sorted(paths)
+        if path.startswith(rope_project.address)
+    ]
+
+
 def _num_lines(resource):
     "Count the number of lines in a `File` resource."
     text = resource.read()
@@ -1,13 +1,17 @@
 # Copyright 2017-2020 Palantir Technologies, Inc.
 # Copyright 2021- Python Language Server Contributors.
 
+import gc
+import json
 import logging
 import os
 import socketserver
 import threading
+import time
 import uuid
-from functools import partial
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial, wraps
+from typing import Dict
 
 try:
     import ujson as json
@@ -18,7 +22,11 @@ from pylsp_jsonrpc.dispatchers import MethodDispatcher
 from pylsp_jsonrpc.endpoint import Endpoint
 from pylsp_jsonrpc.streams import JsonRpcStreamReader, JsonRpcStreamWriter
 
-from . import _utils, lsp, uris
+from . import _imports, _lint_scheduler, _utils, lsp, uris
+from ._completion_session import CompletionSession, completion_context
+from ._metrics import METRICS
+from ._path_trie import PathTrie
+from ._profiler import PROFILER
 from ._version import __version__
 from .config import config
 from .workspace import Cell, Document, Notebook, Workspace
@@ -27,10 +35,32 @@ log = logging.getLogger(__name__)
 
 
 LINT_DEBOUNCE_S = 0.5  # 500 ms
+# Linting a notebook across its cells waits longer than linting its edited cells
+NOTEBOOK_LINT_DEBOUNCE_S = 2  # 2 s
+WATCHED_FILES_DEBOUNCE_S = 1  # 1 s
 PARENT_PROCESS_WATCH_INTERVAL = 10  # 10 s
 MAX_WORKERS = 64
+PROGRESS_TOKENS_PREALLOCATED = 2
+# Number of workspace diagnostic reports sent per partial result notification
+PARTIAL_RESULT_BATCH_SIZE = 20
 PYTHON_FILE_EXTENSIONS = (".py", ".pyi")
+# Linters whose diagnostics of a notebook cell only depend on its source
+CELL_LINTERS = frozenset(("mccabe", "pycodestyle"))
 CONFIG_FILEs = ("pycodestyle.cfg", "setup.cfg", "tox.ini", ".flake8")
+# Requests the user waits for, which pause background linting
+INTERACTIVE_METHODS = frozenset(
+    (
+        "completionItem/resolve",
+        "textDocument/codeAction",
+        "textDocument/completion",
+        "textDocument/definition",
+        "textDocument/documentHighlight",
+        "textDocument/hover",
+        "textDocument/references",
+        "textDocument/rename",
+        "textDocument/signatureHelp",
+    )
+)
 
 
 class _StreamHandlerWrapper(socketserver.StreamRequestHandler):
@@ -55,12 +85,75 @@ class _StreamHandlerWrapper(socketserver.StreamRequestHandler):
         self.SHUTDOWN_CALL()
 
 
-def start_tcp_lang_server(bind_addr, port, check_parent_process, handler_class):
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    # Connections are closed by their clients, don't wait for them on exit
+    daemon_threads = True
+
+
+def start_tcp_lang_server(
+    bind_addr,
+    port,
+    check_parent_process,
+    handler_class,
+    multi_client=False,
+    prefork=False,
+):
+    """Serve the language server over TCP.
+
+    By default, connections are served one after the other. With multi_client,
+    they are served at once, each by its own handler_class, in a thread. With
+    prefork, they are served at once, each in a process forked from this one
+    once it imported the plugins and preloaded modules.
+    """
+    server = _tcp_server(
+        bind_addr, port, check_parent_process, handler_class, multi_client, prefork
+    )
+    try:
+        server.server_bind()
+        server.server_activate()
+        if prefork:
+            # Clients connecting meanwhile wait in the listen backlog
+            _prepare_fork()
+        log.info("Serving %s on (%s, %s)", handler_class.__name__, bind_addr, port)
+        server.serve_forever()
+    finally:
+        log.info("Shutting down")
+        server.server_close()
+
+
+def _prepare_fork():
+    """Do the slow part of starting a server once, for the forked servers."""
+    start = time.monotonic()
+    # Imports the plugins and their dependencies
+    cfg = config.Config(uris.from_fs_path(os.getcwd()), {}, 0, {})
+    cfg.load_plugins()
+    if cfg.plugin_manager.has_plugin("preload"):
+        from .plugins.preload_imports import preloader
+
+        preloader.preload(cfg.plugin_settings("preload").get("modules", []))
+        preloader.wait()
+    # Keep the objects created so far out of the garbage collector, whose
+    # bookkeeping would otherwise copy their memory pages into each child
+    gc.freeze()
+    log.info("Prepared forking servers in %.2fs", time.monotonic() - start)
+
+
+def _tcp_server(
+    bind_addr,
+    port,
+    check_parent_process,
+    handler_class,
+    multi_client=False,
+    prefork=False,
+):
     if not issubclass(handler_class, PythonLSPServer):
         raise ValueError("Handler class must be an instance of PythonLSPServer")
+    if prefork and not hasattr(os, "fork"):
+        raise ValueError("Forking servers is not supported on this platform")
 
     def shutdown_server(check_parent_process, *args):
-        if check_parent_process:
+        # Other clients may still be connected
+        if check_parent_process and not (multi_client or prefork):
             log.debug("Shutting down server")
             # Shutdown call must be done on a thread, to prevent deadlocks
             stop_thread = threading.Thread(target=server.shutdown)
@@ -78,19 +171,15 @@ def start_tcp_lang_server(bind_addr, port, check_parent_process, handler_class):
         },
     )
 
-    server = socketserver.TCPServer(
-        (bind_addr, port), wrapper_class, bind_and_activate=False
-    )
+    if prefork:
+        server_class = socketserver.ForkingTCPServer
+    elif multi_client:
+        server_class = _ThreadingTCPServer
+    else:
+        server_class = socketserver.TCPServer
+    server = server_class((bind_addr, port), wrapper_class, bind_and_activate=False)
     server.allow_reuse_address = True
-
-    try:
-        server.server_bind()
-        server.server_activate()
-        log.info("Serving %s on (%s, %s)", handler_class.__name__, bind_addr, port)
-        server.serve_forever()
-    finally:
-        log.info("Shutting down")
-        server.server_close()
+    return server
 
 
 def start_io_lang_server(rfile, wfile, check_parent_process, handler_class):
@@ -158,6 +247,65 @@ def start_ws_lang_server(port, check_parent_process, handler_class):
         asyncio.run(run_server())
 
 
+def _timed_handler(method, handler):
+    """Record how long handler takes, including the work it returns to run later.
+
+    The handler is also profiled while the profiler runs for all or this method.
+    """
+
+    @wraps(handler)
+    def wrapped(params):
+        start = time.perf_counter()
+        try:
+            with PROFILER.scope("method", method):
+                result = handler(params)
+        except Exception:
+            METRICS.observe("request", (method,), time.perf_counter() - start)
+            raise
+        if not callable(result):
+            METRICS.observe("request", (method,), time.perf_counter() - start)
+            return result
+
+        def run():
+            # Until the work is done, including the time spent waiting for a worker
+            try:
+                with PROFILER.scope("method", method):
+                    return result()
+            finally:
+                METRICS.observe("request", (method,), time.perf_counter() - start)
+
+        return run
+
+    return wrapped
+
+
+def _file_key(path):
+    """Return what changes when a file is modified, or None if it can't be read."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _NotebookLintState:
+    """What the last lint passes of a notebook were run on and published."""
+
+    def __init__(self):
+        # Held during a lint pass, as the pass across cells runs in its own thread
+        self.lock = threading.Lock()
+        # cell uri -> (source hash, diagnostics of the CELL_LINTERS)
+        self.cell_diagnostics = {}
+        # (cell uri, source hash) of every cell the last pass across cells was
+        # run on, in order
+        self.cell_hashes = None
+        self.is_saved = False
+        # cell uri -> diagnostics of the other linters, across cells
+        self.notebook_diagnostics = {}
+        # cell uri -> published diagnostics
+        self.diagnostics = {}
+
+
 class PythonLSPServer(MethodDispatcher):
     """Implementation of the Microsoft VSCode Language Server Protocol
     https://github.com/Microsoft/language-server-protocol/blob/master/versions/protocol-1-x.md
@@ -172,6 +320,29 @@ class PythonLSPServer(MethodDispatcher):
         self.watching_thread = None
         self.workspaces = {}
         self.uri_workspace_mapper = {}
+        # The uris of self.workspaces, to resolve document uris to them
+        self._workspace_trie = PathTrie()
+        # doc_uri -> CompletionSession of the last complete completion list
+        self._completion_sessions = {}
+        # notebook uri -> _NotebookLintState
+        self._notebook_lint_states = {}
+        # uris of the open text documents with changes that aren't saved
+        self._unsaved_documents = set()
+        # Lints the files that aren't open, if enabled
+        self._lint_scheduler = None
+        # The settings the lint scheduler was started with, and the settings
+        # of the linters it linted the workspaces with
+        self._lint_scheduler_settings = None
+        self._lint_settings = None
+        # Watched file changes not handled yet, see _lint_after_watched_changes
+        self._watched_changes_lock = threading.Lock()
+        self._changed_py_files = set()
+        self._changed_config_dirs = set()
+        # doc_uri -> (source, imported modules) of open documents
+        self._imports_cache = {}
+        # doc_uri -> ((mtime, size) of the file, diagnostics) of the files
+        # linted for workspace/diagnostic, cleared when the settings change
+        self._workspace_diagnostics = {}
 
         self._check_parent_process = check_parent_process
 
@@ -198,6 +369,9 @@ class PythonLSPServer(MethodDispatcher):
         self._dispatchers = []
         self._shutdown = False
 
+        METRICS.add_gauge("requests_in_flight", self._requests_in_flight)
+        METRICS.add_gauge("requests_queued", self._requests_queued)
+
     def start(self):
         """Entry point for the server."""
         self._jsonrpc_stream_reader.listen(self._endpoint.consume)
@@ -215,7 +389,10 @@ class PythonLSPServer(MethodDispatcher):
             item = "invalid_request_after_shutdown"
 
         try:
-            return super().__getitem__(item)
+            handler = super().__getitem__(item)
+            if item in INTERACTIVE_METHODS and self._lint_scheduler is not None:
+                handler = self._pausing_lint_scheduler(handler)
+            return _timed_handler(item, handler)
         except KeyError:
             # Fallback through extra dispatchers
             for dispatcher in self._dispatchers:
@@ -226,7 +403,39 @@ class PythonLSPServer(MethodDispatcher):
 
         raise KeyError()
 
+    def _pausing_lint_scheduler(self, handler):
+        scheduler = self._lint_scheduler
+
+        @wraps(handler)
+        def wrapped(params):
+            with scheduler.interactive():
+                result = handler(params)
+            if not callable(result):
+                return result
+
+            def run():
+                # Asynchronous handlers return the work to be done
+                with scheduler.interactive():
+                    return result()
+
+            return run
+
+        return wrapped
+
+    def _requests_in_flight(self):
+        """Return how many requests are being handled or wait for a worker."""
+        return len(getattr(self._endpoint, "_client_request_futures", ()))
+
+    def _requests_queued(self):
+        """Return how many requests wait for a worker of the endpoint."""
+        executor = getattr(self._endpoint, "_executor_service", None)
+        work_queue = getattr(executor, "_work_queue", None)
+        return work_queue.qsize() if work_queue is not None else 0
+
     def m_shutdown(self, **_kwargs):
+        if self._lint_scheduler is not None:
+            self._lint_scheduler.stop()
+            self._lint_scheduler = None
         for workspace in self.workspaces.values():
             workspace.close()
         self._shutdown = True
@@ -247,13 +456,14 @@ class PythonLSPServer(MethodDispatcher):
             self._jsonrpc_stream_writer.close()
 
     def _match_uri_to_workspace(self, uri):
-        workspace_uri = _utils.match_uri_to_workspace(uri, self.workspaces)
+        workspace_uri = self._workspace_trie.match(uri)
         return self.workspaces.get(workspace_uri, self.workspace)
 
     def _hook(self, hook_name, doc_uri=None, **kwargs):
         """Calls hook_name and returns a list of results from all registered handlers"""
         workspace = self._match_uri_to_workspace(doc_uri)
         doc = workspace.get_document(doc_uri) if doc_uri else None
+        self.config.load_plugins(hook_name)
         hook_handlers = self.config.plugin_manager.subset_hook_caller(
             hook_name, self.config.disabled_plugins
         )
@@ -292,13 +502,20 @@ class PythonLSPServer(MethodDispatcher):
                 "openClose": True,
             },
             "notebookDocumentSync": {
-                "notebookSelector": [{"cells": [{"language": "python"}]}]
+                "notebookSelector": [{"cells": [{"language": "python"}]}],
+                "save": True,
             },
             "workspace": {
                 "workspaceFolders": {"supported": True, "changeNotifications": True}
             },
             "experimental": merge(self._hook("pylsp_experimental_capabilities")),
         }
+        if self._client_pulls_diagnostics():
+            server_capabilities["diagnosticProvider"] = {
+                "identifier": "pylsp",
+                "interFileDependencies": True,
+                "workspaceDiagnostics": True,
+            }
         log.info("Server capabilities: %s", server_capabilities)
         return server_capabilities
 
@@ -331,6 +548,8 @@ class PythonLSPServer(MethodDispatcher):
         )
         self.workspace = Workspace(rootUri, self._endpoint, self.config)
         self.workspaces[rootUri] = self.workspace
+        self._workspace_trie.clear()
+        self._workspace_trie.add(rootUri)
         if workspaceFolders:
             for folder in workspaceFolders:
                 uri = folder["uri"]
@@ -345,6 +564,7 @@ class PythonLSPServer(MethodDispatcher):
                 )
                 workspace_config.update(self.config._settings)
                 self.workspaces[uri] = Workspace(uri, self._endpoint, workspace_config)
+                self._workspace_trie.add(uri)
 
         self._dispatchers = self._hook("pylsp_dispatchers")
         self._hook("pylsp_initialize")
@@ -381,6 +601,10 @@ class PythonLSPServer(MethodDispatcher):
 
     def m_initialized(self, **_kwargs):
         self._hook("pylsp_initialized")
+        for workspace in self.workspaces.values():
+            workspace.preallocate_progress_tokens(PROGRESS_TOKENS_PREALLOCATED)
+            workspace.start_indexing()
+        self._configure_lint_scheduler()
 
     def code_actions(self, doc_uri: str, range: Dict, context: Dict):
         return flatten(
@@ -393,6 +617,16 @@ class PythonLSPServer(MethodDispatcher):
     def completions(self, doc_uri, position):
         workspace = self._match_uri_to_workspace(doc_uri)
         document = workspace.get_document(doc_uri)
+        context = completion_context(document, position)
+        session = self._completion_sessions.get(doc_uri)
+        if session is not None:
+            # Fast path: the user typed more of the word that was completed.
+            items = session.filter(
+                context, key=lambda item: item.get("filterText", item["label"])
+            )
+            if items is not None:
+                return {"isIncomplete": False, "items": items}
+
         ignored_names = None
         if isinstance(document, Cell):
             # We need to get the ignored names from the whole notebook document
@@ -401,7 +635,21 @@ class PythonLSPServer(MethodDispatcher):
         completions = self._hook(
             "pylsp_completions", doc_uri, position=position, ignored_names=ignored_names
         )
-        return {"isIncomplete": False, "items": flatten(completions)}
+        is_incomplete = False
+        items = []
+        for completion_list in completions:
+            if isinstance(completion_list, dict):
+                is_incomplete = is_incomplete or completion_list["isIncomplete"]
+                completion_list = completion_list["items"]
+            items.extend(completion_list)
+
+        # Some plugins (e.g. autoimport) only search once a word was started,
+        # so lists computed for an empty prefix can't be narrowed down.
+        if context is not None and context.prefix and not is_incomplete:
+            self._completion_sessions[doc_uri] = CompletionSession(context, items)
+        else:
+            self._completion_sessions.pop(doc_uri, None)
+        return {"isIncomplete": is_incomplete, "items": items}
 
     def completion_item_resolve(self, completion_item):
         doc_uri = completion_item.get("data", {}).get("doc_uri", None)
@@ -436,87 +684,343 @@ class PythonLSPServer(MethodDispatcher):
     def hover(self, doc_uri, position):
         return self._hook("pylsp_hover", doc_uri, position=position) or {"contents": ""}
 
-    @_utils.debounce(LINT_DEBOUNCE_S, keyed_by="doc_uri")
+    def _client_pulls_diagnostics(self):
+        """Whether the client requests the diagnostics of text documents itself."""
+        return "diagnostic" in self.config.capabilities.get("textDocument", {})
+
+    def _refresh_diagnostics(self):
+        """Ask a client pulling diagnostics to request them again."""
+        workspace_capabilities = self.config.capabilities.get("workspace", {})
+        if workspace_capabilities.get("diagnostics", {}).get("refreshSupport", False):
+            self._endpoint.request("workspace/diagnostic/refresh")
+
+    @_utils.debounce(LINT_DEBOUNCE_S, keyed_by=("self", "doc_uri"))
     def lint(self, doc_uri, is_saved):
         # Since we're debounced, the document may no longer be open
         workspace = self._match_uri_to_workspace(doc_uri)
         document_object = workspace.documents.get(doc_uri, None)
         if isinstance(document_object, Document):
-            self._lint_text_document(doc_uri, workspace, is_saved=is_saved)
+            if not self._client_pulls_diagnostics():
+                self._lint_text_document(doc_uri, workspace, is_saved=is_saved)
         elif isinstance(document_object, Notebook):
-            self._lint_notebook_document(document_object, workspace)
+            self._lint_notebook_document(document_object, workspace, is_saved)
+
+    def _lint_diagnostics(self, doc_uri, workspace, is_saved):
+        # One progress token for the whole pass rather than one per linter
+        with workspace.report_progress("lint", aggregate=True), METRICS.timed("lint"):
+            return flatten(self._hook("pylsp_lint", doc_uri, is_saved=is_saved))
 
     def _lint_text_document(self, doc_uri, workspace, is_saved):
-        workspace.publish_diagnostics(
-            doc_uri, flatten(self._hook("pylsp_lint", doc_uri, is_saved=is_saved))
-        )
+        diagnostics = self._lint_diagnostics(doc_uri, workspace, is_saved)
+        workspace.publish_diagnostics(doc_uri, diagnostics)
 
-    def _lint_notebook_document(self, notebook_document, workspace):
-        """
-        Lint a notebook document.
+    def _configure_lint_scheduler(self):
+        """(Re)start linting the workspaces in the background, if enabled.
 
-        This is a bit more complicated than linting a text document, because we need to
-        send the entire notebook document to the pylsp_lint hook, but we need to send
-        the diagnostics back to the client on a per-cell basis.
+        The scheduler is only restarted if its own settings changed, and every
+        file is only linted again if the settings of the linters changed.
         """
+        all_settings = self.config.settings()
+        settings = all_settings.get("diagnostics", {})
+        # Clients pulling diagnostics decide themselves what to lint and when.
+        enabled = (
+            settings.get("background", False) and not self._client_pulls_diagnostics()
+        )
+        scheduler_settings = (
+            enabled,
+            settings.get("max_workers", 2),
+            settings.get("background_cpu_limit", 0.5),
+        )
+        lint_settings = json.dumps(
+            [settings, all_settings.get("plugins", {})], sort_keys=True, default=str
+        )
+        if (
+            self._lint_scheduler is not None
+            and scheduler_settings == self._lint_scheduler_settings
+        ):
+            if lint_settings != self._lint_settings:
+                self._lint_settings = lint_settings
+                self._schedule_workspace_lint(list(self.workspaces.values()))
+            return
 
-        # First, we create a temp TextDocument that represents the whole notebook
-        # contents. We'll use this to send to the pylsp_lint hook.
-        random_uri = str(uuid.uuid4())
+        if self._lint_scheduler is not None:
+            self._lint_scheduler.stop()
+            self._lint_scheduler = None
+        self._lint_scheduler_settings = scheduler_settings
+        self._lint_settings = lint_settings
+        if not enabled:
+            return
+        self._lint_scheduler = _lint_scheduler.LintScheduler(
+            self._lint_in_background,
+            self.workspace.report_progress,
+            max_workers=settings.get("max_workers", 2),
+            cpu_limit=settings.get("background_cpu_limit", 0.5),
+        )
+        self._lint_scheduler.start()
+        self._schedule_workspace_lint(list(self.workspaces.values()))
 
-        # cell_list helps us map the diagnostics back to the correct cell later.
-        cell_list: List[Dict[str, Any]] = []
+    def _schedule_workspace_lint(self, workspaces):
+        """Queue the Python files of the workspaces, from a separate thread."""
+        scheduler = self._lint_scheduler
+        if scheduler is None:
+            return
+        exclude = self.config.settings().get("diagnostics", {}).get("exclude")
 
-        offset = 0
-        total_source = ""
-        for cell in notebook_document.cells:
-            cell_uri = cell["document"]
-            cell_document = workspace.get_cell_document(cell_uri)
+        def schedule():
+            for workspace in workspaces:
+                if not workspace.is_local():
+                    continue
+                for path in _utils.find_python_files(workspace.root_path, exclude):
+                    try:
+                        mtime = os.stat(path).st_mtime
+                    except OSError:
+                        continue
+                    scheduler.schedule(
+                        uris.from_fs_path(path),
+                        _lint_scheduler.PRIORITY_WORKSPACE,
+                        mtime,
+                    )
 
-            num_lines = cell_document.line_count
+        threading.Thread(target=schedule, daemon=True).start()
 
-            data = {
-                "uri": cell_uri,
-                "line_start": offset,
-                "line_end": offset + num_lines - 1,
-                "source": cell_document.source,
-            }
+    def _lint_in_background(self, doc_uri):
+        workspace = self._match_uri_to_workspace(doc_uri)
+        if doc_uri in workspace.documents:
+            # Open documents are linted as they change
+            return
+        if os.path.exists(uris.to_fs_path(doc_uri)):
+            diagnostics = flatten(self._hook("pylsp_lint", doc_uri, is_saved=True))
+        else:
+            diagnostics = []
+        workspace.publish_diagnostics(doc_uri, diagnostics)
 
-            cell_list.append(data)
-            if offset == 0:
-                total_source = cell_document.source
-            else:
-                total_source += "\n" + cell_document.source
+    def document_diagnostic(self, doc_uri, previous_result_id=None):
+        workspace = self._match_uri_to_workspace(doc_uri)
+        if isinstance(workspace.get_maybe_document(doc_uri), Cell):
+            # Diagnostics of cells are published along with the whole notebook
+            return workspace.diagnostic_report([], previous_result_id)
+        is_saved = doc_uri not in self._unsaved_documents
+        diagnostics = self._lint_diagnostics(doc_uri, workspace, is_saved)
+        return workspace.diagnostic_report(diagnostics, previous_result_id)
+
+    def workspace_diagnostic(self, previous_result_ids, partial_result_token=None):
+        """Lint the Python files of the workspaces that aren't open.
+
+        Files are linted by a bounded pool of threads. The diagnostics of a file
+        are reused while its modification time and size, the settings, and the
+        modules it imports stay the same. With a
+        ``partial_result_token``, reports are streamed to the client in
+        batches as they are ready and the final result is empty.
+        """
+        settings = self.config.settings().get("diagnostics", {})
+        if not settings.get("workspace", False):
+            return {"items": []}
 
-            offset += num_lines
+        doc_uris = set()
+        for workspace in self.workspaces.values():
+            if not workspace.is_local():
+                continue
+            for path in _utils.find_python_files(
+                workspace.root_path, settings.get("exclude")
+            ):
+                doc_uris.add(uris.from_fs_path(path))
+        doc_uris = sorted(
+            doc_uri
+            for doc_uri in doc_uris
+            if doc_uri not in self._match_uri_to_workspace(doc_uri).documents
+        )
 
-        workspace.put_document(random_uri, total_source)
+        def report(doc_uri):
+            workspace = self._match_uri_to_workspace(doc_uri)
+            file_key = _file_key(uris.to_fs_path(doc_uri))
+            cached = self._workspace_diagnostics.get(doc_uri)
+            if file_key is not None and cached is not None and cached[0] == file_key:
+                diagnostics = cached[1]
+            else:
+                diagnostics = flatten(self._hook("pylsp_lint", doc_uri, is_saved=True))
+                self._workspace_diagnostics[doc_uri] = (file_key, diagnostics)
+            return {
+                "uri": doc_uri,
+                "version": None,
+                **workspace.diagnostic_report(
+                    diagnostics, previous_result_ids.get(doc_uri)
+                ),
+            }
 
-        try:
-            document_diagnostics = flatten(
-                self._hook("pylsp_lint", random_uri, is_saved=True)
+        def send_partial_result(reports):
+            self._endpoint.notify(
+                Workspace.M_PROGRESS,
+                params={"token": partial_result_token, "value": {"items": reports}},
             )
 
-            # Now we need to map the diagnostics back to the correct cell and publish them.
-            # Note: this is O(n*m) in the number of cells and diagnostics, respectively.
-            for cell in cell_list:
-                cell_diagnostics = []
-                for diagnostic in document_diagnostics:
-                    start_line = diagnostic["range"]["start"]["line"]
-                    end_line = diagnostic["range"]["end"]["line"]
-
-                    if start_line > cell["line_end"] or end_line < cell["line_start"]:
-                        continue
-                    diagnostic["range"]["start"]["line"] = (
-                        start_line - cell["line_start"]
+        items = []
+        batch = []
+        # Report the progress of the linters of all files with a single token
+        with self.workspace.report_progress(
+            "lint workspace", aggregate=True
+        ) as progress_message:
+            report = self.workspace.bind_progress(report)
+            with ThreadPoolExecutor(settings.get("max_workers", 2)) as executor:
+                futures = [executor.submit(report, doc_uri) for doc_uri in doc_uris]
+                for done, future in enumerate(as_completed(futures), 1):
+                    progress_message(
+                        f"{done}/{len(futures)} files", done * 100 // len(futures)
                     )
-                    diagnostic["range"]["end"]["line"] = end_line - cell["line_start"]
-                    cell_diagnostics.append(diagnostic)
+                    try:
+                        file_report = future.result()
+                    except Exception:
+                        log.exception("Failed to lint a workspace file")
+                        continue
+                    if partial_result_token is None:
+                        items.append(file_report)
+                        continue
+                    batch.append(file_report)
+                    if len(batch) >= PARTIAL_RESULT_BATCH_SIZE:
+                        send_partial_result(batch)
+                        batch = []
+        if batch:
+            send_partial_result(batch)
+        return {"items": items}
+
+    def _lint_notebook_document(
+        self, notebook_document, workspace, is_saved=True, across_cells=None
+    ):
+        """
+        Lint a notebook document.
+
+        This is a bit more complicated than linting a text document, because we need to
+        send notebook contents to the pylsp_lint hook, but we need to send the
+        diagnostics back to the client on a per-cell basis.
+
+        The CELL_LINTERS only look at one cell at a time, so they only lint the cells
+        that changed since the last pass. Diagnostics of the other linters can depend
+        on the other cells (e.g. undefined names), so they lint the whole notebook:
+        when it is opened or saved and when cells are added or removed, or, after
+        edits of cells, once the edits paused for NOTEBOOK_LINT_DEBOUNCE_S. Set
+        across_cells to lint the whole notebook now, or not at all. Only the
+        diagnostics of the cells whose diagnostics changed are published.
+        """
+        cell_data = notebook_document.cell_data()
+        cell_hashes = [(uri, hash(data["source"])) for uri, data in cell_data.items()]
+        state = self._notebook_lint_states.setdefault(
+            notebook_document.uri, _NotebookLintState()
+        )
+        with state.lock:
+            self._lint_notebook_cells(cell_data, cell_hashes, workspace, state)
+
+            lint_across_cells = cell_hashes != state.cell_hashes or (
+                is_saved and not state.is_saved
+            )
+            if across_cells is None and lint_across_cells:
+                cells_moved = [uri for uri, _ in cell_hashes] != [
+                    uri for uri, _ in state.cell_hashes or []
+                ]
+                across_cells = is_saved or cells_moved
+                if not across_cells:
+                    self._lint_notebook_across_cells(notebook_document.uri)
+            if across_cells and lint_across_cells:
+                self._lint_notebook_source(
+                    notebook_document, cell_data, workspace, state, is_saved
+                )
+                state.cell_hashes = cell_hashes
+                state.is_saved = is_saved
+
+            # Diagnostics across cells of edited cells stay until the next pass
+            published = {}
+            for cell_uri in cell_data:
+                cell_diagnostics = (
+                    state.notebook_diagnostics.get(cell_uri, [])
+                    + state.cell_diagnostics[cell_uri][1]
+                )
+                published[cell_uri] = cell_diagnostics
+                if state.diagnostics.get(cell_uri) != cell_diagnostics:
+                    workspace.publish_diagnostics(cell_uri, cell_diagnostics)
+            state.diagnostics = published
+
+    @_utils.debounce(NOTEBOOK_LINT_DEBOUNCE_S, keyed_by=("self", "notebook_uri"))
+    def _lint_notebook_across_cells(self, notebook_uri):
+        # Since we're debounced, the notebook may no longer be open
+        workspace = self._match_uri_to_workspace(notebook_uri)
+        notebook_document = workspace.documents.get(notebook_uri)
+        if isinstance(notebook_document, Notebook):
+            self._lint_notebook_document(
+                notebook_document, workspace, is_saved=False, across_cells=True
+            )
+
+    def _lint_notebook_cells(self, cell_data, cell_hashes, workspace, state):
+        """Lint the cells that changed with the CELL_LINTERS."""
+        cell_diagnostics = {}
+        for cell_uri, source_hash in cell_hashes:
+            previous = state.cell_diagnostics.get(cell_uri)
+            if previous is not None and previous[0] == source_hash:
+                cell_diagnostics[cell_uri] = previous
+                continue
+            source = cell_data[cell_uri]["source"]
+            # Cells don't end with a newline, unlike modules
+            if source and not source.endswith("\n"):
+                source += "\n"
+            random_uri = str(uuid.uuid4())
+            workspace.put_document(random_uri, source)
+            try:
+                diagnostics = self._notebook_lint_diagnostics(
+                    random_uri, workspace, is_saved=False, cell_linters=True
+                )
+            finally:
+                workspace.rm_document(random_uri)
+            cell_diagnostics[cell_uri] = (source_hash, diagnostics)
+        state.cell_diagnostics = cell_diagnostics
 
-                workspace.publish_diagnostics(cell["uri"], cell_diagnostics)
+    def _lint_notebook_source(
+        self, notebook_document, cell_data, workspace, state, is_saved
+    ):
+        """Lint the whole notebook with the linters that aren't CELL_LINTERS."""
+        # First, we create a temp TextDocument that represents the whole notebook
+        # contents. We'll use this to send to the pylsp_lint hook.
+        random_uri = str(uuid.uuid4())
+        workspace.put_document(random_uri, notebook_document.source)
+        try:
+            document_diagnostics = self._notebook_lint_diagnostics(
+                random_uri, workspace, is_saved=is_saved, cell_linters=False
+            )
         finally:
             workspace.rm_document(random_uri)
 
+        # Now we need to map the diagnostics back to the correct cell.
+        # Note: this is O(n*m) in the number of cells and diagnostics, respectively.
+        notebook_diagnostics = {}
+        for cell_uri, cell in cell_data.items():
+            cell_diagnostics = []
+            for diagnostic in document_diagnostics:
+                start_line = diagnostic["range"]["start"]["line"]
+                end_line = diagnostic["range"]["end"]["line"]
+
+                if start_line > cell["line_end"] or end_line < cell["line_start"]:
+                    continue
+                diagnostic["range"]["start"]["line"] = start_line - cell["line_start"]
+                diagnostic["range"]["end"]["line"] = end_line - cell["line_start"]
+                cell_diagnostics.append(diagnostic)
+            notebook_diagnostics[cell_uri] = cell_diagnostics
+        state.notebook_diagnostics = notebook_diagnostics
+
+    def _notebook_lint_diagnostics(self, doc_uri, workspace, is_saved, cell_linters):
+        """Lint with only the CELL_LINTERS, or with all the other linters."""
+        self.config.load_plugins("pylsp_lint")
+        plugin_manager = self.config.plugin_manager
+        skipped = list(self.config.disabled_plugins)
+        for name, plugin in plugin_manager.list_name_plugin():
+            if (name in CELL_LINTERS) != cell_linters:
+                skipped.append(plugin)
+        hook_handlers = plugin_manager.subset_hook_caller("pylsp_lint", skipped)
+        with workspace.report_progress("lint", aggregate=True), METRICS.timed("lint"):
+            return flatten(
+                hook_handlers(
+                    config=self.config,
+                    workspace=workspace,
+                    document=workspace.get_document(doc_uri),
+                    is_saved=is_saved,
+                )
+            )
+
     def references(self, doc_uri, position, exclude_declaration):
         return flatten(
             self._hook(
@@ -568,6 +1072,8 @@ class PythonLSPServer(MethodDispatcher):
             workspace.publish_diagnostics(cell["uri"], [])
             workspace.rm_document(cell["uri"])
         workspace.rm_document(notebookDocument["uri"])
+        self._notebook_lint_states.pop(notebookDocument["uri"], None)
+        self._imports_cache.pop(notebookDocument["uri"], None)
 
     def m_notebook_document__did_change(
         self, notebookDocument=None, change=None, **_kwargs
@@ -620,9 +1126,12 @@ class PythonLSPServer(MethodDispatcher):
                 else:
                     # Case 3
                     # Cell documents
+                    lint_state = self._notebook_lint_states.get(notebookDocument["uri"])
                     for cell_document in structure["didClose"]:
                         workspace.rm_document(cell_document["uri"])
                         workspace.publish_diagnostics(cell_document["uri"], [])
+                        if lint_state is not None:
+                            lint_state.diagnostics.pop(cell_document["uri"], None)
                     # Cell metadata which is removed from Notebook
                     workspace.remove_notebook_cells(
                         notebookDocument["uri"], start, cell_delete_count
@@ -640,15 +1149,25 @@ class PythonLSPServer(MethodDispatcher):
                 # Case 4.2
                 for cell in text_content:
                     cell_uri = cell["document"]["uri"]
-                    # Even though the protocol says that `changes` is an array, we assume that it's always a single
-                    # element array that contains the last change to the cell source.
-                    workspace.update_document(cell_uri, cell["changes"][0])
+                    workspace.update_document_changes(cell_uri, cell["changes"])
+        self.lint(notebookDocument["uri"], is_saved=False)
+
+    def m_notebook_document__did_save(self, notebookDocument=None, **_kwargs):
         self.lint(notebookDocument["uri"], is_saved=True)
 
     def m_text_document__did_close(self, textDocument=None, **_kwargs):
         workspace = self._match_uri_to_workspace(textDocument["uri"])
-        workspace.publish_diagnostics(textDocument["uri"], [])
+        if self._lint_scheduler is None:
+            workspace.publish_diagnostics(textDocument["uri"], [])
         workspace.rm_document(textDocument["uri"])
+        self._completion_sessions.pop(textDocument["uri"], None)
+        self._unsaved_documents.discard(textDocument["uri"])
+        self._imports_cache.pop(textDocument["uri"], None)
+        if self._lint_scheduler is not None:
+            # Keep reporting the diagnostics of the file, now as it is on disk
+            self._lint_scheduler.schedule(
+                textDocument["uri"], _lint_scheduler.PRIORITY_EDITED, time.time()
+            )
 
     def m_text_document__did_open(self, textDocument=None, **_kwargs):
         workspace = self._match_uri_to_workspace(textDocument["uri"])
@@ -658,19 +1177,26 @@ class PythonLSPServer(MethodDispatcher):
             version=textDocument.get("version"),
         )
         self._hook("pylsp_document_did_open", textDocument["uri"])
+        self._unsaved_documents.discard(textDocument["uri"])
         self.lint(textDocument["uri"], is_saved=True)
 
     def m_text_document__did_change(
         self, contentChanges=None, textDocument=None, **_kwargs
     ):
         workspace = self._match_uri_to_workspace(textDocument["uri"])
-        for change in contentChanges:
-            workspace.update_document(
-                textDocument["uri"], change, version=textDocument.get("version")
-            )
+        workspace.update_document_changes(
+            textDocument["uri"], contentChanges, version=textDocument.get("version")
+        )
+        self._unsaved_documents.add(textDocument["uri"])
         self.lint(textDocument["uri"], is_saved=False)
 
     def m_text_document__did_save(self, textDocument=None, **_kwargs):
+        workspace = self._match_uri_to_workspace(textDocument["uri"])
+        workspace.file_changed(textDocument["uri"])
+        self._unsaved_documents.discard(textDocument["uri"])
+        if self._client_pulls_diagnostics():
+            # Some linters only run on saved files
+            self._refresh_diagnostics()
         self.lint(textDocument["uri"], is_saved=True)
         self.document_did_save(textDocument["uri"])
 
@@ -691,13 +1217,14 @@ class PythonLSPServer(MethodDispatcher):
         cell_data = notebookDocument.cell_data()
 
         # Concatenate all cells to be a single temporary document
-        total_source = "\n".join(data["source"] for data in cell_data.values())
-        with workspace.temp_document(total_source) as temp_uri:
+        with workspace.temp_document(notebookDocument.source) as temp_uri:
             # update position to be the position in the temp document
             if position is not None:
                 position["line"] += cell_data[cellDocument.uri]["line_start"]
 
             completions = self.completions(temp_uri, position)
+            # The temporary document is gone, and its uri never used again
+            self._completion_sessions.pop(temp_uri, None)
 
             # Translate temp_uri locations to cell document locations
             for item in completions.get("items", []):
@@ -723,8 +1250,7 @@ class PythonLSPServer(MethodDispatcher):
         cell_data = notebookDocument.cell_data()
 
         # Concatenate all cells to be a single temporary document
-        total_source = "\n".join(data["source"] for data in cell_data.values())
-        with workspace.temp_document(total_source) as temp_uri:
+        with workspace.temp_document(notebookDocument.source) as temp_uri:
             # update position to be the position in the temp document
             if position is not None:
                 position["line"] += cell_data[cellDocument.uri]["line_start"]
@@ -756,6 +1282,11 @@ class PythonLSPServer(MethodDispatcher):
             return self._cell_document__definition(document, position, **_kwargs)
         return self.definitions(textDocument["uri"], position)
 
+    def m_text_document__diagnostic(
+        self, textDocument=None, previousResultId=None, **_kwargs
+    ):
+        return lambda: self.document_diagnostic(textDocument["uri"], previousResultId)
+
     def m_text_document__document_highlight(
         self, textDocument=None, position=None, **_kwargs
     ):
@@ -794,14 +1325,32 @@ class PythonLSPServer(MethodDispatcher):
     ):
         return self.signature_help(textDocument["uri"], position)
 
+    def m_workspace__diagnostic(
+        self, previousResultIds=None, partialResultToken=None, **_kwargs
+    ):
+        previous_result_ids = {
+            result_id["uri"]: result_id["value"]
+            for result_id in previousResultIds or []
+        }
+        return lambda: self.workspace_diagnostic(
+            previous_result_ids, partialResultToken
+        )
+
     def m_workspace__did_change_configuration(self, settings=None):
         if self.config is not None:
             self.config.update((settings or {}).get("pylsp", {}))
+        self._completion_sessions.clear()
+        self._notebook_lint_states.clear()
+        self._workspace_diagnostics.clear()
         for workspace in self.workspaces.values():
             workspace.update_config(settings)
             self._hook("pylsp_workspace_configuration_changed")
             for doc_uri in workspace.documents:
                 self.lint(doc_uri, is_saved=False)
+        self._configure_lint_scheduler()
+        if self._client_pulls_diagnostics():
+            # Settings affect the diagnostics of every file
+            self._refresh_diagnostics()
 
     def m_workspace__did_change_workspace_folders(self, event=None, **_kwargs):
         if event is None:
@@ -813,6 +1362,7 @@ class PythonLSPServer(MethodDispatcher):
             if "uri" in removed_info:
                 removed_uri = removed_info["uri"]
                 self.workspaces.pop(removed_uri, None)
+                self._workspace_trie.remove(removed_uri)
 
         for added_info in added:
             if "uri" in added_info:
@@ -827,6 +1377,8 @@ class PythonLSPServer(MethodDispatcher):
                 self.workspaces[added_uri] = Workspace(
                     added_uri, self._endpoint, workspace_config
                 )
+                self._workspace_trie.add(added_uri)
+                self._schedule_workspace_lint([self.workspaces[added_uri]])
 
         root_workspace_removed = any(
             removed_info["uri"] == self.root_uri for removed_info in removed
@@ -860,25 +1412,111 @@ class PythonLSPServer(MethodDispatcher):
 
     def m_workspace__did_change_watched_files(self, changes=None, **_kwargs):
         changed_py_files = set()
-        config_changed = False
+        changed_config_dirs = set()
         for d in changes or []:
             if d["uri"].endswith(PYTHON_FILE_EXTENSIONS):
                 changed_py_files.add(d["uri"])
+                workspace = self._match_uri_to_workspace(d["uri"])
+                workspace.file_changed(d["uri"], d.get("type"))
             elif d["uri"].endswith(CONFIG_FILEs):
-                config_changed = True
+                changed_config_dirs.add(os.path.dirname(uris.to_fs_path(d["uri"])))
+            else:
+                # e.g. a package directory that was moved or deleted
+                _utils.invalidate_package_dirs(uris.to_fs_path(d["uri"]))
 
-        if config_changed:
+        if changed_config_dirs:
             self.config.settings.cache_clear()
         elif not changed_py_files:
             # Only externally changed python files and lint configs may result in changed diagnostics.
             return
 
+        with self._watched_changes_lock:
+            self._changed_py_files |= changed_py_files
+            self._changed_config_dirs |= changed_config_dirs
+        self._lint_after_watched_changes()
+
+    @_utils.debounce(WATCHED_FILES_DEBOUNCE_S, keyed_by="self")
+    def _lint_after_watched_changes(self):
+        """Lint the documents affected by the files changed on disk.
+
+        Runs once a burst of changes, e.g. from switching git branches, is over.
+        Open documents are only linted again if they import a changed module,
+        directly or (once the import graph is built) indirectly, or if a lint
+        config in one of their parent directories changed.
+        """
+        with self._watched_changes_lock:
+            changed_py_files, self._changed_py_files = self._changed_py_files, set()
+            config_dirs, self._changed_config_dirs = self._changed_config_dirs, set()
+
+        changed_modules = {
+            _imports.module_name(uris.to_fs_path(doc_uri))
+            for doc_uri in changed_py_files
+        }
+        dependent_paths = self._dependent_paths(changed_modules)
+
+        if config_dirs:
+            self._workspace_diagnostics.clear()
+        for path in dependent_paths:
+            self._workspace_diagnostics.pop(uris.from_fs_path(path), None)
+
+        if self._lint_scheduler is not None:
+            if config_dirs:
+                self._schedule_workspace_lint(list(self.workspaces.values()))
+            for doc_uri in changed_py_files:
+                self._lint_scheduler.schedule(
+                    doc_uri, _lint_scheduler.PRIORITY_EDITED, time.time()
+                )
+            for path in dependent_paths:
+                self._lint_scheduler.schedule(
+                    uris.from_fs_path(path), _lint_scheduler.PRIORITY_DEPENDENT
+                )
+
+        if self._client_pulls_diagnostics():
+            self._refresh_diagnostics()
+
         for workspace in self.workspaces.values():
-            for doc_uri in workspace.documents:
+            for doc_uri, document in list(workspace.documents.items()):
                 # Changes in doc_uri are already handled by m_text_document__did_save
-                if doc_uri not in changed_py_files:
+                if doc_uri in changed_py_files or isinstance(document, Cell):
+                    continue
+                path = uris.to_fs_path(doc_uri)
+                if (
+                    path in dependent_paths
+                    or any(_utils.is_subpath(path, d) for d in config_dirs)
+                    or _imports.depends_on(
+                        self._document_imports(document), changed_modules
+                    )
+                ):
                     self.lint(doc_uri, is_saved=False)
 
+    def _dependent_paths(self, modules):
+        """Return the paths of the workspace modules importing any of modules."""
+        paths = set()
+        for workspace in self.workspaces.values():
+            graph = workspace.import_graph
+            if graph is None or not graph.is_ready():
+                continue
+            # The imports of the changed files themselves may have changed
+            workspace.apply_file_changes()
+            for module in modules:
+                paths.update(graph.importers(module, transitive=True))
+        return paths
+
+    def _document_imports(self, document):
+        """Return the modules imported by an open document or notebook."""
+        source = document.source
+        cached = self._imports_cache.get(document.uri)
+        if cached is not None and cached[0] is source:
+            return cached[1]
+        if isinstance(document, Notebook):
+            imports = _imports.imported_modules(source)
+        else:
+            imports = _imports.imported_modules(
+                source, _imports.package_name(document.path)
+            )
+        self._imports_cache[document.uri] = (source, imports)
+        return imports
+
     def m_workspace__execute_command(self, command=None, arguments=None):
         return self.execute_command(command, arguments)
 
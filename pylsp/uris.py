@@ -6,13 +6,18 @@
 https://github.com/Microsoft/vscode-uri/blob/e59cab84f5df6265aed18ae5f43552d3eef13bb9/lib/index.ts
 """
 
+import functools
 import re
+from typing import Iterable, List, Optional
 from urllib import parse
 
 from pylsp import IS_WIN
 
 RE_DRIVE_LETTER_PATH = re.compile(r"^\/[a-zA-Z]:")
 
+# Number of conversions memoized by each of to_fs_path, from_fs_path and uri_with
+CACHE_SIZE = 4096
+
 
 def urlparse(uri):
     """Parse and decode the parts of a URI."""
@@ -49,6 +54,7 @@ def urlunparse(parts):
     )
 
 
+@functools.lru_cache(maxsize=CACHE_SIZE)
 def to_fs_path(uri):
     """Returns the filesystem path of the given URI.
 
@@ -77,6 +83,7 @@ def to_fs_path(uri):
     return value
 
 
+@functools.lru_cache(maxsize=CACHE_SIZE)
 def from_fs_path(path):
     """Returns a URI for the given filesystem path."""
     scheme = "file"
@@ -85,6 +92,7 @@ def from_fs_path(path):
     return urlunparse((scheme, netloc, path, params, query, fragment))
 
 
+@functools.lru_cache(maxsize=CACHE_SIZE)
 def uri_with(
     uri, scheme=None, netloc=None, path=None, params=None, query=None, fragment=None
 ):
@@ -108,6 +116,34 @@ def uri_with(
     )
 
 
+def from_fs_paths(paths: Iterable[str]) -> List[str]:
+    """Return the URIs of many paths, converting each distinct path once."""
+    converted = {}
+    result = []
+    for path in paths:
+        uri = converted.get(path)
+        if uri is None:
+            uri = converted[path] = from_fs_path(path)
+        result.append(uri)
+    return result
+
+
+def uris_with_paths(uri, paths: Iterable[Optional[str]]) -> List[str]:
+    """Return uri with each of paths as its path, converting each distinct path once.
+
+    Useful to build many locations, most of them in the same few modules. A
+    path of None stands for uri itself.
+    """
+    converted = {None: uri}
+    result = []
+    for path in paths:
+        path_uri = converted.get(path)
+        if path_uri is None:
+            path_uri = converted[path] = uri_with(uri, path=path)
+        result.append(path_uri)
+    return result
+
+
 def _normalize_win_path(path):
     netloc = ""
 
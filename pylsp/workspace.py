@@ -2,7 +2,8 @@
 # Copyright 2021- Python Language Server Contributors.
 
 import functools
-import io
+import hashlib
+import json
 import logging
 import os
 import re
@@ -13,7 +14,11 @@ from typing import Callable, Generator, List, Optional
 
 import jedi
 
-from . import _utils, lsp, uris
+from . import _progress, _shared, _utils, lsp, uris
+from ._file_cache import FILE_CACHE
+from ._file_indexer import FileIndexer
+from ._import_graph import ImportGraph
+from ._name_index import NameIndex
 
 log = logging.getLogger(__name__)
 
@@ -24,6 +29,30 @@ RE_START_WORD = re.compile("[A-Za-z_0-9]*$")
 RE_END_WORD = re.compile("^[A-Za-z_0-9]*")
 
 
+def diagnostics_digest(diagnostics) -> str:
+    """Return a digest identifying a list of diagnostics by its contents."""
+    data = json.dumps(diagnostics, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def _apply_range_change(lines, change_range, text):
+    """Replace the given range of a list of lines (with line ends) by text."""
+    start_line = change_range["start"]["line"]
+    start_col = change_range["start"]["character"]
+    end_line = change_range["end"]["line"]
+    end_col = change_range["end"]["character"]
+
+    # Check for an edit occuring at the very end of the file
+    if start_line >= len(lines):
+        last_line = lines.pop() if lines else ""
+        lines.extend((last_line + text).splitlines(True))
+        return
+
+    end = lines[end_line][end_col:] if end_line < len(lines) else ""
+    new = lines[start_line][:start_col] + text + end
+    lines[start_line : end_line + 1] = new.splitlines(True)
+
+
 def lock(method):
     """Define an atomic region over a method."""
 
@@ -37,8 +66,8 @@ def lock(method):
 
 class Workspace:
     M_PUBLISH_DIAGNOSTICS = "textDocument/publishDiagnostics"
-    M_PROGRESS = "$/progress"
-    M_INITIALIZE_PROGRESS = "window/workDoneProgress/create"
+    M_PROGRESS = _progress.M_PROGRESS
+    M_INITIALIZE_PROGRESS = _progress.M_INITIALIZE_PROGRESS
     M_APPLY_EDIT = "workspace/applyEdit"
     M_SHOW_MESSAGE = "window/showMessage"
 
@@ -49,14 +78,20 @@ class Workspace:
         self._root_uri_scheme = uris.urlparse(self._root_uri)[0]
         self._root_path = uris.to_fs_path(self._root_uri)
         self._docs = {}
+        # uri -> digest of the diagnostics last published for it
+        self._diagnostics_digests = {}
 
-        # Cache jedi environments
-        self._environments = {}
+        self._name_index = None
+        self._import_graph = None
+        self._file_indexer = None
+        self._lock = RLock()
+        self._progress = _progress.ProgressMultiplexer(endpoint)
 
         # Whilst incubating, keep rope private
         self.__rope = None
         self.__rope_config = None
         self.__rope_autoimport = None
+        self.__rope_autoimport_key = None
 
     def _rope_autoimport(
         self,
@@ -65,9 +100,24 @@ class Workspace:
     ):
         from rope.contrib.autoimport.sqlite import AutoImport
 
+        # Shared with the other workspaces on the same root and settings in this
+        # process
+        key = (
+            self._root_path,
+            rope_config.get("ropeFolder"),
+            tuple(rope_config.get("extensionModules", [])),
+            memory,
+        )
+        if self.__rope_autoimport is not None and key != self.__rope_autoimport_key:
+            # The settings changed since the database was created
+            _shared.release_autoimport(self.__rope_autoimport_key)
+            self.__rope_autoimport = None
         if self.__rope_autoimport is None:
             project = self._rope_project_builder(rope_config)
-            self.__rope_autoimport = AutoImport(project, memory=memory)
+            self.__rope_autoimport = _shared.acquire_autoimport(
+                key, lambda: AutoImport(project, memory=memory)
+            )
+            self.__rope_autoimport_key = key
         return self.__rope_autoimport
 
     def _rope_project_builder(self, rope_config):
@@ -100,6 +150,63 @@ class Workspace:
     def root_uri(self):
         return self._root_uri
 
+    @property
+    def name_index(self):
+        """Return the workspace's identifier index, or None if it is disabled.
+
+        The index is built in a background thread on first access. Callers must
+        check ``is_ready()`` before relying on it to be complete.
+        """
+        return self.start_indexing()
+
+    @property
+    def import_graph(self):
+        """Return the graph of imports between the workspace's modules, or None.
+
+        It is built along with the name index, when indexing is enabled.
+        Callers must check ``is_ready()`` before relying on it to be complete.
+        """
+        self.start_indexing()
+        return self._import_graph
+
+    @lock
+    def start_indexing(self):
+        """Start building the name index and import graph in the background.
+
+        Returns the name index, or None if indexing is disabled.
+        """
+        settings = self._config.settings().get("index", {}) if self._config else {}
+        if not settings.get("enabled", False) or not self.is_local():
+            return None
+        if self._file_indexer is None:
+            exclude = settings.get("exclude")
+            self._name_index = NameIndex(self._root_path, exclude=exclude)
+            self._import_graph = ImportGraph(self._root_path, exclude=exclude)
+            # Both are built from a single walk and read of the files
+            self._file_indexer = FileIndexer(
+                self._root_path, exclude, [self._name_index, self._import_graph]
+            )
+            self._file_indexer.start()
+        return self._name_index
+
+    def file_changed(self, doc_uri, change_type=lsp.FileChangeType.Changed):
+        """Update the workspace caches after a file changed on disk.
+
+        The indexes are updated in the background, see ``apply_file_changes``.
+        """
+        path = uris.to_fs_path(doc_uri)
+        FILE_CACHE.invalidate(path)
+        _utils.invalidate_package_dirs(path)
+        if self._file_indexer is not None:
+            self._file_indexer.file_changed(
+                path, deleted=change_type == lsp.FileChangeType.Deleted
+            )
+
+    def apply_file_changes(self):
+        """Update the indexes with the file changes not applied yet, in this thread."""
+        if self._file_indexer is not None:
+            self._file_indexer.apply_changes()
+
     def is_local(self):
         return (self._root_uri_scheme in ["", "file"]) and os.path.exists(
             self._root_path
@@ -159,11 +266,17 @@ class Workspace:
 
     def rm_document(self, doc_uri):
         self._docs.pop(doc_uri)
+        self._diagnostics_digests.pop(doc_uri, None)
 
     def update_document(self, doc_uri, change, version=None):
         self._docs[doc_uri].apply_change(change)
         self._docs[doc_uri].version = version
 
+    def update_document_changes(self, doc_uri, changes, version=None):
+        """Apply all the content changes of a didChange notification at once."""
+        self._docs[doc_uri].apply_changes(changes)
+        self._docs[doc_uri].version = version
+
     def update_config(self, settings):
         self._config.update((settings or {}).get("pylsp", {}))
         for doc_uri in self.documents:
@@ -177,11 +290,46 @@ class Workspace:
         return self._endpoint.request(self.M_APPLY_EDIT, {"edit": edit})
 
     def publish_diagnostics(self, doc_uri, diagnostics):
+        """Send diagnostics to the client unless it already has the same ones."""
+        digest = diagnostics_digest(diagnostics)
+        if self._diagnostics_digests.get(doc_uri) == digest:
+            return
+        self._diagnostics_digests[doc_uri] = digest
         self._endpoint.notify(
             self.M_PUBLISH_DIAGNOSTICS,
             params={"uri": doc_uri, "diagnostics": diagnostics},
         )
 
+    def diagnostic_report(self, diagnostics, previous_result_id=None):
+        """Return a document diagnostic report for a pull diagnostics request.
+
+        The digest of the diagnostics is used as ``resultId``, so the report is
+        ``unchanged`` if the client's previous result had the same diagnostics.
+        """
+        result_id = diagnostics_digest(diagnostics)
+        if result_id == previous_result_id:
+            return {
+                "kind": lsp.DocumentDiagnosticReportKind.Unchanged,
+                "resultId": result_id,
+            }
+        return {
+            "kind": lsp.DocumentDiagnosticReportKind.Full,
+            "resultId": result_id,
+            "items": diagnostics,
+        }
+
+    def client_supports_progress(self) -> bool:
+        if not self._config:
+            return False
+        return self._config.capabilities.get("window", {}).get(
+            "workDoneProgress", False
+        )
+
+    def preallocate_progress_tokens(self, count: int):
+        """Have the client create progress tokens ahead of their use."""
+        if self.client_supports_progress():
+            self._progress.preallocate(count)
+
     @contextmanager
     def report_progress(
         self,
@@ -189,41 +337,27 @@ class Workspace:
         message: Optional[str] = None,
         percentage: Optional[int] = None,
         skip_token_initialization: bool = False,
+        aggregate: bool = False,
     ) -> Generator[Callable[[str, Optional[int]], None], None, None]:
         """
         Report progress to the editor / client.
 
-        ``skip_token_initialization` is necessary due to some current
-        limitations of our LSP implementation. When `report_progress`
-        is used from a synchronous LSP handler, the token initialization
-        will time out because we can't receive the response.
+        Reporting never blocks: notifications are queued until the client
+        acknowledged the progress token, and reports are rate limited.
 
-        Many editors will still correctly show the progress messages though, which
-        is why we are giving progress users the option to skip the initialization
-        of the progress token.
-        """
-        if self._config:
-            client_supports_progress_reporting = self._config.capabilities.get(
-                "window", {}
-            ).get("workDoneProgress", False)
-        else:
-            client_supports_progress_reporting = False
-
-        if client_supports_progress_reporting:
-            token = self._progress_begin(
-                title, message, percentage, skip_token_initialization
-            )
-
-            def progress_message(
-                message: str, percentage: Optional[int] = None
-            ) -> None:
-                self._progress_report(token, message, percentage)
+        ``skip_token_initialization`` sends notifications for a token the
+        client wasn't asked to create. Many editors will still correctly show
+        the progress messages then.
 
-            try:
+        With ``aggregate``, progress reported by nested calls on the same
+        thread, e.g. by each linter during a lint pass, is sent as messages of
+        this progress instead of with tokens of their own.
+        """
+        if self.client_supports_progress():
+            with self._progress.progress(
+                title, message, percentage, skip_token_initialization, aggregate
+            ) as progress_message:
                 yield progress_message
-            finally:
-                self._progress_end(token)
-
             return
 
         # FALLBACK:
@@ -236,85 +370,13 @@ class Workspace:
 
         yield dummy_progress_message
 
-    def _progress_begin(
-        self,
-        title: str,
-        message: Optional[str] = None,
-        percentage: Optional[int] = None,
-        skip_token_initialization: bool = False,
-    ) -> str:
-        token = str(uuid.uuid4())
-
-        if not skip_token_initialization:
-            try:
-                self._endpoint.request(
-                    self.M_INITIALIZE_PROGRESS, {"token": token}
-                ).result(timeout=1.0)
-            except Exception:
-                log.warning(
-                    "There was an error while trying to initialize progress reporting."
-                    "Likely progress reporting was used in a synchronous LSP handler, "
-                    "which is not supported by progress reporting yet. "
-                    "To prevent waiting for the timeout you can set "
-                    "`skip_token_initialization=True`. "
-                    "Not every editor will show progress then, but many will.",
-                    exc_info=True,
-                )
-
-        value = {
-            "kind": "begin",
-            "title": title,
-        }
-        if message is not None:
-            value["message"] = message
-        if percentage is not None:
-            value["percentage"] = percentage
-
-        self._endpoint.notify(
-            self.M_PROGRESS,
-            params={
-                "token": token,
-                "value": value,
-            },
-        )
-        return token
+    def bind_progress(self, func: Callable) -> Callable:
+        """Wrap ``func`` so it reports progress in the current aggregating progress.
 
-    def _progress_report(
-        self,
-        token: str,
-        message: Optional[str] = None,
-        percentage: Optional[int] = None,
-    ) -> None:
-        value = {
-            "kind": "report",
-        }
-        if message:
-            value["message"] = message
-        if percentage:
-            value["percentage"] = percentage
-
-        self._endpoint.notify(
-            self.M_PROGRESS,
-            params={
-                "token": token,
-                "value": value,
-            },
-        )
-
-    def _progress_end(self, token: str, message: Optional[str] = None) -> None:
-        value = {
-            "kind": "end",
-        }
-        if message:
-            value["message"] = message
-
-        self._endpoint.notify(
-            self.M_PROGRESS,
-            params={
-                "token": token,
-                "value": value,
-            },
-        )
+        Use it for work handed to other threads from within
+        ``report_progress(..., aggregate=True)``.
+        """
+        return self._progress.bind(func)
 
     def show_message(self, message, msg_type=lsp.MessageType.Info):
         self._endpoint.notify(
@@ -373,8 +435,11 @@ class Workspace:
         )
 
     def close(self):
+        if self._file_indexer is not None:
+            self._file_indexer.stop()
         if self.__rope_autoimport:
-            self.__rope_autoimport.close()
+            _shared.release_autoimport(self.__rope_autoimport_key)
+            self.__rope_autoimport = None
 
 
 class Document:
@@ -422,56 +487,40 @@ class Document:
     @lock
     def source(self):
         if self._source is None:
-            with io.open(self.path, "r", encoding="utf-8") as f:
-                return f.read()
+            return FILE_CACHE.read(self.path)
         return self._source
 
     def update_config(self, settings):
         self._config.update((settings or {}).get("pylsp", {}))
 
-    @lock
     def apply_change(self, change):
         """Apply a change to the document."""
-        text = change["text"]
-        change_range = change.get("range")
-
-        if not change_range:
-            # The whole file has changed
-            self._source = text
-            return
-
-        start_line = change_range["start"]["line"]
-        start_col = change_range["start"]["character"]
-        end_line = change_range["end"]["line"]
-        end_col = change_range["end"]["character"]
-
-        # Check for an edit occuring at the very end of the file
-        if start_line == len(self.lines):
-            self._source = self.source + text
-            return
-
-        new = io.StringIO()
+        self.apply_changes([change])
 
-        # Iterate over the existing document until we hit the edit range,
-        # at which point we write the new text, then loop until we hit
-        # the end of the range and continue writing.
-        for i, line in enumerate(self.lines):
-            if i < start_line:
-                new.write(line)
-                continue
+    @lock
+    def apply_changes(self, changes):
+        """Apply the changes of a didChange notification, in order.
 
-            if i > end_line:
-                new.write(line)
+        Range changes are applied to a single list of lines, so that the new
+        source is only materialized once however many changes there are.
+        """
+        lines = None
+        for change in changes:
+            text = change["text"]
+            change_range = change.get("range")
+
+            if not change_range:
+                # The whole file has changed
+                self._source = text
+                lines = None
                 continue
 
-            if i == start_line:
-                new.write(line[:start_col])
-                new.write(text)
-
-            if i == end_line:
-                new.write(line[end_col:])
+            if lines is None:
+                lines = self.lines
+            _apply_range_change(lines, change_range, text)
 
-        self._source = new.getvalue()
+        if lines is not None:
+            self._source = "".join(lines)
 
     def offset_at_position(self, position):
         """Return the byte-offset pointed at by the given position."""
@@ -560,13 +609,7 @@ class Document:
         if environment_path is None:
             environment = jedi.api.environment.get_cached_default_environment()
         else:
-            if environment_path in self._workspace._environments:
-                environment = self._workspace._environments[environment_path]
-            else:
-                environment = jedi.api.environment.create_environment(
-                    path=environment_path, safe=False, env_vars=env_vars
-                )
-                self._workspace._environments[environment_path] = environment
+            environment = _shared.jedi_environment(environment_path, env_vars=env_vars)
 
         return environment
 
@@ -594,22 +637,46 @@ class Notebook:
         self.cells = cells or []
         self.metadata = metadata or {}
         self._lock = RLock()
+        # Cached result of cell_data, reset when cells are added, removed or changed
+        self._cell_data = None
+        self._source = None
+        # (cell uri, all_scopes, definitions, references) -> names in that cell
+        self._cell_names = {}
 
     def __str__(self):
         return "Notebook with URI '%s'" % str(self.uri)
 
+    @lock
     def add_cells(self, new_cells: List, start: int) -> None:
         self.cells[start:start] = new_cells
+        for cell in new_cells:
+            self.cell_changed(cell["document"])
 
+    @lock
     def remove_cells(self, start: int, delete_count: int) -> None:
+        for cell in self.cells[start : start + delete_count]:
+            self.cell_changed(cell["document"])
         del self.cells[start : start + delete_count]
 
+    @lock
+    def cell_changed(self, cell_uri: str) -> None:
+        """Forget what was computed from a cell after it was added, removed or edited."""
+        self._cell_data = None
+        self._source = None
+        for key in [key for key in self._cell_names if key[0] == cell_uri]:
+            del self._cell_names[key]
+
+    @lock
     def cell_data(self):
         """Extract current cell data.
 
         Returns a dict (ordered by cell position) where the key is the cell uri and the
-        value is a dict with line_start, line_end, and source attributes.
+        value is a dict with line_start, line_end, and source attributes. The result is
+        cached until a cell changes and must not be modified.
         """
+        if self._cell_data is not None:
+            return self._cell_data
+
         cell_data = {}
         offset = 0
         for cell in self.cells:
@@ -622,8 +689,19 @@ class Notebook:
                 "source": cell_document.source,
             }
             offset += num_lines
+        self._cell_data = cell_data
         return cell_data
 
+    @property
+    @lock
+    def source(self):
+        """The sources of all cells, joined as a single document."""
+        if self._source is None:
+            self._source = "\n".join(
+                data["source"] for data in self.cell_data().values()
+            )
+        return self._source
+
     @lock
     def jedi_names(
         self,
@@ -635,6 +713,8 @@ class Notebook:
         """
         Get the names in the notebook up to a certain cell.
 
+        The names of each cell are cached until that cell changes.
+
         Parameters
         ----------
         up_to_cell_uri: str, optional
@@ -643,11 +723,21 @@ class Notebook:
         names = set()
         for cell in self.cells:
             cell_uri = cell["document"]
-            cell_document = self.workspace.get_cell_document(cell_uri)
-            names.update(cell_document.jedi_names(all_scopes, definitions, references))
+            key = (cell_uri, all_scopes, definitions, references)
+            cell_names = self._cell_names.get(key)
+            if cell_names is None:
+                cell_document = self.workspace.get_cell_document(cell_uri)
+                cell_names = frozenset(
+                    name.name
+                    for name in cell_document.jedi_names(
+                        all_scopes, definitions, references
+                    )
+                )
+                self._cell_names[key] = cell_names
+            names.update(cell_names)
             if cell_uri == up_to_cell_uri:
                 break
-        return {name.name for name in names}
+        return names
 
 
 class Cell(Document):
@@ -678,6 +768,14 @@ class Cell(Document):
         self.language_id = language_id
         self.notebook_uri = notebook_uri
 
+    def apply_changes(self, changes):
+        super().apply_changes(changes)
+        # Not holding the lock of the cell, Notebook.cell_data takes it while
+        # holding the lock of the notebook
+        notebook = self._workspace.get_maybe_document(self.notebook_uri)
+        if notebook is not None:
+            notebook.cell_changed(self.uri)
+
     @property
     @lock
     def line_count(self):
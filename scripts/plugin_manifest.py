@@ -0,0 +1,75 @@
+import json
+import sys
+from argparse import ArgumentParser, FileType
+from importlib import import_module
+
+from pylsp import PYLSP
+from pylsp.config.config import entry_points
+
+# Plugins shipped with pylsp, which are imported lazily using the manifest
+PACKAGE_PREFIX = "pylsp.plugins."
+
+
+def describe_plugin(module) -> dict:
+    """Return the hooks a plugin implements and the settings it defines."""
+    hooks = sorted(
+        name
+        for name in dir(module)
+        if name.startswith(PYLSP + "_")
+        and hasattr(getattr(module, name), PYLSP + "_impl")
+    )
+    description = {"module": module.__name__, "hooks": hooks}
+    if "pylsp_settings" in hooks:
+        description["settings"] = module.pylsp_settings()
+    return description
+
+
+def manifest() -> dict:
+    plugins = {}
+    for entry_point in entry_points(group=PYLSP):
+        if entry_point.value.startswith(PACKAGE_PREFIX):
+            module = import_module(entry_point.value)
+            plugins[entry_point.name] = describe_plugin(module)
+    return dict(sorted(plugins.items()))
+
+
+def format_value(value, indent: str = "") -> str:
+    """Format value like ruff does, one item per line and with magic trailing commas."""
+    inner = indent + "    "
+    if isinstance(value, dict) and value:
+        items = [
+            f"{inner}{json.dumps(key)}: {format_value(item, inner)},\n"
+            for key, item in value.items()
+        ]
+        return "{\n" + "".join(items) + indent + "}"
+    if isinstance(value, list) and value:
+        items = [f"{inner}{format_value(item, inner)},\n" for item in value]
+        return "[\n" + "".join(items) + indent + "]"
+    if isinstance(value, str):
+        return json.dumps(value)
+    return repr(value)
+
+
+def convert_manifest(plugins: dict, source: str = None) -> str:
+    lines = [
+        "# Copyright 2021- Python Language Server Contributors.",
+        "",
+        f"# This file was generated by `{source}`. Please do not edit it directly.",
+        "",
+        "PLUGINS = " + format_value(plugins),
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv):
+    parser = ArgumentParser()
+    parser.add_argument("manifest", type=FileType("w+"), default=sys.stdout)
+    arguments = parser.parse_args(argv[1:])
+    arguments.manifest.write(
+        convert_manifest(manifest(), source="scripts/plugin_manifest.py")
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv)
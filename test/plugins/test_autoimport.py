@@ -61,13 +61,13 @@ def autoimport_workspace(tmp_path_factory) -> Workspace:
 
 
 @pytest.fixture
-def completions(config: Config, autoimport_workspace: Workspace, request):
+def completions(autoimport_workspace: Workspace, request):
     document, position = request.param
     com_position = {"line": 0, "character": position}
     autoimport_workspace.put_document(DOC_URI, source=document)
     doc = autoimport_workspace.get_document(DOC_URI)
     yield pylsp_autoimport_completions(
-        config, autoimport_workspace, doc, com_position, None
+        autoimport_workspace._config, autoimport_workspace, doc, com_position, None
     )
     autoimport_workspace.rm_document(DOC_URI)
 
@@ -93,6 +93,21 @@ def test_autoimport_completion(completions):
     )
 
 
+def test_autoimport_completion_truncated(autoimport_workspace):
+    autoimport_workspace.put_document(DOC_URI, source="pathli ")
+    doc = autoimport_workspace.get_document(DOC_URI)
+    with patch("pylsp.plugins.rope_autoimport.MAX_RESULTS_COMPLETIONS", 0):
+        completions = pylsp_autoimport_completions(
+            autoimport_workspace._config,
+            autoimport_workspace,
+            doc,
+            {"line": 0, "character": 6},
+            None,
+        )
+    autoimport_workspace.rm_document(DOC_URI)
+    assert completions == {"isIncomplete": True, "items": []}
+
+
 @pytest.mark.parametrize("completions", [("""import """, 7)], indirect=True)
 def test_autoimport_import(completions):
     assert len(completions) == 0
@@ -6,18 +6,30 @@ import os
 import sys
 from pathlib import Path
 from typing import Dict, NamedTuple
+from unittest.mock import Mock, patch
 
 import pytest
 
 from pylsp import lsp, uris
 from pylsp._utils import JEDI_VERSION
+from pylsp.plugins._disk_cache import DISK_CACHE, MISSING, DiskCache
+from pylsp.plugins._resolvers import (
+    DOCUMENTATION_RESOLVER,
+    LABEL_RESOLVER,
+    SNIPPET_RESOLVER,
+)
+from pylsp.plugins.jedi_completion import CACHE_STATS_COMMAND
 from pylsp.plugins.jedi_completion import (
     pylsp_completion_item_resolve as pylsp_jedi_completion_item_resolve,
 )
 from pylsp.plugins.jedi_completion import pylsp_completions as pylsp_jedi_completions
+from pylsp.plugins.jedi_completion import (
+    pylsp_execute_command as pylsp_jedi_execute_command,
+)
 from pylsp.plugins.rope_completion import pylsp_completions as pylsp_rope_completions
 from pylsp.workspace import Document
 
+DEFAULT_CACHED_MODULES = {"pandas", "numpy", "tensorflow", "matplotlib"}
 PY2 = sys.version[0] == "2"
 LINUX = sys.platform.startswith("linux")
 CI = os.environ.get("CI")
@@ -596,3 +608,183 @@ def test_file_completions(workspace, tmpdir):
         ("bar" + "\\\\") if os.name == "nt" else ("bar" + "\\/")
     )
     assert completions[1]["insertText"] == 'foo.txt"'
+
+
+def test_jedi_completion_disk_cache(config, workspace, tmpdir):
+    # Over 'i' in os.path.isabs(...)
+    com_position = {"line": 1, "character": 15}
+    doc = Document(DOC_URI, workspace, DOC)
+    config.update(
+        {
+            "plugins": {
+                "jedi": {"disk_cache": True, "disk_cache_dir": str(tmpdir)},
+                "jedi_completion": {"cache_for": ["os"]},
+            }
+        }
+    )
+
+    try:
+        items = pylsp_jedi_completions(config, doc, com_position)
+        assert "isfile(path)" in {i["label"] for i in items}
+        assert DISK_CACHE.enabled
+        assert tmpdir.join("jedi_cache.sqlite3").check()
+
+        # A fresh in-memory cache must be filled from disk, without inference.
+        LABEL_RESOLVER.clear()
+        with patch.object(LABEL_RESOLVER, "resolve") as resolve:
+            items = pylsp_jedi_completions(config, doc, com_position)
+        resolve.assert_not_called()
+        assert "isfile(path)" in {i["label"] for i in items}
+    finally:
+        DISK_CACHE.close()
+        LABEL_RESOLVER.cached_modules = DEFAULT_CACHED_MODULES
+        SNIPPET_RESOLVER.cached_modules = DEFAULT_CACHED_MODULES
+        DOCUMENTATION_RESOLVER.cached_modules = DEFAULT_CACHED_MODULES
+
+
+def test_disk_cache_batches_writes(tmpdir):
+    cache = DiskCache()
+    name = Mock(module_path=__file__, full_name="test.name", line=1, column=0)
+    # Without the environment of the thread, nothing is cached
+    cache.configure(True, str(tmpdir))
+    cache.put("label", name, "name()")
+    assert cache.get("label", name) is MISSING
+
+    cache.configure(True, str(tmpdir), "python:jedi")
+    try:
+        with patch.object(cache, "flush", wraps=cache.flush) as flush:
+            cache.put("label", name, "name()")
+            cache.put("snippet", name, "name($0)")
+        flush.assert_not_called()
+        assert cache.get("label", name) == "name()"
+
+        cache.flush()
+        other = DiskCache()
+        other.configure(True, str(tmpdir), "python:jedi")
+        assert other.get("snippet", name) == "name($0)"
+        other.configure(True, str(tmpdir), "other:jedi")
+        assert other.get("snippet", name) is MISSING
+        other.close()
+    finally:
+        cache.close()
+
+
+def test_jedi_completion_cache_limits(config, workspace):
+    # Over 'i' in os.path.isabs(...)
+    com_position = {"line": 1, "character": 15}
+    doc = Document(DOC_URI, workspace, DOC)
+    config.update({"plugins": {"jedi_completion": {"cache_for": ["os"]}}})
+
+    try:
+        LABEL_RESOLVER.clear()
+        pylsp_jedi_completions(config, doc, com_position)
+        pylsp_jedi_completions(config, doc, com_position)
+        stats = pylsp_jedi_execute_command(CACHE_STATS_COMMAND)["label"]
+        assert stats["hits"] > 0
+        assert stats["evictions"] == 0
+
+        config.update(
+            {
+                "plugins": {
+                    "jedi_completion": {"cache_for": ["os"], "cache_max_entries": 3}
+                }
+            }
+        )
+        pylsp_jedi_completions(config, doc, com_position)
+        stats = pylsp_jedi_execute_command(CACHE_STATS_COMMAND)["label"]
+        assert stats["entries"] == 3
+        assert stats["evictions"] > 0
+        assert stats["memory"] > 0
+
+        assert pylsp_jedi_execute_command("some.other.command") is None
+    finally:
+        for resolver in (LABEL_RESOLVER, SNIPPET_RESOLVER, DOCUMENTATION_RESOLVER):
+            resolver.cached_modules = DEFAULT_CACHED_MODULES
+            resolver.max_entries = 5000
+            resolver.max_memory = 32 * 1024 * 1024
+            resolver.clear()
+
+
+def test_jedi_completion_max_items(config, workspace):
+    com_position = {"line": 1, "character": 3}
+    doc = Document(DOC_URI, workspace, "import os\nos.")
+
+    config.update({"plugins": {"jedi_completion": {"max_items": 5}}})
+    completions = pylsp_jedi_completions(config, doc, com_position)
+    assert completions["isIncomplete"]
+    labels = [item["label"] for item in completions["items"]]
+    assert len(labels) == 5
+    assert not any(label.startswith("_") for label in labels)
+    assert set(doc.shared_data["LAST_JEDI_COMPLETIONS"]) == set(labels)
+
+    # A narrower prefix brings the remaining items into the window
+    doc = Document(DOC_URI, workspace, "import os\nos.pat")
+    completions = pylsp_jedi_completions(config, doc, {"line": 1, "character": 6})
+    assert not isinstance(completions, dict)
+    assert "pathsep" in {item["label"] for item in completions}
+
+
+def test_completion_list_is_incomplete(pylsp):
+    pylsp.workspace.put_document(DOC_URI, "import os\nos.")
+    pylsp.config.update({"plugins": {"jedi_completion": {"max_items": 5}}})
+    completions = pylsp.completions(DOC_URI, {"line": 1, "character": 3})
+    assert completions["isIncomplete"]
+    assert len(completions["items"]) == 5
+
+
+def _range(start_line, start_character, end_line, end_character):
+    return {
+        "start": {"line": start_line, "character": start_character},
+        "end": {"line": end_line, "character": end_character},
+    }
+
+
+def test_jedi_completion_session(config, workspace):
+    doc = Document(DOC_URI, workspace, "import os\nos.")
+    completions = pylsp_jedi_completions(config, doc, {"line": 1, "character": 3})
+    assert "path" in {item["label"] for item in completions}
+
+    # Typing more of the word filters the previous completions
+    doc.apply_change({"text": "pa", "range": _range(1, 3, 1, 3)})
+    with patch.object(Document, "jedi_script") as jedi_script:
+        completions = pylsp_jedi_completions(config, doc, {"line": 1, "character": 5})
+    jedi_script.assert_not_called()
+    labels = {item["label"] for item in completions}
+    assert "path" in labels
+    assert all(label.lower().startswith("pa") for label in labels)
+
+    # Any other change requires completing again
+    doc.apply_change({"text": "import sys\n", "range": _range(0, 0, 0, 0)})
+    completions = pylsp_jedi_completions(config, doc, {"line": 2, "character": 5})
+    assert "path" in {item["label"] for item in completions}
+    assert doc.shared_data["LAST_JEDI_COMPLETION_SESSION"][1].context.start == (2, 3)
+
+
+def test_completion_session_fast_path(pylsp):
+    pylsp.workspace.put_document(DOC_URI, "import os\nos.pa")
+    completions = pylsp.completions(DOC_URI, {"line": 1, "character": 5})
+    assert "path" in {item["label"] for item in completions["items"]}
+
+    document = pylsp.workspace.get_document(DOC_URI)
+    document.apply_change({"text": "t", "range": _range(1, 5, 1, 5)})
+    with patch.object(pylsp, "_hook") as hook:
+        completions = pylsp.completions(DOC_URI, {"line": 1, "character": 6})
+    hook.assert_not_called()
+    labels = {item["label"] for item in completions["items"]}
+    assert "path" in labels
+    assert "pardir" not in labels
+
+
+def test_completion_session_ignores_case(pylsp):
+    pylsp.workspace.put_document(DOC_URI, "import os\nos.p")
+    completions = pylsp.completions(DOC_URI, {"line": 1, "character": 4})
+    assert "PathLike" in {item["label"] for item in completions["items"]}
+
+    document = pylsp.workspace.get_document(DOC_URI)
+    document.apply_change({"text": "a", "range": _range(1, 4, 1, 4)})
+    with patch.object(pylsp, "_hook") as hook:
+        completions = pylsp.completions(DOC_URI, {"line": 1, "character": 5})
+    hook.assert_not_called()
+    labels = {item["label"] for item in completions["items"]}
+    assert {"path", "PathLike"} <= labels
+    assert "pipe" not in labels
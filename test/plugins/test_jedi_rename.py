@@ -103,3 +103,29 @@ def test_jedi_rename(tmp_workspace, config):
             "newText": "bar = 12",
         }
     ]
+
+
+def test_jedi_rename_with_name_index(tmp_workspace, config):
+    config.update({"index": {"enabled": True}})
+    tmp_workspace._config = config
+    assert tmp_workspace.name_index.wait(timeout=10)
+
+    position = {"line": 0, "character": 6}
+    DOC_URI = uris.from_fs_path(os.path.join(tmp_workspace.root_path, DOC_NAME))
+    doc = Document(DOC_URI, tmp_workspace)
+
+    result = pylsp_rename(config, tmp_workspace, doc, position, "ShouldBeRenamed")
+    changes = result.get("documentChanges")
+    assert len(changes) == 2
+
+    assert changes[0]["textDocument"]["uri"] == doc.uri
+    assert changes[0]["edits"][0]["newText"] == (
+        "class ShouldBeRenamed():\n    pass\n\nclass Test2(ShouldBeRenamed):\n    pass\n"
+    )
+
+    expected = "from test1 import ShouldBeRenamed\nx = ShouldBeRenamed()\n"
+    if os.name == "nt":
+        expected = expected.replace("\n", "\r\n")
+    uri_extra = uris.from_fs_path(os.path.join(tmp_workspace.root_path, DOC_NAME_EXTRA))
+    assert changes[1]["textDocument"]["uri"] == uri_extra
+    assert changes[1]["edits"][0]["newText"] == expected
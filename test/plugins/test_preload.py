@@ -0,0 +1,80 @@
+# Copyright 2021- Python Language Server Contributors.
+
+import json
+from unittest.mock import patch
+
+from pylsp import uris
+from pylsp.plugins.preload_imports import (
+    Preloader,
+    UsageSnapshot,
+    load_snapshot,
+    pylsp_document_did_open,
+    pylsp_initialized,
+)
+from pylsp.workspace import Document
+
+DOC_URI = uris.from_fs_path(__file__)
+
+
+def test_preloader():
+    preloader = Preloader(workers=2)
+    preloader.preload(["json", "pylsp_no_such_module", "json"])
+    preloader.wait(timeout=10)
+
+    assert preloader.pending == []
+    assert preloader.is_failed("pylsp_no_such_module")
+    assert not preloader.is_failed("json")
+
+    # Modules are only imported once
+    with patch.object(Preloader, "_run") as run:
+        preloader.preload(["json"])
+    run.assert_not_called()
+
+
+def test_preloader_prioritize():
+    preloader = Preloader()
+    with patch.object(Preloader, "_run"):
+        preloader.preload(["a", "b", "c", "d"])
+        preloader.prioritize({"d", "b", "other"})
+    assert preloader.pending == ["b", "d", "a", "c"]
+
+
+def test_usage_snapshot(tmpdir):
+    path = str(tmpdir.join("preload", "env.json"))
+    snapshot = UsageSnapshot(path)
+    with patch.object(UsageSnapshot, "save"):
+        snapshot.record({"numpy", "os"})
+        snapshot.record({"numpy"})
+    UsageSnapshot.save.__wrapped__(snapshot)
+
+    assert json.loads(tmpdir.join("preload", "env.json").read()) == {
+        "numpy": 2,
+        "os": 1,
+    }
+    assert load_snapshot(path) == ["numpy", "os"]
+    assert load_snapshot(str(tmpdir.join("missing.json"))) == []
+    # Counts carry over to the next session
+    assert UsageSnapshot(path)._counts == {"numpy": 2, "os": 1}
+
+
+def test_preload_after_initialized(config, workspace, tmpdir):
+    preloader = Preloader()
+    config.update({"plugins": {"preload": {"modules": ["json", "a", "b"]}}})
+    doc = Document(DOC_URI, workspace, "import b\nfrom os import path\n")
+
+    with patch("pylsp.plugins.preload_imports.preloader", preloader):
+        with patch.object(Preloader, "_run"):
+            pylsp_initialized(config, workspace)
+            pylsp_document_did_open(config, doc)
+        assert preloader.pending == ["b", "json", "a"]
+
+        snapshot_path = str(tmpdir.join("snapshot.json"))
+        tmpdir.join("snapshot.json").write(json.dumps({"c": 3, "a": 5}))
+        config.update({"plugins": {"preload": {"modules": ["d"], "snapshot": True}}})
+        with patch(
+            "pylsp.plugins.preload_imports.snapshot_path", return_value=snapshot_path
+        ), patch.object(Preloader, "_run"), patch.object(UsageSnapshot, "save"):
+            pylsp_initialized(config, workspace)
+            assert preloader.pending == ["b", "json", "a", "c", "d"]
+            pylsp_document_did_open(config, doc)
+            assert preloader.pending == ["b", "json", "a", "c", "d"]
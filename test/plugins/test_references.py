@@ -41,13 +41,15 @@ def test_references(tmp_workspace):
     DOC1_URI = uris.from_fs_path(os.path.join(tmp_workspace.root_path, DOC1_NAME))
     doc1 = Document(DOC1_URI, tmp_workspace)
 
-    refs = pylsp_references(doc1, position, exclude_declaration=False)
+    refs = pylsp_references(tmp_workspace, doc1, position, exclude_declaration=False)
 
     # Definition, the import and the instantiation
     assert len(refs) == 3
 
     # Briefly check excluding the definitions (also excludes imports, only counts uses)
-    no_def_refs = pylsp_references(doc1, position, exclude_declaration=True)
+    no_def_refs = pylsp_references(
+        tmp_workspace, doc1, position, exclude_declaration=True
+    )
     assert len(no_def_refs) == 1
 
     # Make sure our definition is correctly located
@@ -71,7 +73,7 @@ def test_references_builtin(tmp_workspace):
     doc2_uri = uris.from_fs_path(os.path.join(str(tmp_workspace.root_path), DOC2_NAME))
     doc2 = Document(doc2_uri, tmp_workspace)
 
-    refs = pylsp_references(doc2, position, exclude_declaration=False)
+    refs = pylsp_references(tmp_workspace, doc2, position, exclude_declaration=False)
     assert len(refs) >= 1
 
     expected = {
@@ -80,3 +82,26 @@ def test_references_builtin(tmp_workspace):
     }
     ranges = [r["range"] for r in refs]
     assert expected in ranges
+
+
+def test_references_with_name_index(tmp_workspace):
+    tmp_workspace._config.update({"index": {"enabled": True}})
+    assert tmp_workspace.name_index.wait(timeout=10)
+
+    position = {"line": 0, "character": 8}
+    DOC1_URI = uris.from_fs_path(os.path.join(tmp_workspace.root_path, DOC1_NAME))
+    doc1 = Document(DOC1_URI, tmp_workspace)
+
+    refs = pylsp_references(tmp_workspace, doc1, position, exclude_declaration=False)
+    assert len(refs) == 3
+    no_def_refs = pylsp_references(
+        tmp_workspace, doc1, position, exclude_declaration=True
+    )
+    assert len(no_def_refs) == 1
+
+    ranges = [(u["uri"] == DOC1_URI, u["range"]["start"]) for u in refs]
+    assert ranges == [
+        (True, {"line": 0, "character": 6}),
+        (False, {"line": 0, "character": 18}),
+        (False, {"line": 3, "character": 4}),
+    ]
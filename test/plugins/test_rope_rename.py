@@ -71,3 +71,18 @@ def test_rope_rename(tmp_workspace, config):
             "newText": "bar = 12",
         }
     ]
+
+
+def test_rope_rename_with_name_index(tmp_workspace, config):
+    config.update({"index": {"enabled": True}})
+    tmp_workspace._config = config
+    assert tmp_workspace.name_index.wait(timeout=10)
+
+    position = {"line": 0, "character": 0}
+    DOC_URI = uris.from_fs_path(os.path.join(tmp_workspace.root_path, DOC_NAME_SIMPLE))
+    doc = Document(DOC_URI, tmp_workspace)
+
+    result = pylsp_rename(config, tmp_workspace, doc, position, "bar")
+    changes = result.get("documentChanges")
+    assert len(changes) == 1
+    assert changes[0]["edits"][0]["newText"] == "bar = 12"
@@ -1,12 +1,16 @@
 # Copyright 2021- Python Language Server Contributors.
 
-from test.test_notebook_document import wait_for_condition
-from test.test_utils import send_initialize_request
+import os
+import runpy
 from unittest.mock import patch
 
 import pytest
 
-from pylsp import IS_WIN
+from pylsp import IS_WIN, uris
+from pylsp.config.config import Config
+from pylsp.config.plugin_manifest import PLUGINS
+from test.test_notebook_document import wait_for_condition
+from test.test_utils import send_initialize_request
 
 INITIALIZATION_OPTIONS = {
     "pylsp": {
@@ -49,3 +53,29 @@ def test_set_flake8_using_workspace_did_change_configuration(client_server_pair)
             assert server.workspace._config.settings().get("plugins").get(key).get(
                 "enabled"
             ) == value.get("enabled")
+
+
+def test_lazy_plugins(tmpdir):
+    config = Config(uris.from_fs_path(str(tmpdir)), {}, 0, {})
+    pm = config.plugin_manager
+    # Settings of plugins that aren't imported yet are known
+    assert config.plugin_settings("pylint")["enabled"] is False
+    assert not pm.has_plugin("pyflakes")
+
+    config.load_plugins("pylsp_lint")
+    assert pm.has_plugin("pyflakes")
+    assert pm.has_plugin("pycodestyle")
+    # Disabled plugins aren't imported
+    assert not pm.has_plugin("pylint")
+    assert not pm.has_plugin("jedi_completion")
+
+    config.update({"plugins": {"pylint": {"enabled": True}}})
+    config.load_plugins("pylsp_lint")
+    assert pm.has_plugin("pylint")
+
+
+def test_plugin_manifest_up_to_date():
+    script = os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), "scripts", "plugin_manifest.py"
+    )
+    assert runpy.run_path(script)["manifest"]() == PLUGINS
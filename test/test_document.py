@@ -1,8 +1,12 @@
 # Copyright 2017-2020 Palantir Technologies, Inc.
 # Copyright 2021- Python Language Server Contributors.
 
+import os
 from test.fixtures import DOC, DOC_URI
+from unittest.mock import patch
 
+from pylsp import uris
+from pylsp._file_cache import FileCache
 from pylsp.workspace import Document
 
 
@@ -104,3 +108,65 @@ def test_document_end_of_file_edit(workspace):
         "print 'b'\n",
         "o",
     ]
+
+
+def test_document_batched_edits(workspace):
+    doc = Document("file:///uri", workspace, "def hello(a, b):\n    print a\n")
+    doc.apply_changes(
+        [
+            # Each range refers to the document after the previous changes
+            {"text": "print(a)", "range": _range(1, 4, 1, 11)},
+            {"text": "    print(b)\n", "range": _range(2, 0, 2, 0)},
+            {"text": "x", "range": _range(0, 10, 0, 11)},
+            {"text": "", "range": _range(0, 16, 1, 0)},
+        ]
+    )
+    assert doc.source == "def hello(x, b):    print(a)\n    print(b)\n"
+
+
+def test_document_batched_edits_with_full_change(workspace):
+    doc = Document("file:///uri", workspace, "import os\n")
+    doc.apply_changes(
+        [
+            {"text": "sys", "range": _range(0, 7, 0, 9)},
+            {"text": "import json\n"},
+            {"text": "print(json)\n", "range": _range(1, 0, 1, 0)},
+        ]
+    )
+    assert doc.lines == ["import json\n", "print(json)\n"]
+
+
+def test_document_from_disk_is_cached(workspace, tmpdir):
+    path = tmpdir.join("module.py")
+    path.write_binary(b"import os\r\nos.path\r\n")
+    doc = Document(uris.from_fs_path(str(path)), workspace)
+
+    with patch("pylsp.workspace.FILE_CACHE", FileCache()) as cache:
+        assert doc.lines == ["import os\n", "os.path\n"]
+        with patch("builtins.open") as open_:
+            assert doc.source == "import os\nos.path\n"
+        open_.assert_not_called()
+
+        # Changes on disk are picked up
+        path.write("import sys\n")
+        assert doc.source == "import sys\n"
+        assert cache._bytes == os.path.getsize(str(path))
+
+
+def test_file_cache_limits(tmpdir):
+    cache = FileCache(max_bytes=10, mmap_threshold=5)
+    small, large = tmpdir.join("small.py"), tmpdir.join("large.py")
+    small.write("a = 1\n")
+    large.write("b = 2\nc = 3\n")
+
+    assert cache.read(str(small)) == "a = 1\n"
+    # Read through mmap, but too large to be kept
+    assert cache.read(str(large)) == "b = 2\nc = 3\n"
+    assert list(cache._entries) == [str(small)]
+
+
+def _range(start_line, start_character, end_line, end_character):
+    return {
+        "start": {"line": start_line, "character": start_character},
+        "end": {"line": end_line, "character": end_character},
+    }
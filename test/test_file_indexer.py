@@ -0,0 +1,60 @@
+# Copyright 2021- Python Language Server Contributors.
+
+import threading
+
+from pylsp._file_indexer import FileIndex, FileIndexer
+
+
+class RecordingIndex(FileIndex):
+    def __init__(self, root_path):
+        super().__init__(root_path)
+        self.sources = {}
+        self.updated = threading.Event()
+
+    def update_file(self, path, source):
+        self.sources[path] = source
+        self.updated.set()
+
+    def remove_file(self, path):
+        self.sources.pop(path, None)
+
+
+def test_file_indexer(tmpdir):
+    path = tmpdir.join("a.py")
+    path.write("x = 1\n")
+    first, second = RecordingIndex(str(tmpdir)), RecordingIndex(str(tmpdir))
+    indexer = FileIndexer(str(tmpdir), indexes=[first, second])
+    indexer.build()
+    assert first.is_ready() and second.is_ready()
+    assert first.sources == second.sources == {str(path): "x = 1\n"}
+
+    # Changes are queued, and applied later in order
+    path.write("y = 1\n")
+    indexer.file_changed(str(path))
+    indexer.file_changed(str(tmpdir.join("b.py")), deleted=True)
+    assert first.sources == {str(path): "x = 1\n"}
+    indexer.apply_changes()
+    assert first.sources == second.sources == {str(path): "y = 1\n"}
+
+    # Files that can't be read are removed
+    path.remove()
+    indexer.file_changed(str(path))
+    indexer.apply_changes()
+    assert first.sources == second.sources == {}
+
+
+def test_file_indexer_background(tmpdir):
+    index = RecordingIndex(str(tmpdir))
+    indexer = FileIndexer(str(tmpdir), indexes=[index])
+    indexer.start()
+    try:
+        assert index.wait(timeout=10)
+        assert index.sources == {}
+
+        path = tmpdir.join("a.py")
+        path.write("x = 1\n")
+        indexer.file_changed(str(path))
+        assert index.updated.wait(timeout=10)
+        assert index.sources == {str(path): "x = 1\n"}
+    finally:
+        indexer.stop()
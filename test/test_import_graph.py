@@ -0,0 +1,99 @@
+# Copyright 2021- Python Language Server Contributors.
+
+from pylsp import lsp, uris
+from pylsp._import_graph import ImportGraph
+
+
+def _package(tmpdir):
+    pkg = tmpdir.mkdir("pkg")
+    pkg.join("__init__.py").write("from .core import run\n")
+    pkg.join("core.py").write("import os\n")
+    pkg.join("cli.py").write("from pkg import core\n")
+    tmpdir.join("main.py").write("import pkg.cli\n")
+    tmpdir.mkdir("build").join("out.py").write("import pkg.core\n")
+    return pkg
+
+
+def test_import_graph_build(tmpdir):
+    pkg = _package(tmpdir)
+    graph = ImportGraph(str(tmpdir), exclude=["build"])
+    graph.build()
+    init, core, cli = (
+        str(pkg.join(name)) for name in ("__init__.py", "core.py", "cli.py")
+    )
+    main = str(tmpdir.join("main.py"))
+
+    assert graph.is_ready()
+    assert len(graph) == 4
+    assert graph.module_name(init) == "pkg"
+    assert graph.module_paths("pkg.cli") == {cli}
+    assert graph.imports(cli) == {"pkg", "pkg.core"}
+    assert graph.imports(init) == {"pkg.core", "pkg.core.run"}
+
+    assert graph.importers("os") == {core}
+    assert graph.importers("pkg.core") == {init, cli}
+    # Importing a submodule runs its package
+    assert graph.importers("pkg") == {cli, main}
+    assert graph.importers("pkg.cli") == {main}
+    assert graph.importers("main") == set()
+    assert graph.importers("os", transitive=True) == {core, init, cli, main}
+
+
+def test_import_graph_same_names(tmpdir):
+    first = tmpdir.mkdir("a").join("conftest.py")
+    first.write("import os\n")
+    second = tmpdir.mkdir("b").join("conftest.py")
+    second.write("import json\n")
+    tmpdir.join("runner.py").write("import conftest\n")
+    graph = ImportGraph(str(tmpdir))
+    graph.build()
+
+    assert graph.module_paths("conftest") == {str(first), str(second)}
+    assert graph.importers("os") == {str(first)}
+    assert graph.importers("json") == {str(second)}
+    assert graph.importers("json", transitive=True) == {
+        str(second),
+        str(tmpdir.join("runner.py")),
+    }
+
+    graph.remove_file(str(first))
+    assert graph.module_paths("conftest") == {str(second)}
+    assert graph.importers("os") == set()
+
+
+def test_import_graph_update_and_remove(tmpdir):
+    pkg = _package(tmpdir)
+    graph = ImportGraph(str(tmpdir))
+    graph.build()
+
+    cli = str(pkg.join("cli.py"))
+    graph.update_file(cli, "import json\n")
+    assert graph.imports(cli) == {"json"}
+    assert graph.importers("json") == {cli}
+    assert cli not in graph.importers("pkg")
+
+    graph.remove_file(cli)
+    assert cli not in graph
+    assert graph.module_paths("pkg.cli") == set()
+    assert graph.importers("json") == set()
+
+
+def test_workspace_import_graph(workspace, tmpdir):
+    assert workspace.import_graph is None
+
+    pkg = _package(tmpdir)
+    workspace._config.update({"index": {"enabled": True}})
+    graph = workspace.import_graph
+    assert graph.wait(timeout=10)
+    main = tmpdir.join("main.py")
+    assert graph.importers("pkg.cli") == {str(main)}
+
+    main.write("import os\n")
+    workspace.file_changed(uris.from_fs_path(str(main)))
+    workspace.apply_file_changes()
+    assert graph.importers("pkg.cli") == set()
+
+    core_uri = uris.from_fs_path(str(pkg.join("core.py")))
+    workspace.file_changed(core_uri, lsp.FileChangeType.Deleted)
+    workspace.apply_file_changes()
+    assert graph.importers("os") == {str(main)}
@@ -0,0 +1,83 @@
+# Copyright 2021- Python Language Server Contributors.
+
+from unittest.mock import patch
+
+from pylsp import uris
+from pylsp._imports import depends_on, imported_modules, module_name, package_name
+from pylsp.python_lsp import PythonLSPServer
+
+
+def test_imported_modules():
+    source = (
+        "import os.path, sys as system\n"
+        "from collections import abc, OrderedDict\n"
+        "from . import sibling\n"
+        "from ..parent import name\n"
+        "from .... import too_far\n"
+        "def f():\n"
+        "    import json\n"
+    )
+    assert imported_modules(source, "pkg.sub") == {
+        "os.path",
+        "sys",
+        "collections",
+        "collections.abc",
+        "collections.OrderedDict",
+        "pkg.sub",
+        "pkg.sub.sibling",
+        "pkg.parent",
+        "pkg.parent.name",
+        "json",
+    }
+    # Relative imports can't be resolved without a package
+    assert "pkg.sub.sibling" not in imported_modules(source)
+    assert imported_modules("import (") == frozenset()
+
+
+def test_module_name(tmpdir):
+    pkg = tmpdir.mkdir("pkg")
+    pkg.join("__init__.py").write("")
+    assert module_name(str(pkg.join("__init__.py"))) == "pkg"
+    assert module_name(str(pkg.join("mod.py"))) == "pkg.mod"
+    assert package_name(str(pkg.join("__init__.py"))) == "pkg"
+    assert package_name(str(pkg.join("mod.py"))) == "pkg"
+    assert package_name(str(tmpdir.join("top.py"))) == ""
+
+
+def test_depends_on():
+    imports = {"pkg", "pkg.mod.name"}
+    assert depends_on(imports, ["pkg.mod"])
+    assert depends_on(imports, ["pkg"])
+    assert not depends_on(imports, ["pkg.other"])
+    assert not depends_on(imports, ["other"])
+
+
+def test_watched_files_lint_dependents(pylsp, tmpdir):
+    pkg = tmpdir.mkdir("pkg")
+    pkg.join("__init__.py").write("")
+    sub = pkg.mkdir("sub")
+    for name, source in [
+        ("uses_mod.py", "from pkg import mod\n"),
+        ("unrelated.py", "import os\n"),
+    ]:
+        doc_uri = uris.from_fs_path(str(tmpdir.join(name)))
+        pylsp.workspace.put_document(doc_uri, source)
+    in_sub_uri = uris.from_fs_path(str(sub.join("in_sub.py")))
+    pylsp.workspace.put_document(in_sub_uri, "x = 1\n")
+
+    def watched_files_changed(*paths):
+        """Send a notification per path, and lint once the burst is over."""
+        with patch.object(pylsp, "_lint_after_watched_changes"):
+            for path in paths:
+                pylsp.m_workspace__did_change_watched_files(
+                    changes=[{"uri": uris.from_fs_path(str(path)), "type": 2}]
+                )
+        with patch.object(pylsp, "lint") as lint:
+            PythonLSPServer._lint_after_watched_changes.__wrapped__(pylsp)
+        return {call[0][0] for call in lint.call_args_list}
+
+    assert watched_files_changed(pkg.join("other.py"), pkg.join("mod.py")) == {
+        uris.from_fs_path(str(tmpdir.join("uses_mod.py")))
+    }
+    assert watched_files_changed(pkg.join("other.py")) == set()
+    assert watched_files_changed(sub.join("setup.cfg")) == {in_sub_uri}
@@ -1,15 +1,22 @@
 # Copyright 2017-2020 Palantir Technologies, Inc.
 # Copyright 2021- Python Language Server Contributors.
 
+import json
 import os
+import socket
 import sys
+import threading
 import time
+from contextlib import contextmanager
 from test.test_utils import ClientServerPair, send_initialize_request
+from unittest.mock import patch
 
 import pytest
 from flaky import flaky
 from pylsp_jsonrpc.exceptions import JsonRpcMethodNotFound
 
+from pylsp.python_lsp import PythonLSPServer, _prepare_fork, _tcp_server
+
 RUNNING_IN_CI = bool(os.environ.get("CI"))
 
 CALL_TIMEOUT_IN_SECONDS = 10
@@ -83,3 +90,92 @@ def test_missing_message(client_server_pair):
         client._endpoint.request("unknown_method").result(
             timeout=CALL_TIMEOUT_IN_SECONDS
         )
+
+
+def _send_request(stream, msg_id, method, params=None):
+    message = {"jsonrpc": "2.0", "method": method, "params": params or {}}
+    if msg_id is not None:
+        message["id"] = msg_id
+    body = json.dumps(message).encode("utf-8")
+    stream.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+    stream.flush()
+
+
+def _read_message(stream):
+    length = None
+    while True:
+        line = stream.readline().strip()
+        if not line:
+            break
+        name, value = line.split(b":", 1)
+        if name.lower() == b"content-length":
+            length = int(value)
+    return json.loads(stream.read(length))
+
+
+@contextmanager
+def _serving_tcp(**kwargs):
+    server = _tcp_server("127.0.0.1", 0, False, PythonLSPServer, **kwargs)
+    server.server_bind()
+    server.server_activate()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_tcp_multi_client(tmpdir):
+    with _serving_tcp(multi_client=True) as address:
+        connections = [
+            socket.create_connection(address, timeout=CALL_TIMEOUT_IN_SECONDS)
+            for _ in range(2)
+        ]
+        first, second = [connection.makefile("rwb") for connection in connections]
+
+        # Both clients are served while connected at the same time
+        for stream in (first, second):
+            _send_request(stream, 1, "initialize", {"rootPath": str(tmpdir)})
+        for stream in (first, second):
+            assert "capabilities" in _read_message(stream)["result"]
+
+        # Shutting down one client's server leaves the other's running
+        _send_request(first, 2, "shutdown")
+        assert _read_message(first)["result"] is None
+        _send_request(second, 2, "unknown_method")
+        assert _read_message(second)["error"]["code"] == -32601
+
+        for stream, connection in zip((first, second), connections):
+            stream.close()
+            connection.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Forking is not supported")
+def test_tcp_prefork(tmpdir):
+    with patch("gc.freeze") as freeze:
+        _prepare_fork()
+    freeze.assert_called_once()
+
+    with _serving_tcp(prefork=True) as address:
+        connections = [
+            socket.create_connection(address, timeout=CALL_TIMEOUT_IN_SECONDS)
+            for _ in range(2)
+        ]
+        streams = [connection.makefile("rwb") for connection in connections]
+
+        # Each client is served by its own process
+        for stream in streams:
+            _send_request(stream, 1, "initialize", {"rootPath": str(tmpdir)})
+        for stream in streams:
+            assert "capabilities" in _read_message(stream)["result"]
+            _send_request(stream, 2, "shutdown")
+            assert _read_message(stream)["result"] is None
+            # The children share this process's end of the other connections,
+            # so closing them wouldn't end the children
+            _send_request(stream, None, "exit")
+
+        for stream, connection in zip(streams, connections):
+            stream.close()
+            connection.close()
@@ -0,0 +1,139 @@
+# Copyright 2021- Python Language Server Contributors.
+
+import threading
+import time
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from pylsp import uris
+from pylsp._lint_scheduler import (
+    PRIORITY_DEPENDENT,
+    PRIORITY_EDITED,
+    PRIORITY_WORKSPACE,
+    LintScheduler,
+)
+
+
+@contextmanager
+def report_progress(*_args, **_kwargs):
+    yield lambda message, percentage=None: None
+
+
+class Linter:
+    def __init__(self, expected):
+        self.linted = []
+        self.expected = expected
+        self.done = threading.Event()
+
+    def __call__(self, doc_uri):
+        self.linted.append(doc_uri)
+        if len(self.linted) == self.expected:
+            self.done.set()
+
+
+def test_lint_scheduler_priorities():
+    linter = Linter(expected=4)
+    scheduler = LintScheduler(linter, report_progress)
+    scheduler.schedule("old", PRIORITY_WORKSPACE, mtime=1)
+    scheduler.schedule("new", PRIORITY_WORKSPACE, mtime=2)
+    scheduler.schedule("dependent", PRIORITY_DEPENDENT)
+    scheduler.schedule("edited", PRIORITY_WORKSPACE)
+    # Raising the priority of a queued file moves it up
+    scheduler.schedule("edited", PRIORITY_EDITED)
+    # ... but lowering it doesn't
+    scheduler.schedule("dependent", PRIORITY_WORKSPACE, mtime=3)
+    assert scheduler.pending == 4
+
+    scheduler.start()
+    assert linter.done.wait(5)
+    scheduler.stop()
+    assert linter.linted == ["edited", "dependent", "new", "old"]
+
+
+def test_lint_scheduler_pauses_for_interactive_requests():
+    linter = Linter(expected=1)
+    scheduler = LintScheduler(linter, report_progress)
+    scheduler.start()
+    with scheduler.interactive():
+        scheduler.schedule("file", PRIORITY_EDITED)
+        time.sleep(0.2)
+        assert linter.linted == []
+    assert linter.done.wait(5)
+    scheduler.stop()
+
+
+def test_lint_scheduler_stop():
+    linter = Linter(expected=1)
+    scheduler = LintScheduler(linter, report_progress)
+    scheduler.schedule("file", PRIORITY_EDITED)
+    scheduler.stop()
+    assert scheduler.pending == 0
+    scheduler.start()
+    assert not linter.done.wait(0.2)
+    scheduler.stop()
+
+
+def test_background_lint(pylsp, tmpdir):
+    tmpdir.join("unused.py").write("import sys\n")
+    tmpdir.join("excluded.py").write("import os\n")
+    open_uri = uris.from_fs_path(str(tmpdir.join("open.py")))
+    pylsp.workspace.put_document(open_uri, "import os\n")
+    unused_uri = uris.from_fs_path(str(tmpdir.join("unused.py")))
+
+    published = {}
+    done = threading.Event()
+
+    def publish_diagnostics(doc_uri, diagnostics):
+        published[doc_uri] = diagnostics
+        done.set()
+
+    pylsp.workspace.publish_diagnostics = publish_diagnostics
+    pylsp.config.update({"diagnostics": {"background": True, "exclude": ["excl*"]}})
+    pylsp._configure_lint_scheduler()
+    try:
+        assert done.wait(5)
+        while pylsp._lint_scheduler.pending:
+            time.sleep(0.1)
+        time.sleep(0.2)
+    finally:
+        pylsp.m_shutdown()
+
+    assert list(published) == [unused_uri]
+    assert "'sys' imported but unused" in [d["message"] for d in published[unused_uri]]
+
+
+def test_lint_scheduler_settings(pylsp):
+    pylsp.config.update({"diagnostics": {"background": True}})
+    with patch.object(pylsp, "_schedule_workspace_lint") as schedule:
+        pylsp._configure_lint_scheduler()
+        scheduler = pylsp._lint_scheduler
+        assert schedule.call_count == 1
+
+        # Settings that don't affect linting change nothing
+        pylsp.config.update(
+            {"diagnostics": {"background": True}, "rope": {"ropeFolder": "x"}}
+        )
+        pylsp._configure_lint_scheduler()
+        assert pylsp._lint_scheduler is scheduler
+        assert schedule.call_count == 1
+
+        # New linter settings lint every file again, with the same scheduler
+        pylsp.config.update(
+            {
+                "diagnostics": {"background": True},
+                "plugins": {"pyflakes": {"enabled": False}},
+            }
+        )
+        pylsp._configure_lint_scheduler()
+        assert pylsp._lint_scheduler is scheduler
+        assert schedule.call_count == 2
+
+        pylsp.config.update({"diagnostics": {"background": True, "max_workers": 4}})
+        pylsp._configure_lint_scheduler()
+        assert pylsp._lint_scheduler is not scheduler
+        assert schedule.call_count == 3
+
+        pylsp.config.update({"diagnostics": {"background": False}})
+        pylsp._configure_lint_scheduler()
+        assert pylsp._lint_scheduler is None
+    pylsp.m_shutdown()
@@ -0,0 +1,131 @@
+# Copyright 2021- Python Language Server Contributors.
+
+import urllib.request
+from unittest.mock import patch
+
+from pylsp import uris
+from pylsp._metrics import Histogram, Metrics, serve_prometheus
+from pylsp.plugins.metrics import (
+    METRICS_COMMAND,
+    RESET_METRICS_COMMAND,
+    pylsp_execute_command,
+)
+
+DOC_URI = uris.from_fs_path(__file__)
+
+
+class Server:
+    def __init__(self, queued):
+        self.queued = queued
+
+    def requests_queued(self):
+        return self.queued
+
+
+def test_histogram():
+    histogram = Histogram()
+    for _ in range(90):
+        histogram.observe(0.002)
+    for _ in range(10):
+        histogram.observe(3)
+
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["max"] == 3
+    assert 0.001 < summary["p50"] <= 0.0025
+    assert 2.5 < summary["p95"] <= 3
+    assert Histogram().quantile(0.5) == 0
+
+
+def test_metrics_snapshot():
+    metrics = Metrics()
+    metrics.observe("request", ["textDocument/hover"], 0.01)
+    metrics.observe("plugin", ["jedi_hover", "pylsp_hover"], 0.02)
+    with metrics.timed("lint"):
+        pass
+
+    server, other = Server(2), Server(3)
+    metrics.add_gauge("requests_queued", server.requests_queued)
+    metrics.add_gauge("requests_queued", other.requests_queued)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["request"]["textDocument/hover"]["count"] == 1
+    assert snapshot["plugin"]["jedi_hover"]["pylsp_hover"]["sum"] == 0.02
+    assert snapshot["lint"]["count"] == 1
+    assert snapshot["hook"] == {}
+    assert snapshot["gauges"] == {"requests_queued": 5}
+
+    # Gauges of servers that are gone are dropped
+    del other
+    assert metrics.gauges() == {"requests_queued": 2}
+
+    metrics.reset()
+    assert metrics.snapshot()["request"] == {}
+
+
+def test_metrics_prometheus():
+    metrics = Metrics()
+    metrics.observe("request", ["textDocument/hover"], 0.003)
+    metrics.observe("lint", [], 20)
+    text = metrics.prometheus()
+
+    assert "# TYPE pylsp_request_seconds histogram" in text
+    assert (
+        'pylsp_request_seconds_bucket{method="textDocument/hover",le="0.0025"} 0'
+        in text
+    )
+    assert (
+        'pylsp_request_seconds_bucket{method="textDocument/hover",le="0.005"} 1' in text
+    )
+    assert 'pylsp_request_seconds_count{method="textDocument/hover"} 1' in text
+    assert 'pylsp_lint_seconds_bucket{le="10.0"} 0' in text
+    assert 'pylsp_lint_seconds_bucket{le="+Inf"} 1' in text
+    assert "pylsp_lint_seconds_sum 20" in text
+
+
+def test_serve_prometheus():
+    metrics = Metrics()
+    metrics.observe("lint", [], 1)
+    with patch("pylsp._metrics.METRICS", metrics):
+        server = serve_prometheus("127.0.0.1", 0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=10) as response:
+                assert response.read().decode() == metrics.prometheus()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_server_metrics(pylsp):
+    metrics = Metrics()
+    with patch("pylsp.python_lsp.METRICS", metrics), patch(
+        "pylsp.config.config.METRICS", metrics
+    ):
+        pylsp.workspace.put_document(DOC_URI, "import os\nos.path\n")
+        # Plugins are imported and timed on the first call of their hooks
+        pylsp["textDocument/hover"](
+            {"textDocument": {"uri": DOC_URI}, "position": {"line": 1, "character": 4}}
+        )
+        pylsp.lint.__wrapped__(pylsp, DOC_URI, is_saved=True)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["request"]["textDocument/hover"]["count"] == 1
+    assert snapshot["hook"]["pylsp_hover"]["count"] == 1
+    assert snapshot["plugin"]["jedi_hover"]["pylsp_hover"]["count"] == 1
+    assert snapshot["hook"]["pylsp_lint"]["count"] == 1
+    assert snapshot["lint"]["count"] == 1
+    assert pylsp._requests_queued() == 0
+    assert pylsp._requests_in_flight() == 0
+
+
+def test_metrics_commands():
+    with patch("pylsp.plugins.metrics.METRICS", Metrics()) as metrics:
+        metrics.observe("lint", [], 1)
+        assert pylsp_execute_command(METRICS_COMMAND, [])["lint"]["count"] == 1
+        assert "pylsp_lint_seconds_count 1" in pylsp_execute_command(
+            METRICS_COMMAND, ["prometheus"]
+        )
+        assert pylsp_execute_command(RESET_METRICS_COMMAND, []) is True
+        assert pylsp_execute_command(METRICS_COMMAND, [])["lint"] == {}
+        assert pylsp_execute_command("other", []) is None
@@ -0,0 +1,65 @@
+# Copyright 2021- Python Language Server Contributors.
+
+import os
+
+from pylsp import lsp, uris
+from pylsp._name_index import NameIndex, find_names
+
+
+def test_find_names():
+    names = find_names("import os\n\ndef foo(bar):\n    return os.path.join(bar)\n")
+    assert names["os"] == [(0, 7), (3, 11)]
+    assert names["bar"] == [(2, 8), (3, 24)]
+    assert "def" not in names
+    assert "return" not in names
+
+
+def test_name_index_build(tmpdir):
+    tmpdir.join("a.py").write("x = 1\n")
+    tmpdir.mkdir("pkg").join("b.py").write("from a import x\nprint(x)\n")
+    tmpdir.mkdir(".hidden").join("c.py").write("x = 2\n")
+    tmpdir.mkdir("build").join("d.py").write("x = 3\n")
+
+    index = NameIndex(str(tmpdir), exclude=["build"])
+    index.build()
+
+    assert index.is_ready()
+    assert len(index) == 2
+    b_path = os.path.join(str(tmpdir), "pkg", "b.py")
+    assert index.files_for(["x"]) == {os.path.join(str(tmpdir), "a.py"), b_path}
+    assert index.candidates(["print"]) == {b_path: [(1, 0)]}
+
+
+def test_name_index_update_and_remove(tmpdir):
+    path = tmpdir.join("a.py")
+    path.write("x = 1\n")
+    index = NameIndex(str(tmpdir))
+    index.build()
+
+    index.update_file(str(path), "y = 1\n")
+    assert index.files_for(["x"]) == set()
+    assert index.files_for(["y"]) == {str(path)}
+
+    index.remove_file(str(path))
+    assert str(path) not in index
+    assert index.files_for(["y"]) == set()
+
+
+def test_workspace_name_index(workspace, tmpdir):
+    assert workspace.name_index is None
+
+    path = tmpdir.join("a.py")
+    path.write("x = 1\n")
+    workspace._config.update({"index": {"enabled": True}})
+    index = workspace.name_index
+    assert index.wait(timeout=10)
+    assert index.files_for(["x"]) == {str(path)}
+
+    path.write("y = 1\n")
+    workspace.file_changed(uris.from_fs_path(str(path)))
+    workspace.apply_file_changes()
+    assert index.files_for(["y"]) == {str(path)}
+
+    workspace.file_changed(uris.from_fs_path(str(path)), lsp.FileChangeType.Deleted)
+    workspace.apply_file_changes()
+    assert index.files_for(["y"]) == set()
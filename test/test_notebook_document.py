@@ -1,5 +1,6 @@
 # Copyright 2021- Python Language Server Contributors.
 
+import threading
 import time
 from test.test_utils import (
     CALL_TIMEOUT_IN_SECONDS,
@@ -105,7 +106,18 @@ def test_notebook_document__did_open(
                 "textDocument/publishDiagnostics",
                 params={
                     "uri": "cell_2_uri",
-                    "diagnostics": [],
+                    "diagnostics": [
+                        {
+                            "source": "pycodestyle",
+                            "range": {
+                                "start": {"line": 0, "character": 0},
+                                "end": {"line": 0, "character": 1},
+                            },
+                            "message": "W391 blank line at end of file",
+                            "code": "W391",
+                            "severity": 2,
+                        },
+                    ],
                 },
             ),
             call(
@@ -134,11 +146,11 @@ def test_notebook_document__did_open(
                         {
                             "source": "pycodestyle",
                             "range": {
-                                "start": {"line": 1, "character": 0},
-                                "end": {"line": 1, "character": 11},
+                                "start": {"line": 4, "character": 0},
+                                "end": {"line": 4, "character": 1},
                             },
-                            "message": "E303 too many blank lines (4)",
-                            "code": "E303",
+                            "message": "W391 blank line at end of file",
+                            "code": "W391",
                             "severity": 2,
                         },
                     ],
@@ -266,16 +278,6 @@ def test_notebook_document__did_change(
                             "message": "'sys' imported but unused",
                             "severity": 2,
                         },
-                        {
-                            "source": "pycodestyle",
-                            "range": {
-                                "start": {"line": 0, "character": 10},
-                                "end": {"line": 0, "character": 10},
-                            },
-                            "message": "W292 no newline at end of file",
-                            "code": "W292",
-                            "severity": 2,
-                        },
                     ],
                 },
             )
@@ -351,16 +353,6 @@ def test_notebook_document__did_change(
                             "message": "undefined name 'x'",
                             "severity": 1,
                         },
-                        {
-                            "source": "pycodestyle",
-                            "range": {
-                                "start": {"line": 0, "character": 1},
-                                "end": {"line": 0, "character": 1},
-                            },
-                            "message": "W292 no newline at end of file",
-                            "code": "W292",
-                            "severity": 2,
-                        },
                     ],
                 },
             ),
@@ -399,18 +391,7 @@ def test_notebook_document__did_change(
                 "textDocument/publishDiagnostics",
                 params={
                     "uri": "cell_3_uri",
-                    "diagnostics": [
-                        {
-                            "source": "pycodestyle",
-                            "range": {
-                                "start": {"line": 0, "character": 8},
-                                "end": {"line": 0, "character": 8},
-                            },
-                            "message": "W292 no newline at end of file",
-                            "code": "W292",
-                            "severity": 2,
-                        }
-                    ],
+                    "diagnostics": [],
                 },
             ),
         ]
@@ -450,8 +431,11 @@ def test_notebook__did_close(
                 ],
             },
         )
-        wait_for_condition(lambda: mock_notify.call_count >= 2)
-        assert len(server.workspace.documents) == 0
+        wait_for_condition(lambda: len(server.workspace.documents) == 0)
+        # Only the first cell had diagnostics that need to be cleared
+        assert [c[1]["params"]["uri"] for c in mock_notify.call_args_list] == [
+            "cell_1_uri"
+        ]
 
 
 @pytest.mark.skipif(IS_WIN, reason="Flaky on Windows")
@@ -530,3 +514,102 @@ def test_notebook_completion(client_server_pair):
             },
         ],
     }
+    # No completion session is kept for the temporary notebook document
+    assert server._completion_sessions == {}
+
+
+def test_notebook_lint_only_publishes_changes(pylsp):
+    pylsp.workspace.put_notebook_document(
+        "notebook_uri",
+        "jupyter-notebook",
+        cells=[
+            {"kind": NotebookCellKind.Code, "document": "cell_1_uri"},
+            {"kind": NotebookCellKind.Code, "document": "cell_2_uri"},
+        ],
+    )
+    pylsp.workspace.put_cell_document(
+        "cell_1_uri", "notebook_uri", "python", "import sys\n"
+    )
+    pylsp.workspace.put_cell_document("cell_2_uri", "notebook_uri", "python", "x = 1\n")
+    notebook = pylsp.workspace.get_document("notebook_uri")
+
+    with patch.object(pylsp.workspace, "publish_diagnostics") as publish:
+        pylsp._lint_notebook_document(notebook, pylsp.workspace, is_saved=True)
+        assert [c[0][0] for c in publish.call_args_list] == ["cell_1_uri", "cell_2_uri"]
+
+        # Nothing changed, so nothing is linted or published
+        publish.reset_mock()
+        with patch.object(pylsp, "_hook") as hook:
+            pylsp._lint_notebook_document(notebook, pylsp.workspace, is_saved=False)
+        hook.assert_not_called()
+        publish.assert_not_called()
+
+        # Only the edited cell is linted now, and the whole notebook later
+        pylsp.workspace.update_document("cell_2_uri", {"text": "sys.path\n"})
+        with patch.object(pylsp, "_notebook_lint_diagnostics") as lint:
+            lint.return_value = []
+            with patch.object(pylsp, "_lint_notebook_across_cells") as deferred:
+                pylsp._lint_notebook_document(notebook, pylsp.workspace, is_saved=False)
+        assert lint.call_count == 1
+        assert lint.call_args[1]["cell_linters"] is True
+        deferred.assert_called_once_with("notebook_uri")
+        publish.assert_not_called()
+
+        # Only the diagnostics of the first cell change
+        pylsp._lint_notebook_document(
+            notebook, pylsp.workspace, is_saved=False, across_cells=True
+        )
+        publish.assert_called_once_with("cell_1_uri", [])
+
+
+def test_notebook_cell_data_cache(workspace):
+    workspace.put_notebook_document(
+        "notebook_uri",
+        "jupyter-notebook",
+        cells=[
+            {"kind": NotebookCellKind.Code, "document": "cell_1_uri"},
+            {"kind": NotebookCellKind.Code, "document": "cell_2_uri"},
+        ],
+    )
+    workspace.put_cell_document("cell_1_uri", "notebook_uri", "python", "a = 1")
+    workspace.put_cell_document("cell_2_uri", "notebook_uri", "python", "b = 2")
+    notebook = workspace.get_document("notebook_uri")
+
+    assert notebook.cell_data()["cell_2_uri"]["line_start"] == 1
+    assert notebook.jedi_names() == {"a", "b"}
+    cell_2 = workspace.get_cell_document("cell_2_uri")
+    with patch.object(cell_2, "jedi_names") as jedi_names:
+        assert notebook.jedi_names() == {"a", "b"}
+    jedi_names.assert_not_called()
+
+    workspace.update_document("cell_1_uri", {"text": "a = 1\nc = 3"})
+    assert notebook.cell_data()["cell_2_uri"]["line_start"] == 2
+    assert notebook.source == "a = 1\nc = 3\nb = 2"
+    assert notebook.jedi_names("cell_1_uri") == {"a", "c"}
+
+    workspace.remove_notebook_cells("notebook_uri", 0, 1)
+    assert list(notebook.cell_data()) == ["cell_2_uri"]
+    assert notebook.jedi_names() == {"b"}
+
+
+def test_notebook_cell_change_lock_order(workspace):
+    workspace.put_notebook_document(
+        "notebook_uri",
+        "jupyter-notebook",
+        cells=[{"kind": NotebookCellKind.Code, "document": "cell_1_uri"}],
+    )
+    workspace.put_cell_document("cell_1_uri", "notebook_uri", "python", "a = 1")
+    notebook = workspace.get_document("notebook_uri")
+    cell = workspace.get_cell_document("cell_1_uri")
+    cell_data = []
+
+    def cell_changed(cell_uri):
+        # cell_data takes the lock of the cell while holding the notebook's
+        thread = threading.Thread(target=lambda: cell_data.append(notebook.cell_data()))
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+
+    with patch.object(notebook, "cell_changed", side_effect=cell_changed):
+        workspace.update_document("cell_1_uri", {"text": "b = 2"})
+    assert cell_data and cell.source == "b = 2"
@@ -0,0 +1,36 @@
+# Copyright 2021- Python Language Server Contributors.
+
+from pylsp._path_trie import PathTrie
+
+
+def test_path_trie_match():
+    trie = PathTrie()
+    trie.add("file:///repo")
+    trie.add("file:///repo/packages/a/")
+    trie.add("/repo/packages/b")
+
+    assert trie.match("file:///repo/setup.py") == "file:///repo"
+    assert trie.match("file:///repo/packages/a/mod.py") == "file:///repo/packages/a/"
+    assert trie.match("file:///repo/packages/b/mod.py") == "/repo/packages/b"
+    # Components have to match entirely
+    assert trie.match("file:///repo/packages/ab/mod.py") == "file:///repo"
+    assert trie.match("file:///other/mod.py") is None
+    assert trie.match("untitled:Untitled-1") is None
+    assert trie.match(None) is None
+
+
+def test_path_trie_remove():
+    trie = PathTrie()
+    trie.add("file:///repo")
+    trie.add("file:///repo/packages/a")
+    assert trie.match("file:///repo/packages/a/mod.py") == "file:///repo/packages/a"
+
+    trie.remove("file:///repo/packages/a")
+    assert trie.match("file:///repo/packages/a/mod.py") == "file:///repo"
+    # Removing unknown roots is a no-op
+    trie.remove("file:///repo/packages")
+    trie.remove("file:///elsewhere")
+
+    trie.remove("file:///repo")
+    assert trie.match("file:///repo/packages/a/mod.py") is None
+    assert trie._root.children == {}
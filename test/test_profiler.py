@@ -0,0 +1,96 @@
+# Copyright 2021- Python Language Server Contributors.
+
+import os
+import pstats
+import time
+from unittest.mock import patch
+
+import pytest
+
+from pylsp import uris
+from pylsp._profiler import Profiler
+from pylsp.plugins.profiler import (
+    START_PROFILING_COMMAND,
+    STOP_PROFILING_COMMAND,
+    pylsp_execute_command,
+)
+
+DOC_URI = uris.from_fs_path(__file__)
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def hover(pylsp):
+    return pylsp["textDocument/hover"](
+        {"textDocument": {"uri": DOC_URI}, "position": {"line": 1, "character": 4}}
+    )
+
+
+def test_profile_method(pylsp, tmpdir):
+    profiler = Profiler()
+    pylsp.workspace.put_document(DOC_URI, "import os\nos.path\n")
+    with patch("pylsp.python_lsp.PROFILER", profiler):
+        assert profiler.start(str(tmpdir), method="textDocument/hover")
+        assert not profiler.start(str(tmpdir))
+        hover(pylsp)
+        pylsp["textDocument/documentSymbol"]({"textDocument": {"uri": DOC_URI}})
+        path = profiler.stop()
+
+    assert os.path.dirname(path) == str(tmpdir)
+    assert path.endswith("-textDocument_hover.pstats")
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert "pylsp_hover" in functions
+    assert "pylsp_document_symbols" not in functions
+    assert profiler.stop() is None
+
+
+def test_profile_plugin_sampling(tmpdir):
+    profiler = Profiler()
+    profiled = profiler.scoped_function(busy, "plugin", "slow")
+    not_profiled = profiler.scoped_function(busy, "plugin", "other")
+
+    profiler.start(str(tmpdir), mode="sample", plugin="slow", interval=0.001)
+    assert profiler.status() == {
+        "active": True,
+        "mode": "sample",
+        "method": None,
+        "plugin": "slow",
+        "directory": str(tmpdir),
+    }
+    not_profiled(0.05)
+    assert profiler.stop() is None
+
+    profiler.start(str(tmpdir), mode="sample", plugin="slow", interval=0.001)
+    profiled(0.05)
+    path = profiler.stop()
+    assert path.endswith("-slow.collapsed")
+    with open(path, encoding="utf-8") as file:
+        lines = file.read().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert stack.split(";")[-1].startswith("busy (test_profiler.py:")
+    assert profiler.status() == {"active": False}
+
+    with pytest.raises(ValueError):
+        profiler.start(str(tmpdir), mode="other")
+
+
+def test_profiling_commands(config, tmpdir):
+    config.update({"plugins": {"profiler": {"directory": str(tmpdir)}}})
+    with patch("pylsp.plugins.profiler.PROFILER", Profiler()) as profiler:
+        status = pylsp_execute_command(
+            config, START_PROFILING_COMMAND, [{"plugin": "slow"}]
+        )
+        assert status["active"] and status["directory"] == str(tmpdir)
+
+        profiler.scoped_function(busy, "plugin", "slow")(0.01)
+        path = pylsp_execute_command(config, STOP_PROFILING_COMMAND, [])["path"]
+        assert os.path.dirname(path) == str(tmpdir)
+        assert pylsp_execute_command(config, STOP_PROFILING_COMMAND, []) == {
+            "path": None
+        }
+        assert pylsp_execute_command(config, "other", []) is None
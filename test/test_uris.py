@@ -71,3 +71,29 @@ def test_win_from_fs_path(path, uri):
 )
 def test_uri_with(uri, kwargs, new_uri):
     assert uris.uri_with(uri, **kwargs) == new_uri
+
+
+@unix_only
+def test_from_fs_paths():
+    paths = ["/foo/bar", "/foo/space ?bar", "/foo/bar"]
+    assert uris.from_fs_paths(paths) == [
+        "file:///foo/bar",
+        "file:///foo/space%20%3Fbar",
+        "file:///foo/bar",
+    ]
+
+
+def test_uris_with_paths():
+    uri = "file:///foo/bar"
+    assert uris.uris_with_paths(uri, ["/baz/boo", None, "/baz/boo"]) == [
+        "file:///baz/boo",
+        uri,
+        "file:///baz/boo",
+    ]
+
+
+def test_conversions_are_memoized():
+    uris.to_fs_path.cache_clear()
+    uris.to_fs_path("file:///foo/memoized")
+    uris.to_fs_path("file:///foo/memoized")
+    assert uris.to_fs_path.cache_info().hits == 1
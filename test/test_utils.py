@@ -195,6 +195,28 @@ def test_find_parents(tmpdir):
     ]
 
 
+def test_path_to_dot_name_caches_packages(tmpdir):
+    sub = tmpdir.mkdir("pkg").mkdir("sub")
+    tmpdir.join("pkg", "__init__.py").write("")
+    sub.join("__init__.py").write("")
+    path = sub.join("mod.py").strpath
+
+    with mock.patch("os.path.exists", wraps=os.path.exists) as exists:
+        assert _utils.path_to_dot_name(path) == "pkg.sub.mod"
+        assert _utils.path_to_dot_name(sub.join("other.py").strpath) == "pkg.sub.other"
+    # Once for each of pkg/sub, pkg and the directory above
+    assert exists.call_count == 3
+
+    tmpdir.join("__init__.py").write("")
+    assert _utils.path_to_dot_name(path) == "pkg.sub.mod"
+    _utils.invalidate_package_dirs(tmpdir.join("__init__.py").strpath)
+    assert _utils.path_to_dot_name(path).endswith(".pkg.sub.mod")
+
+    sub.join("__init__.py").remove()
+    _utils.invalidate_package_dirs(tmpdir.strpath)
+    assert _utils.path_to_dot_name(path) == "mod"
+
+
 def test_merge_dicts():
     assert _utils.merge_dicts(
         {"a": True, "b": {"x": 123, "y": {"hello": "world"}}},
@@ -1,10 +1,14 @@
 # Copyright 2017 Palantir Technologies, Inc.
 import os
 import pathlib
+from concurrent.futures import Future
+from unittest.mock import patch
 
 import pytest
 
 from pylsp import uris
+from pylsp.config.config import Config
+from pylsp.workspace import Workspace
 
 DOC_URI = uris.from_fs_path(__file__)
 NOTEBOOK_URI = uris.from_fs_path("notebook_uri")
@@ -389,12 +393,64 @@ def test_progress_with_percent(workspace, consumer):
             "title": "some_title",
         },
         {"kind": "report", "message": "ten", "percentage": 10},
-        {"kind": "report", "message": "fifty", "percentage": 50},
+        # reports are rate limited, only the latest one is kept
         {"kind": "report", "message": "ninety", "percentage": 90},
         {"kind": "end"},
     ]
 
 
+def test_progress_does_not_wait_for_token_creation(workspace, consumer, endpoint):
+    workspace._config.capabilities["window"] = {"workDoneProgress": True}
+    token_created = Future()
+    endpoint.request = lambda method, params: token_created
+
+    with workspace.report_progress("some_title") as progress_message:
+        progress_message("ten", 10)
+
+    # nothing is sent until the client created the token
+    assert len(consumer.call_args_list) == 0
+    token_created.set_result(None)
+    assert [call[0][0]["params"]["value"] for call in consumer.call_args_list] == [
+        {"kind": "begin", "title": "some_title"},
+        {"kind": "report", "message": "ten", "percentage": 10},
+        {"kind": "end"},
+    ]
+
+
+def test_progress_aggregate(workspace, consumer):
+    workspace._config.capabilities["window"] = {"workDoneProgress": True}
+
+    with workspace.report_progress("lint", aggregate=True):
+        with workspace.report_progress("lint: pyflakes"):
+            pass
+
+    init_call, *progress_calls = consumer.call_args_list
+    assert init_call[0][0]["method"] == "window/workDoneProgress/create"
+    assert len({call[0][0]["params"]["token"] for call in progress_calls}) == 1
+    assert [call[0][0]["params"]["value"] for call in progress_calls] == [
+        {"kind": "begin", "title": "lint"},
+        {"kind": "report", "message": "lint: pyflakes"},
+        {"kind": "end"},
+    ]
+
+
+def test_progress_preallocated_tokens(workspace, consumer):
+    workspace._config.capabilities["window"] = {"workDoneProgress": True}
+    workspace.preallocate_progress_tokens(1)
+    (create_call,) = consumer.call_args_list
+    token = create_call[0][0]["params"]["token"]
+    consumer.reset_mock()
+
+    with workspace.report_progress("some_title"):
+        pass
+
+    # The preallocated token is used right away and replaced by a new one
+    methods = [call[0][0]["method"] for call in consumer.call_args_list]
+    assert methods == ["window/workDoneProgress/create", "$/progress", "$/progress"]
+    assert consumer.call_args_list[1][0][0]["params"]["token"] == token
+    assert consumer.call_args_list[0][0][0]["params"]["token"] != token
+
+
 def test_progress_with_exception(workspace, consumer):
     workspace._config.capabilities["window"] = {"workDoneProgress": True}
 
@@ -430,3 +486,148 @@ def test_progress_with_exception(workspace, consumer):
         {"kind": "begin", "title": "some_title"},
         {"kind": "end"},
     ]
+
+
+def test_publish_diagnostics_skips_unchanged(workspace, consumer):
+    diagnostics = [{"message": "error", "severity": 1}]
+
+    workspace.publish_diagnostics(DOC_URI, diagnostics)
+    workspace.publish_diagnostics(DOC_URI, [dict(diagnostics[0])])
+    assert len(consumer.call_args_list) == 1
+
+    workspace.publish_diagnostics(DOC_URI, [])
+    workspace.publish_diagnostics(DOC_URI, [])
+    published = [call[0][0]["params"] for call in consumer.call_args_list]
+    assert published == [
+        {"uri": DOC_URI, "diagnostics": diagnostics},
+        {"uri": DOC_URI, "diagnostics": []},
+    ]
+
+
+def test_diagnostic_report(workspace):
+    diagnostics = [{"message": "error", "severity": 1}]
+
+    report = workspace.diagnostic_report(diagnostics)
+    assert report["kind"] == "full"
+    assert report["items"] == diagnostics
+
+    assert workspace.diagnostic_report(diagnostics, report["resultId"]) == {
+        "kind": "unchanged",
+        "resultId": report["resultId"],
+    }
+    assert workspace.diagnostic_report([], report["resultId"])["kind"] == "full"
+
+
+def test_document_diagnostic(pylsp, tmpdir):
+    pylsp.config.capabilities["textDocument"] = {"diagnostic": {}}
+    assert pylsp.capabilities()["diagnosticProvider"]["workspaceDiagnostics"]
+
+    doc_uri = uris.from_fs_path(str(tmpdir.join("module.py")))
+    pylsp.m_text_document__did_open(
+        textDocument={"uri": doc_uri, "version": 1, "text": "import sys\n"}
+    )
+    report = pylsp.m_text_document__diagnostic(textDocument={"uri": doc_uri})()
+    assert report["kind"] == "full"
+    assert "'sys' imported but unused" in [d["message"] for d in report["items"]]
+
+    report = pylsp.m_text_document__diagnostic(
+        textDocument={"uri": doc_uri}, previousResultId=report["resultId"]
+    )()
+    assert report["kind"] == "unchanged"
+
+
+def test_workspace_diagnostic(pylsp, tmpdir):
+    tmpdir.join("unused.py").write("import sys\n")
+    tmpdir.join("clean.py").write("x = 1\n")
+    tmpdir.join("excluded.py").write("import os\n")
+    open_uri = uris.from_fs_path(str(tmpdir.join("open.py")))
+    pylsp.workspace.put_document(open_uri, "import os\n")
+    unused_uri = uris.from_fs_path(str(tmpdir.join("unused.py")))
+    clean_uri = uris.from_fs_path(str(tmpdir.join("clean.py")))
+
+    assert pylsp.workspace_diagnostic({}) == {"items": []}
+
+    pylsp.config.update({"diagnostics": {"workspace": True, "exclude": ["excl*"]}})
+    reports = pylsp.workspace_diagnostic({})["items"]
+    assert {report["uri"] for report in reports} == {unused_uri, clean_uri}
+    result_ids = {report["uri"]: report["resultId"] for report in reports}
+
+    # Reports are sent as partial results, unchanged if the result id matches
+    with patch.object(pylsp._endpoint, "notify") as notify:
+        result = pylsp.workspace_diagnostic({clean_uri: result_ids[clean_uri]}, "t")
+    assert result == {"items": []}
+    params = notify.call_args[1]["params"]
+    assert params["token"] == "t"
+    kinds = {report["uri"]: report["kind"] for report in params["value"]["items"]}
+    assert kinds == {unused_uri: "full", clean_uri: "unchanged"}
+
+    # Only the files that changed are linted again
+    tmpdir.join("clean.py").write("import os\n")
+    with patch.object(pylsp, "_hook", wraps=pylsp._hook) as hook:
+        reports = pylsp.workspace_diagnostic(result_ids)["items"]
+    assert [c[0][1] for c in hook.call_args_list] == [clean_uri]
+    kinds = {report["uri"]: report["kind"] for report in reports}
+    assert kinds == {unused_uri: "unchanged", clean_uri: "full"}
+
+
+def test_workspace_diagnostic_refresh(pylsp, tmpdir):
+    tmpdir.join("unused.py").write("import sys\n")
+    settings = {"diagnostics": {"workspace": True}}
+    pylsp.m_workspace__did_change_configuration({"pylsp": settings})
+    assert len(pylsp.workspace_diagnostic({})["items"]) == 1
+    pylsp.config.capabilities["textDocument"] = {"diagnostic": {}}
+    pylsp.config.capabilities["workspace"] = {"diagnostics": {"refreshSupport": True}}
+
+    # Settings change the diagnostics of every file, which the client pulls again
+    settings["plugins"] = {"pyflakes": {"enabled": False}}
+    with patch.object(pylsp._endpoint, "request") as request:
+        pylsp.m_workspace__did_change_configuration({"pylsp": settings})
+    request.assert_called_once_with("workspace/diagnostic/refresh")
+    assert pylsp.workspace_diagnostic({})["items"][0]["items"] == []
+
+
+def test_rope_autoimport_shared(tmpdir, endpoint):
+    workspaces = []
+    for _ in range(2):
+        ws = Workspace(uris.from_fs_path(str(tmpdir)), endpoint)
+        ws._config = Config(ws.root_uri, {}, 0, {})
+        workspaces.append(ws)
+    first, second = [ws._rope_autoimport({}, memory=True) for ws in workspaces]
+    assert first is second
+
+    workspaces[0].close()
+    # Still open, searching a closed database raises
+    first.search("os")
+    workspaces[1].close()
+    assert workspaces[1]._rope_autoimport({}, memory=True) is not first
+    workspaces[1].close()
+
+
+def test_rope_autoimport_settings(tmpdir, endpoint):
+    workspaces = []
+    for _ in range(2):
+        ws = Workspace(uris.from_fs_path(str(tmpdir)), endpoint)
+        ws._config = Config(ws.root_uri, {}, 0, {})
+        workspaces.append(ws)
+    rope_config = {"extensionModules": ["numpy"]}
+    first = workspaces[0]._rope_autoimport(rope_config, memory=True)
+    assert workspaces[1]._rope_autoimport({}, memory=True) is not first
+
+    # The database is replaced once the settings change
+    assert workspaces[0]._rope_autoimport({}, memory=True) is not first
+    assert workspaces[0]._rope_autoimport({}, memory=True) is (
+        workspaces[1]._rope_autoimport({}, memory=True)
+    )
+    for ws in workspaces:
+        ws.close()
+
+
+def test_jedi_environment_env_vars():
+    from pylsp import _shared
+
+    with patch("jedi.api.environment.create_environment") as create:
+        create.side_effect = lambda **kwargs: object()
+        first = _shared.jedi_environment("/env/python", {"A": "1"})
+        assert _shared.jedi_environment("/env/python", {"A": "1"}) is first
+        assert _shared.jedi_environment("/env/python", {"A": "2"}) is not first
+    assert create.call_count == 2